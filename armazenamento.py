@@ -0,0 +1,971 @@
+# ============================================================================
+# CRM PÓS-VENDAS - CAMADA DE ARMAZENAMENTO
+# Descrição: Operações sobre as abas da planilha (leitura, escrita e
+#            gravação incremental de linhas). O Google Sheets e um banco
+#            SQLite local implementam a mesma interface por aba.
+# ============================================================================
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import rowcol_to_a1
+
+
+# ============================================================================
+# FUNÇÕES AUXILIARES
+# ============================================================================
+
+def _valor_celula(valor):
+    """Converte um valor Python/pandas para o formato aceito pela API do Sheets"""
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and math.isnan(valor):
+        return ''
+    if isinstance(valor, (pd.Timestamp, datetime, date)):
+        return valor.strftime('%d/%m/%Y')
+    try:
+        if pd.isna(valor):
+            return ''
+    except (TypeError, ValueError):
+        pass
+    if hasattr(valor, 'item'):
+        # Tipos numpy (int64, float64, bool_) não são serializáveis em JSON
+        return valor.item()
+    return valor
+
+
+def _texto_celula(valor):
+    """Representação textual usada para comparar chaves com o conteúdo da aba"""
+    valor = _valor_celula(valor)
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _inteiro(valor):
+    """Número inteiro de uma célula (vazia ou inválida -> 0)"""
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _dados_linha(valores):
+    """Monta um RowData da API do Sheets a partir de uma lista de valores
+
+    Textos vão como `formulaValue`, que a planilha interpreta como se
+    tivessem sido digitados (igual a USER_ENTERED nas escritas por
+    intervalo): '17/10/2026' vira data e '12,50' vira número, como nas
+    linhas gravadas antes. `stringValue` gravaria tudo como texto.
+    """
+    celulas = []
+    for valor in valores:
+        if valor == '' or valor is None:
+            celulas.append({})
+        elif isinstance(valor, bool):
+            celulas.append({'userEnteredValue': {'boolValue': valor}})
+        elif isinstance(valor, (int, float)):
+            celulas.append({'userEnteredValue': {'numberValue': valor}})
+        else:
+            celulas.append({'userEnteredValue': {'formulaValue': str(valor)}})
+    return {'values': celulas}
+
+
+def _letra_coluna(indice):
+    """Converte o índice (base 1) de uma coluna na letra usada em intervalos A1"""
+    return rowcol_to_a1(1, indice).rstrip('0123456789')
+
+
+def _intervalos_contiguos(indices):
+    """Agrupa índices de coluna em blocos contíguos: [0, 1, 2, 5] -> [[0, 1, 2], [5]]"""
+    blocos = []
+    for indice in sorted(indices):
+        if blocos and indice == blocos[-1][-1] + 1:
+            blocos[-1].append(indice)
+        else:
+            blocos.append([indice])
+    return blocos
+
+
+def _requisicoes_celulas(aba, cabecalho, numero, valores):
+    """updateCells que gravam `valores` ({coluna: valor}) na linha `numero` (base 1)
+
+    Colunas vizinhas são enviadas juntas, uma requisição por bloco contíguo.
+    """
+    indices = [cabecalho.index(col) for col in valores]
+    return [
+        {
+            'updateCells': {
+                'start': {'sheetId': aba.id, 'rowIndex': numero - 1, 'columnIndex': bloco[0]},
+                'rows': [_dados_linha([_valor_celula(valores[cabecalho[i]]) for i in bloco])],
+                'fields': 'userEnteredValue'
+            }
+        }
+        for bloco in _intervalos_contiguos(indices)
+    ]
+
+
+def _colunas_das_linhas(rows):
+    """Lista as colunas presentes nas linhas, preservando a ordem de aparição"""
+    colunas = []
+    for linha in rows:
+        for col in linha:
+            if col not in colunas:
+                colunas.append(col)
+    return colunas
+
+
+def carregar_abas(abas, ler, max_concorrencia=6):
+    """Executa `ler(aba)` para várias abas em paralelo e devolve {aba: resultado}
+
+    O número de requisições simultâneas é limitado por `max_concorrencia`,
+    então o tempo total fica próximo ao da aba mais lenta sem estourar a
+    cota da API. Exceções de qualquer aba são propagadas.
+    """
+    abas = list(dict.fromkeys(abas))
+    if not abas:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(abas)))) as executor:
+        futuros = {aba: executor.submit(ler, aba) for aba in abas}
+        return {aba: futuro.result() for aba, futuro in futuros.items()}
+
+
+# ============================================================================
+# INTERFACE
+# ============================================================================
+
+class Armazenamento:
+    """Interface comum dos backends: cada aba é uma tabela de linhas
+
+    Os nomes e parâmetros de `read`/`update` seguem o GSheetsConnection,
+    então o restante do código não precisa saber qual backend está ativo.
+    Chaves (`key`) são dicionários {coluna: valor} que identificam uma linha.
+    """
+
+    def read(self, worksheet, ttl=0):
+        """Lê uma aba inteira como DataFrame"""
+        raise NotImplementedError
+
+    def update(self, worksheet, data):
+        """Sobrescreve uma aba inteira com o DataFrame informado"""
+        raise NotImplementedError
+
+    def read_column(self, worksheet, column):
+        """Valores de uma única coluna da aba como Series (vazia se a coluna não existe)"""
+        df = self.read(worksheet=worksheet, ttl=0)
+        return df[column] if column in df.columns else pd.Series(dtype=object, name=column)
+
+    def revision(self, worksheet):
+        """Marcador barato que muda sempre que a aba é alterada
+
+        Se duas chamadas devolvem o mesmo valor, a aba não mudou entre elas e
+        uma cópia lida antes da primeira continua válida. None significa que
+        o backend não sabe dizer (é preciso ler a aba de novo).
+        """
+        return None
+
+    def append_rows(self, worksheet, rows):
+        """Acrescenta linhas (dicionários) ao final da aba"""
+        raise NotImplementedError
+
+    def update_row(self, worksheet, key, values):
+        """Altera apenas as colunas informadas da linha identificada por `key`"""
+        raise NotImplementedError
+
+    def delete_row(self, worksheet, key):
+        """Remove a linha identificada por `key`"""
+        raise NotImplementedError
+
+    def move_row(self, worksheet, key, destination, destination_row, replacement_row=None):
+        """Remove a linha de `worksheet`, grava em `destination` e inclui a substituta"""
+        raise NotImplementedError
+
+    def upsert_rows(self, worksheet, key_column, rows):
+        """Atualiza as linhas cujo `key_column` já existe e acrescenta as demais
+
+        Só as colunas presentes em cada linha são gravadas.
+        """
+        raise NotImplementedError
+
+    def update_rows(self, worksheet, key_column, rows):
+        """Atualiza as linhas cujo `key_column` já existe, sem acrescentar nenhuma
+
+        Só as colunas presentes em cada linha são gravadas, exceto a própria
+        chave, que não é reescrita. Devolve as chaves que não foram
+        encontradas (essas linhas são ignoradas).
+        """
+        raise NotImplementedError
+
+    def upsert_row(self, worksheet, key_column, row):
+        """Atualiza (ou acrescenta) uma única linha identificada por `key_column`"""
+        return self.upsert_rows(worksheet, key_column, [row])
+
+    def reserve_sequence(self, sequence, size=1, start=0):
+        """Reserva `size` números consecutivos da sequência e devolve o primeiro
+
+        A reserva é atômica: chamadas simultâneas (inclusive de outros
+        processos) nunca recebem números em comum. Na primeira reserva a
+        sequência começa depois de `start`.
+        """
+        raise NotImplementedError
+
+
+# ============================================================================
+# GOOGLE SHEETS
+# ============================================================================
+
+# Vezes que uma linha é localizada de novo se mudou de posição antes da escrita
+TENTATIVAS_LOCALIZACAO = 3
+
+# Aba com uma linha por bloco de números reservado (ver reserve_sequence)
+ABA_SEQUENCIAS = "SEQUENCIAS"
+COLUNAS_SEQUENCIAS = ['Sequencia', 'Quantidade', 'Inicio', 'Fim']
+
+# Linhas lidas de uma vez ao procurar a reserva anterior (a janela dobra a cada volta)
+JANELA_SEQUENCIAS = 20
+
+class ArmazenamentoGSheets(Armazenamento):
+    """Acesso às abas do Google Sheets através do GSheetsConnection"""
+
+    # Segundos em que a data de modificação consultada no Drive é reaproveitada
+    # (várias abas verificadas no mesmo instante fazem uma única consulta)
+    VALIDADE_REVISAO = 5
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._planilha = None
+        self._abas = {}
+        self._revisao = (0, None)
+
+    def _abrir_planilha(self):
+        """Abre (uma única vez) a planilha configurada na conexão"""
+        if self._planilha is None:
+            self._planilha = self.conn.client._open_spreadsheet()
+        return self._planilha
+
+    def _aba(self, worksheet, criar=False):
+        """Retorna o objeto gspread da aba, reaproveitando entre chamadas
+
+        Com `criar=True` (escritas) uma aba que não existe é criada vazia,
+        como as tabelas do SQLite na primeira gravação.
+        """
+        if worksheet not in self._abas:
+            planilha = self._abrir_planilha()
+            try:
+                self._abas[worksheet] = planilha.worksheet(worksheet)
+            except WorksheetNotFound:
+                if not criar:
+                    raise
+                try:
+                    self._abas[worksheet] = planilha.add_worksheet(worksheet, rows=1, cols=1)
+                except Exception:
+                    # Outro processo criou a aba ao mesmo tempo
+                    self._abas[worksheet] = planilha.worksheet(worksheet)
+        return self._abas[worksheet]
+
+    def _cabecalho(self, aba, colunas_necessarias):
+        """Lê o cabeçalho da aba e acrescenta colunas que ainda não existem"""
+        cabecalho = aba.row_values(1)
+        novas = [col for col in colunas_necessarias if col not in cabecalho]
+        if novas:
+            cabecalho = cabecalho + novas
+            if aba.col_count < len(cabecalho):
+                aba.add_cols(len(cabecalho) - aba.col_count)
+            aba.update(range_name='A1', values=[cabecalho], value_input_option='USER_ENTERED')
+        return cabecalho
+
+    def read(self, worksheet, ttl=0):
+        """Lê uma aba inteira como DataFrame"""
+        return self.conn.read(worksheet=worksheet, ttl=ttl)
+
+    def update(self, worksheet, data):
+        """Sobrescreve uma aba inteira com o DataFrame informado"""
+        self._aba(worksheet, criar=True)
+        return self.conn.update(worksheet=worksheet, data=data)
+
+    def read_column(self, worksheet, column):
+        """Valores de uma única coluna lendo só ela (e a coluna A) da aba
+
+        A API devolve cada coluna até a última célula preenchida; a coluna A
+        vem junto para que linhas com a célula vazia no fim da aba também
+        entrem (como '').
+        """
+        try:
+            cabecalho = self._aba(worksheet).row_values(1)
+        except WorksheetNotFound:
+            cabecalho = []
+        if column not in cabecalho:
+            return pd.Series(dtype=object, name=column)
+
+        nome = worksheet.replace("'", "''")
+        letra = _letra_coluna(cabecalho.index(column) + 1)
+        intervalos = [f"'{nome}'!{letra}2:{letra}"] + ([f"'{nome}'!A2:A"] if letra != 'A' else [])
+        resposta = self._abrir_planilha().values_batch_get(intervalos, params={'majorDimension': 'COLUMNS'})
+        colunas = [(intervalo.get('values') or [[]])[0] for intervalo in resposta.get('valueRanges', [])]
+        valores = colunas[0] if colunas else []
+        total = max((len(c) for c in colunas), default=0)
+        return pd.Series(valores + [''] * (total - len(valores)), dtype=object, name=column)
+
+    def revision(self, worksheet):
+        """Data de modificação da planilha no Drive (modifiedTime)
+
+        O Drive só informa a data da planilha inteira: uma alteração em
+        qualquer aba muda a revisão de todas. Sem permissão de leitura no
+        Drive devolve None e as abas são sempre relidas.
+        """
+        consultado_em, revisao = self._revisao
+        if time.time() - consultado_em < self.VALIDADE_REVISAO:
+            return revisao
+        try:
+            revisao = self._abrir_planilha().get_lastUpdateTime()
+        except Exception:
+            revisao = None
+        self._revisao = (time.time(), revisao)
+        return revisao
+
+    def _aba_sequencias(self):
+        """Aba das reservas de sequência, criada (com cabeçalho) na primeira reserva"""
+        novo = ABA_SEQUENCIAS not in self._abas
+        aba = self._aba(ABA_SEQUENCIAS, criar=True)
+        if novo:
+            self._cabecalho(aba, COLUNAS_SEQUENCIAS)
+        return aba
+
+    def reserve_sequence(self, sequence, size=1, start=0):
+        """Reserva números acrescentando uma linha (sequência, quantidade, início, fim)
+
+        A planilha não tem incremento atômico, mas acrescentar linhas é: cada
+        reserva recebe uma linha própria e as linhas anteriores não mudam
+        mais. O fim do nosso bloco é o fim gravado na reserva anterior da
+        mesma sequência somado às quantidades das reservas entre ela e a
+        nossa (ver `_fim_sequencia`); ele é gravado na nossa linha para que
+        a próxima reserva só precise ler as linhas logo acima dela. As linhas
+        da aba não devem ser apagadas.
+        """
+        aba = self._aba_sequencias()
+        resposta = aba.append_row(
+            [sequence, int(size), int(start)],
+            value_input_option='USER_ENTERED',
+            insert_data_option='INSERT_ROWS',
+            table_range='A1'
+        )
+        intervalo = resposta['updates']['updatedRange']
+        linha = int(re.search(r'(\d+)$', intervalo.split(':')[0]).group(1))
+
+        fim = self._fim_sequencia(aba, sequence, linha, int(size), int(start))
+        aba.update(range_name=f"D{linha}", values=[[fim]], value_input_option='USER_ENTERED')
+        return fim - int(size) + 1
+
+    def _fim_sequencia(self, aba, sequence, linha, size, start):
+        """Último número do bloco reservado na linha `linha`
+
+        Lê as linhas acima da nossa em janelas crescentes até achar uma
+        reserva da sequência com o fim já gravado e soma a ele as quantidades
+        das reservas da sequência depois dela (reservas simultâneas que
+        ainda não gravaram o fim entram pela quantidade). Sem nenhuma, a
+        sequência começa no início da sua primeira reserva.
+        """
+        quantidades = size
+        inicio = start
+        ultima = linha - 1
+        janela = JANELA_SEQUENCIAS
+        while ultima >= 2:
+            primeira = max(2, ultima - janela + 1)
+            valores = aba.get(f"A{primeira}:D{ultima}", value_render_option='UNFORMATTED_VALUE')
+            for reserva in reversed(valores):
+                reserva = list(reserva) + [''] * (len(COLUNAS_SEQUENCIAS) - len(reserva))
+                if str(reserva[0]) != sequence:
+                    continue
+                if reserva[3] != '':
+                    return _inteiro(reserva[3]) + quantidades
+                quantidades += _inteiro(reserva[1])
+                inicio = _inteiro(reserva[2])
+            ultima = primeira - 1
+            janela *= 2
+        return inicio + quantidades
+
+    def append_rows(self, worksheet, rows):
+        """Acrescenta linhas ao final da aba enviando apenas as linhas novas"""
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        aba = self._aba(worksheet, criar=True)
+        cabecalho = self._cabecalho(aba, _colunas_das_linhas(rows))
+
+        valores = [
+            [_valor_celula(linha.get(col, '')) for col in cabecalho]
+            for linha in rows
+        ]
+        aba.append_rows(
+            valores,
+            value_input_option='USER_ENTERED',
+            insert_data_option='INSERT_ROWS',
+            table_range='A1'
+        )
+        return len(valores)
+
+    def _localizar_linha(self, aba, cabecalho, key):
+        """Retorna o número (base 1) da linha cujas colunas batem com `key`
+
+        Lê apenas as colunas da chave, nunca a aba inteira.
+        """
+        faltando = [col for col in key if col not in cabecalho]
+        if faltando:
+            raise ValueError(f"Colunas da chave não existem na aba '{aba.title}': {faltando}")
+
+        colunas = list(key)
+        intervalos = []
+        for col in colunas:
+            letra = _letra_coluna(cabecalho.index(col) + 1)
+            intervalos.append(f"{letra}2:{letra}")
+
+        valores_colunas = [
+            [celula[0] if celula else '' for celula in intervalo]
+            for intervalo in aba.batch_get(intervalos)
+        ]
+        total_linhas = max((len(v) for v in valores_colunas), default=0)
+        esperado = [_texto_celula(key[col]) for col in colunas]
+
+        for i in range(total_linhas):
+            atual = [
+                _texto_celula(valores[i]) if i < len(valores) else ''
+                for valores in valores_colunas
+            ]
+            if atual == esperado:
+                return i + 2
+
+        raise ValueError(f"Linha não encontrada na aba '{aba.title}': {key}")
+
+    def _linha_confere(self, aba, cabecalho, key, linha):
+        """Relê só as células da chave na linha `linha` e confere com `key`"""
+        intervalos = [f"{_letra_coluna(cabecalho.index(col) + 1)}{linha}" for col in key]
+        atual = [
+            _texto_celula(celulas[0][0]) if celulas and celulas[0] else ''
+            for celulas in aba.batch_get(intervalos)
+        ]
+        return atual == [_texto_celula(key[col]) for col in key]
+
+    def _localizar_linha_conferida(self, aba, cabecalho, key):
+        """Localiza a linha e confere a chave logo antes da escrita por posição
+
+        A planilha não tem exclusão/alteração condicional: entre localizar a
+        linha e escrever nela, outra sessão pode inserir ou remover linhas.
+        A conferência lê poucas células, deixando essa janela em uma única
+        requisição curta; se a linha mudou de lugar, ela é localizada de novo.
+        """
+        for _ in range(TENTATIVAS_LOCALIZACAO):
+            linha = self._localizar_linha(aba, cabecalho, key)
+            if self._linha_confere(aba, cabecalho, key, linha):
+                return linha
+        raise ValueError(f"A linha mudou de posição durante a gravação na aba '{aba.title}': {key}")
+
+    def update_row(self, worksheet, key, values):
+        """Altera apenas as células informadas da linha identificada por `key`"""
+        aba = self._aba(worksheet)
+        cabecalho = self._cabecalho(aba, list(key) + list(values))
+        linha = self._localizar_linha_conferida(aba, cabecalho, key)
+
+        aba.batch_update(
+            [
+                {
+                    'range': f"{_letra_coluna(cabecalho.index(col) + 1)}{linha}",
+                    'values': [[_valor_celula(valor)]]
+                }
+                for col, valor in values.items()
+            ],
+            value_input_option='USER_ENTERED'
+        )
+        return True
+
+    def delete_row(self, worksheet, key):
+        """Remove a linha identificada por `key`"""
+        aba = self._aba(worksheet)
+        cabecalho = aba.row_values(1)
+        linha = self._localizar_linha_conferida(aba, cabecalho, key)
+        aba.delete_rows(linha)
+        return True
+
+    def move_row(self, worksheet, key, destination, destination_row, replacement_row=None):
+        """Move uma linha de `worksheet` para `destination` em uma única requisição
+
+        A linha é localizada pela chave `key` ({coluna: valor}) e não pela
+        posição, então continua correta mesmo se outra pessoa inseriu ou
+        removeu linhas. A exclusão, a gravação no destino e a inclusão
+        opcional de `replacement_row` em `worksheet` vão juntas em um
+        batchUpdate: ou tudo é aplicado, ou nada.
+        """
+        origem = self._aba(worksheet)
+        destino = self._aba(destination)
+
+        colunas_origem = list(key) + (list(replacement_row) if replacement_row else [])
+        cabecalho_origem = self._cabecalho(origem, colunas_origem)
+        cabecalho_destino = self._cabecalho(destino, list(destination_row))
+
+        linha = self._localizar_linha_conferida(origem, cabecalho_origem, key)
+
+        requisicoes = [
+            {
+                'deleteDimension': {
+                    'range': {
+                        'sheetId': origem.id,
+                        'dimension': 'ROWS',
+                        'startIndex': linha - 1,
+                        'endIndex': linha
+                    }
+                }
+            },
+            {
+                'appendCells': {
+                    'sheetId': destino.id,
+                    'rows': [_dados_linha(
+                        [_valor_celula(destination_row.get(col, '')) for col in cabecalho_destino]
+                    )],
+                    'fields': 'userEnteredValue'
+                }
+            }
+        ]
+
+        if replacement_row:
+            requisicoes.append({
+                'appendCells': {
+                    'sheetId': origem.id,
+                    'rows': [_dados_linha(
+                        [_valor_celula(replacement_row.get(col, '')) for col in cabecalho_origem]
+                    )],
+                    'fields': 'userEnteredValue'
+                }
+            })
+
+        self._abrir_planilha().batch_update({'requests': requisicoes})
+        return True
+
+    def _linhas_por_chave(self, worksheet, cabecalho, key_column):
+        """Mapeia o valor de `key_column` para o número (base 1) da linha
+
+        Lê apenas a coluna da chave. Em chaves repetidas vale a primeira linha.
+        """
+        letra = _letra_coluna(cabecalho.index(key_column) + 1)
+        nome = worksheet.replace("'", "''")
+        resposta = self._abrir_planilha().values_get(
+            f"'{nome}'!{letra}2:{letra}",
+            params={'majorDimension': 'COLUMNS'}
+        )
+        colunas = resposta.get('values', [])
+        linhas = {}
+        for i, valor in enumerate(colunas[0] if colunas else []):
+            linhas.setdefault(_texto_celula(valor), i + 2)
+        return linhas
+
+    def upsert_rows(self, worksheet, key_column, rows):
+        """Atualiza as linhas cujo `key_column` já existe e acrescenta as demais
+
+        Lê só a coluna da chave e envia, em um único batchUpdate, as
+        células das linhas alteradas e as linhas novas. O custo não depende
+        do tamanho da aba e ela nunca é regravada por inteiro.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        aba = self._aba(worksheet, criar=True)
+        cabecalho = self._cabecalho(aba, _colunas_das_linhas([{key_column: None}] + rows))
+        linhas_existentes = self._linhas_por_chave(worksheet, cabecalho, key_column)
+
+        requisicoes = []
+        novas = []
+        for linha in rows:
+            numero = linhas_existentes.get(_texto_celula(linha.get(key_column, '')))
+            if numero is None:
+                novas.append(_dados_linha(
+                    [_valor_celula(linha.get(col, '')) for col in cabecalho]
+                ))
+                continue
+
+            requisicoes.extend(_requisicoes_celulas(aba, cabecalho, numero, linha))
+
+        if novas:
+            requisicoes.append({
+                'appendCells': {'sheetId': aba.id, 'rows': novas, 'fields': 'userEnteredValue'}
+            })
+
+        self._abrir_planilha().batch_update({'requests': requisicoes})
+        return len(rows)
+
+    def update_rows(self, worksheet, key_column, rows):
+        """Atualiza as linhas cujo `key_column` já existe, sem acrescentar nenhuma
+
+        Como em `upsert_rows`, lê só a coluna da chave e grava as células
+        em um único batchUpdate; a célula da chave não é reescrita.
+        Devolve as chaves que não foram encontradas.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+
+        aba = self._aba(worksheet)
+        valores = [c for c in _colunas_das_linhas(rows) if c != key_column]
+        cabecalho = self._cabecalho(aba, valores)
+        if key_column not in cabecalho:
+            return [linha.get(key_column) for linha in rows]
+        linhas_existentes = self._linhas_por_chave(worksheet, cabecalho, key_column)
+
+        requisicoes = []
+        nao_encontradas = []
+        for linha in rows:
+            numero = linhas_existentes.get(_texto_celula(linha.get(key_column, '')))
+            if numero is None:
+                nao_encontradas.append(linha.get(key_column))
+                continue
+            valores_linha = {col: valor for col, valor in linha.items() if col != key_column}
+            requisicoes.extend(_requisicoes_celulas(aba, cabecalho, numero, valores_linha))
+
+        if requisicoes:
+            self._abrir_planilha().batch_update({'requests': requisicoes})
+        return nao_encontradas
+
+
+# ============================================================================
+# SQLITE (LOCAL)
+# ============================================================================
+
+# Colunas indexadas em cada aba (criadas quando a coluna existir)
+INDICES_SQLITE = {
+    'AGENDAMENTOS_ATIVOS': ['ID_Agendamento', 'Telefone', 'Data de chamada', 'Data de contato'],
+    'HISTORICO': ['Telefone', 'Data de conclusão'],
+    'SUPORTE': ['ID_Ticket', 'Telefone', 'Data de abertura'],
+    'Total': ['Telefone', 'Nome'],
+    'HISTORICO_METRICAS': ['Data'],
+    'LOG_CHECKINS': ['Data_Checkin'],
+    'LOG_CONVERSOES': ['Data_Conversao'],
+    'LOG_TICKETS_ABERTOS': ['ID_Ticket'],
+    'LOG_TICKETS_RESOLVIDOS': ['ID_Ticket'],
+}
+
+
+def _identificador(nome):
+    """Coloca um nome de tabela/coluna entre aspas para uso em SQL"""
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+def _valor_sql(valor):
+    """Valor gravado no SQLite: células vazias viram NULL (NaN ao ler)"""
+    valor = _valor_celula(valor)
+    return None if valor == '' else valor
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    """Backend local: cada aba vira uma tabela SQLite com índices e transações
+
+    As colunas são criadas sem tipo declarado, então números e textos são
+    guardados como vieram da planilha. A coluna interna `_id` mantém a ordem
+    de inserção e não aparece nos DataFrames lidos. A tabela `_revisoes`
+    conta as alterações de cada aba (ver `revision`).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS _revisoes (aba TEXT PRIMARY KEY, revisao INTEGER NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS _sequencias (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL)')
+
+    @contextmanager
+    def _transacao(self):
+        """Executa o bloco em uma transação (commit no fim, rollback em erro)"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _registrar_alteracao(self, *worksheets):
+        """Incrementa a revisão das abas alteradas (dentro da transação da escrita)"""
+        self._db.executemany(
+            "INSERT INTO _revisoes (aba, revisao) VALUES (?, 1) "
+            "ON CONFLICT(aba) DO UPDATE SET revisao = revisao + 1",
+            [(aba,) for aba in worksheets]
+        )
+
+    def _colunas(self, worksheet):
+        """Colunas da tabela, na ordem da planilha (sem a coluna interna)"""
+        info = self._db.execute(f"PRAGMA table_info({_identificador(worksheet)})").fetchall()
+        return [linha[1] for linha in info if linha[1] != '_id']
+
+    def _garantir_tabela(self, worksheet, colunas):
+        """Cria a tabela/colunas que faltarem e os índices configurados"""
+        existentes = self._colunas(worksheet)
+        tabela = _identificador(worksheet)
+
+        if not existentes and not self._tabela_existe(worksheet):
+            definicao = ', '.join(['_id INTEGER PRIMARY KEY AUTOINCREMENT'] + [_identificador(c) for c in colunas])
+            self._db.execute(f"CREATE TABLE {tabela} ({definicao})")
+            existentes = list(colunas)
+        else:
+            for col in colunas:
+                if col not in existentes:
+                    self._db.execute(f"ALTER TABLE {tabela} ADD COLUMN {_identificador(col)}")
+                    existentes.append(col)
+
+        for col in INDICES_SQLITE.get(worksheet, []):
+            if col in existentes:
+                nome_indice = _identificador(f"idx_{worksheet}_{col}")
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {nome_indice} ON {tabela} ({_identificador(col)})")
+
+        return existentes
+
+    def _tabela_existe(self, worksheet):
+        return self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (worksheet,)
+        ).fetchone() is not None
+
+    def _localizar_id(self, worksheet, key):
+        """Retorna o `_id` da primeira linha cujas colunas batem com `key`"""
+        faltando = [col for col in key if col not in self._colunas(worksheet)]
+        if faltando:
+            raise ValueError(f"Colunas da chave não existem na aba '{worksheet}': {faltando}")
+
+        condicoes = []
+        parametros = []
+        for col, valor in key.items():
+            valor = _valor_celula(valor)
+            if valor == '':
+                condicoes.append(f"({_identificador(col)} IS NULL OR {_identificador(col)} = '')")
+            else:
+                condicoes.append(f"{_identificador(col)} = ?")
+                parametros.append(valor)
+
+        resultado = self._db.execute(
+            f"SELECT _id FROM {_identificador(worksheet)} WHERE {' AND '.join(condicoes)} ORDER BY _id LIMIT 1",
+            parametros
+        ).fetchone()
+        if resultado is None:
+            raise ValueError(f"Linha não encontrada na aba '{worksheet}': {key}")
+        return resultado[0]
+
+    def _inserir(self, worksheet, rows):
+        colunas = self._garantir_tabela(worksheet, _colunas_das_linhas(rows))
+        self._db.executemany(
+            f"INSERT INTO {_identificador(worksheet)} ({', '.join(_identificador(c) for c in colunas)}) "
+            f"VALUES ({', '.join('?' for _ in colunas)})",
+            [[_valor_sql(linha.get(col, '')) for col in colunas] for linha in rows]
+        )
+
+    def read(self, worksheet, ttl=0):
+        """Lê uma aba inteira como DataFrame"""
+        with self._lock:
+            if not self._tabela_existe(worksheet):
+                return pd.DataFrame()
+            colunas = self._colunas(worksheet)
+            if not colunas:
+                return pd.DataFrame()
+            return pd.read_sql_query(
+                f"SELECT {', '.join(_identificador(c) for c in colunas)} "
+                f"FROM {_identificador(worksheet)} ORDER BY _id",
+                self._db
+            )
+
+    def read_column(self, worksheet, column):
+        """Valores de uma única coluna da tabela (SELECT só dela)"""
+        with self._lock:
+            if column not in self._colunas(worksheet):
+                return pd.Series(dtype=object, name=column)
+            valores = self._db.execute(
+                f"SELECT {_identificador(column)} FROM {_identificador(worksheet)} ORDER BY _id"
+            ).fetchall()
+        return pd.Series([v[0] for v in valores], dtype=object, name=column)
+
+    def revision(self, worksheet):
+        """Contador de alterações da aba, incrementado na mesma transação de cada escrita
+
+        Fica no próprio banco, então escritas de outros processos (ex.: o
+        job de snapshot) também mudam a revisão.
+        """
+        with self._lock:
+            resultado = self._db.execute(
+                "SELECT revisao FROM _revisoes WHERE aba = ?", (worksheet,)
+            ).fetchone()
+        return resultado[0] if resultado else 0
+
+    def reserve_sequence(self, sequence, size=1, start=0):
+        """Incrementa a sequência na tabela `_sequencias` em uma transação"""
+        with self._transacao():
+            self._db.execute(
+                "INSERT INTO _sequencias (nome, valor) VALUES (?, ?) ON CONFLICT(nome) DO NOTHING",
+                (sequence, int(start))
+            )
+            self._db.execute(
+                "UPDATE _sequencias SET valor = valor + ? WHERE nome = ?", (int(size), sequence)
+            )
+            valor = self._db.execute(
+                "SELECT valor FROM _sequencias WHERE nome = ?", (sequence,)
+            ).fetchone()[0]
+        return valor - int(size) + 1
+
+    def update(self, worksheet, data):
+        """Sobrescreve uma aba inteira com o DataFrame informado"""
+        with self._transacao():
+            self._registrar_alteracao(worksheet)
+            self._db.execute(f"DROP TABLE IF EXISTS {_identificador(worksheet)}")
+            self._garantir_tabela(worksheet, [str(c) for c in data.columns])
+            if not data.empty:
+                self._inserir(worksheet, data.to_dict('records'))
+        return data
+
+    def append_rows(self, worksheet, rows):
+        """Acrescenta linhas (dicionários) ao final da aba"""
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self._transacao():
+            self._inserir(worksheet, rows)
+            self._registrar_alteracao(worksheet)
+        return len(rows)
+
+    def update_row(self, worksheet, key, values):
+        """Altera apenas as colunas informadas da linha identificada por `key`"""
+        with self._transacao():
+            self._garantir_tabela(worksheet, list(values))
+            id_linha = self._localizar_id(worksheet, key)
+            atribuicoes = ', '.join(f"{_identificador(col)} = ?" for col in values)
+            self._db.execute(
+                f"UPDATE {_identificador(worksheet)} SET {atribuicoes} WHERE _id = ?",
+                [_valor_sql(v) for v in values.values()] + [id_linha]
+            )
+            self._registrar_alteracao(worksheet)
+        return True
+
+    def delete_row(self, worksheet, key):
+        """Remove a linha identificada por `key`"""
+        with self._transacao():
+            id_linha = self._localizar_id(worksheet, key)
+            self._db.execute(f"DELETE FROM {_identificador(worksheet)} WHERE _id = ?", (id_linha,))
+            self._registrar_alteracao(worksheet)
+        return True
+
+    def move_row(self, worksheet, key, destination, destination_row, replacement_row=None):
+        """Remove a linha de `worksheet`, grava em `destination` e inclui a substituta
+
+        Tudo acontece na mesma transação.
+        """
+        with self._transacao():
+            id_linha = self._localizar_id(worksheet, key)
+            self._db.execute(f"DELETE FROM {_identificador(worksheet)} WHERE _id = ?", (id_linha,))
+            self._inserir(destination, [destination_row])
+            if replacement_row:
+                self._inserir(worksheet, [replacement_row])
+            self._registrar_alteracao(worksheet, destination)
+        return True
+
+    def upsert_rows(self, worksheet, key_column, rows):
+        """Atualiza as linhas cujo `key_column` já existe e acrescenta as demais"""
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        tabela = _identificador(worksheet)
+        with self._transacao():
+            # A coluna da chave entra mesmo que nenhuma linha a traga, senão o
+            # SELECT abaixo falha em uma tabela que ainda não a tem
+            self._garantir_tabela(worksheet, _colunas_das_linhas([{key_column: None}] + rows))
+            for linha in rows:
+                chave = _valor_sql(linha.get(key_column, ''))
+                existente = self._db.execute(
+                    f"SELECT _id FROM {tabela} WHERE {_identificador(key_column)} = ? ORDER BY _id LIMIT 1",
+                    (chave,)
+                ).fetchone()
+                if existente is None:
+                    self._inserir(worksheet, [linha])
+                    continue
+                atribuicoes = ', '.join(f"{_identificador(col)} = ?" for col in linha)
+                self._db.execute(
+                    f"UPDATE {tabela} SET {atribuicoes} WHERE _id = ?",
+                    [_valor_sql(v) for v in linha.values()] + [existente[0]]
+                )
+            self._registrar_alteracao(worksheet)
+        return len(rows)
+
+    def update_rows(self, worksheet, key_column, rows):
+        """Atualiza as linhas cujo `key_column` já existe, sem acrescentar nenhuma
+
+        Devolve as chaves que não foram encontradas.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+
+        tabela = _identificador(worksheet)
+        with self._transacao():
+            if key_column not in self._colunas(worksheet):
+                return [linha.get(key_column) for linha in rows]
+            self._garantir_tabela(worksheet, [c for c in _colunas_das_linhas(rows) if c != key_column])
+
+            nao_encontradas = []
+            for linha in rows:
+                valores = {col: valor for col, valor in linha.items() if col != key_column}
+                existente = self._db.execute(
+                    f"SELECT _id FROM {tabela} WHERE {_identificador(key_column)} = ? ORDER BY _id LIMIT 1",
+                    (_valor_sql(linha.get(key_column, '')),)
+                ).fetchone()
+                if existente is None:
+                    nao_encontradas.append(linha.get(key_column))
+                    continue
+                if valores:
+                    atribuicoes = ', '.join(f"{_identificador(col)} = ?" for col in valores)
+                    self._db.execute(
+                        f"UPDATE {tabela} SET {atribuicoes} WHERE _id = ?",
+                        [_valor_sql(v) for v in valores.values()] + [existente[0]]
+                    )
+            if len(nao_encontradas) < len(rows):
+                self._registrar_alteracao(worksheet)
+        return nao_encontradas
+
+
+# ============================================================================
+# SELEÇÃO DO BACKEND
+# ============================================================================
+
+def criar_armazenamento(config=None, conectar_gsheets=None):
+    """Cria o backend de armazenamento conforme a configuração
+
+    `config` aceita as chaves `backend` ("gsheets" ou "sqlite") e
+    `caminho_sqlite`. As variáveis de ambiente CRM_ARMAZENAMENTO e
+    CRM_SQLITE têm prioridade. `conectar_gsheets` é chamada apenas quando
+    o backend escolhido é o Google Sheets.
+    """
+    config = dict(config or {})
+    backend = os.getenv("CRM_ARMAZENAMENTO", config.get("backend", "gsheets")).lower()
+
+    if backend == "sqlite":
+        caminho = os.getenv("CRM_SQLITE", config.get("caminho_sqlite", "crm.db"))
+        return ArmazenamentoSQLite(caminho)
+
+    if backend == "gsheets":
+        if conectar_gsheets is None:
+            raise ValueError("Backend 'gsheets' exige uma função de conexão")
+        return ArmazenamentoGSheets(conectar_gsheets())
+
+    raise ValueError(f"Backend de armazenamento desconhecido: {backend}")
+
+
+def sincronizar_abas(origem, destino, abas):
+    """Copia abas inteiras de um backend para outro (ex.: SQLite -> Google Sheets)
+
+    Usada por `gerar_snapshot.py --exportar-sqlite / --importar-sqlite`.
+    """
+    for aba in abas:
+        destino.update(worksheet=aba, data=origem.read(worksheet=aba, ttl=0))
@@ -0,0 +1,228 @@
+# ============================================================================
+# CRM PÓS-VENDAS - CACHE DAS ABAS
+# Descrição: DataFrames carregados mantidos por aba, com versão dos dados,
+#            invalidação pontual (uma escrita só descarta a aba alterada),
+#            atualização em segundo plano (stale-while-revalidate) e
+#            verificação de revisão antes de reler uma aba inteira, com cópia
+#            opcional em disco (cache_disco) que sobrevive a reinícios
+# ============================================================================
+
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from indices import versao_dados
+
+# Os DataFrames do cache são compartilhados por todas as sessões. Com
+# Copy-on-Write, filtros, fatias e colunas novas geram objetos próprios de
+# quem os criou e nunca alteram a entrada em cache (padrão no pandas >= 3.0)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+# DataFrame carregado, versão do conteúdo, revisão informada pelo armazenamento
+# e instante em que os dados foram lidos/confirmados (time.time())
+EntradaCache = namedtuple('EntradaCache', ['df', 'versao', 'revisao', 'carregado_em'])
+
+
+class CacheAbas:
+    """Cache de DataFrames por aba, compartilhado entre as sessões
+
+    Uma única cópia de cada aba em memória, não importa quantas sessões a
+    usam: quem consome não deve alterar o DataFrame recebido no lugar
+    (usar `assign`, filtros ou `sort_values(key=...)`).
+
+    Enquanto a entrada tem menos de `ttl` segundos ela é devolvida direto.
+    Entre `ttl` e `max_defasagem` a entrada antiga continua sendo devolvida
+    na hora e `carregar(aba)` roda em uma thread de fundo; só se bloqueia
+    esperando a rede quando a aba não está no cache, passou de
+    `max_defasagem` ou foi descartada por `invalidate(aba)` (após uma escrita).
+    Leituras simultâneas da mesma aba fazem uma única requisição.
+
+    Com `revisao(aba)` (ex.: Armazenamento.revision), uma entrada vencida é
+    primeiro comparada com a revisão atual: se não mudou, a mesma entrada é
+    mantida (só o instante é renovado) e a aba não é baixada de novo. A versão
+    de cada entrada é a impressão digital do conteúdo, então estruturas
+    derivadas (índices de busca) podem usá-la como chave e continuam
+    válidas quando uma recarga traz os mesmos dados.
+
+    Com `disco` (CacheDisco), cada leitura completa é gravada em disco e,
+    depois de um reinício, a primeira consulta de cada aba parte do arquivo
+    local: ele é revalidado pela revisão como qualquer entrada vencida.
+    """
+
+    def __init__(self, carregar, ttl=60, max_defasagem=600, revisao=None, disco=None):
+        self._carregar = carregar
+        self._revisao = revisao
+        self._disco = disco
+        self.ttl = ttl
+        self.max_defasagem = max_defasagem
+        self._entradas = {}
+        self._atualizando = set()
+        self._erros = {}
+        self._geracoes = {}  # aba -> nº de invalidações, para descartar cargas antigas
+        self._lock = threading.Lock()
+        self._locks_aba = {}
+
+    def _lock_da_aba(self, aba):
+        with self._lock:
+            return self._locks_aba.setdefault(aba, threading.Lock())
+
+    def _idade(self, entrada):
+        return time.time() - entrada.carregado_em
+
+    def _revisao_atual(self, aba):
+        """Revisão atual da aba, ou None se não há como saber"""
+        if self._revisao is None:
+            return None
+        try:
+            return self._revisao(aba)
+        except Exception:
+            return None
+
+    def _carregar_aba(self, aba, idade_aceita):
+        """Lê a aba e guarda no cache, a menos que outra thread já tenha trazido
+        uma entrada com menos de `idade_aceita` segundos"""
+        with self._lock_da_aba(aba):
+            entrada = self._entradas.get(aba)
+            if entrada is not None and self._idade(entrada) < idade_aceita:
+                return entrada
+
+            geracao = self._geracoes.get(aba, 0)
+            # A revisão é consultada antes da leitura: se a aba mudar no meio,
+            # a próxima verificação vê uma revisão diferente e relê
+            revisao = self._revisao_atual(aba)
+            revalidada = entrada is not None and revisao is not None and revisao == entrada.revisao
+            if revalidada:
+                entrada = entrada._replace(carregado_em=time.time())
+            else:
+                df = self._carregar(aba)
+                entrada = EntradaCache(df, versao_dados(df), revisao, time.time())
+            with self._lock:
+                # Uma escrita invalidou a aba durante a leitura: não guardar dados antigos
+                atual = self._geracoes.get(aba, 0) == geracao
+                if atual:
+                    self._entradas[aba] = entrada
+                self._erros.pop(aba, None)
+            if atual and not revalidada:
+                self._salvar_em_disco(aba, entrada)
+            return entrada
+
+    def _salvar_em_disco(self, aba, entrada):
+        if self._disco is None:
+            return
+        try:
+            self._disco.salvar(aba, entrada.df, entrada.revisao, entrada.versao, entrada.carregado_em)
+        except Exception:
+            # O disco é só uma aceleração: sem ele a aba é baixada no próximo início
+            pass
+
+    def _do_disco(self, aba):
+        """Entrada gravada em disco por uma execução anterior, trazida para a memória"""
+        with self._lock_da_aba(aba):
+            entrada = self._entradas.get(aba)
+            if entrada is not None:
+                return entrada
+
+            geracao = self._geracoes.get(aba, 0)
+            try:
+                salvo = self._disco.carregar(aba)
+            except Exception:
+                salvo = None  # arquivo ilegível: a aba é lida do armazenamento
+            if salvo is None:
+                return None
+
+            df, revisao, versao, carregado_em = salvo
+            entrada = EntradaCache(df, versao, revisao, carregado_em)
+            with self._lock:
+                if self._geracoes.get(aba, 0) != geracao:
+                    return None
+                self._entradas[aba] = entrada
+            return entrada
+
+    def _atualizar_em_segundo_plano(self, aba):
+        """Dispara (no máximo uma por aba) a recarga da aba em uma thread de fundo"""
+        with self._lock:
+            if aba in self._atualizando:
+                return
+            self._atualizando.add(aba)
+
+        def atualizar():
+            try:
+                self._carregar_aba(aba, self.ttl)
+            except Exception as e:
+                # Mantém a entrada antiga; o próximo acesso tenta de novo
+                self._erros[aba] = e
+            finally:
+                with self._lock:
+                    self._atualizando.discard(aba)
+
+        threading.Thread(target=atualizar, name=f"cache-{aba}", daemon=True).start()
+
+    def entrada(self, aba):
+        """Entrada da aba (df, versão, carregado_em), carregando se necessário"""
+        entrada = self._entradas.get(aba)
+        if entrada is None and self._disco is not None:
+            entrada = self._do_disco(aba)
+        if entrada is not None:
+            idade = self._idade(entrada)
+            if idade < self.ttl:
+                return entrada
+            if idade < self.max_defasagem:
+                self._atualizar_em_segundo_plano(aba)
+                return entrada
+
+        return self._carregar_aba(aba, self.max_defasagem)
+
+    def get(self, aba):
+        """DataFrame da aba"""
+        return self.entrada(aba).df
+
+    def versao(self, aba):
+        """Versão dos dados atualmente em cache para a aba"""
+        return self.entrada(aba).versao
+
+    def carregado_em(self, aba):
+        """Instante (time.time()) em que os dados em cache da aba foram lidos, ou None"""
+        entrada = self._entradas.get(aba)
+        return entrada.carregado_em if entrada is not None else None
+
+    def erro(self, aba):
+        """Última falha da atualização em segundo plano da aba, ou None"""
+        return self._erros.get(aba)
+
+    def versao_de(self, aba, df):
+        """Versão da entrada em cache se `df` é o próprio DataFrame dela; senão None"""
+        entrada = self._entradas.get(aba)
+        if entrada is not None and entrada.df is df:
+            return entrada.versao
+        return None
+
+    def substituir(self, aba, anterior, df):
+        """Troca o DataFrame `anterior` em cache por `df` (a aba depois de uma escrita deste processo)
+
+        Evita baixar a aba inteira só para ver a alteração que acabou de ser
+        feita. A revisão e o instante da entrada são mantidos, então
+        alterações feitas por outros processos continuam chegando na próxima
+        revalidação; cargas em andamento são descartadas. Se a entrada já não
+        é `anterior` (foi recarregada no meio), a aba é invalidada.
+        """
+        with self._lock:
+            entrada = self._entradas.get(aba)
+            if entrada is not None and entrada.df is anterior:
+                self._entradas[aba] = entrada._replace(df=df, versao=versao_dados(df))
+                self._geracoes[aba] = self._geracoes.get(aba, 0) + 1
+                return
+        self.invalidate(aba)
+
+    def invalidate(self, *abas):
+        """Descarta as abas informadas (ou todas, sem argumentos)"""
+        with self._lock:
+            abas = abas or list(self._locks_aba)
+            for aba in abas:
+                self._entradas.pop(aba, None)
+                self._geracoes[aba] = self._geracoes.get(aba, 0) + 1
+        if self._disco is not None:
+            for aba in abas:
+                self._disco.remover(aba)
@@ -0,0 +1,104 @@
+# ============================================================================
+# CRM PÓS-VENDAS - CACHE DAS ABAS EM DISCO
+# Descrição: Cópia local de cada aba em Arrow IPC (feather v2, compactado),
+#            com a revisão e o instante da leitura, para que um reinício
+#            comece pelos dados do disco em vez de baixar tudo de novo
+# ============================================================================
+
+import json
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+
+# Diretório padrão dos arquivos (sobrescrito pela variável CRM_CACHE_DIR)
+DIRETORIO_PADRAO = ".cache_abas"
+
+# lz4 descompacta mais rápido que zstd; o arquivo é lido via memory map
+COMPRESSAO = "lz4"
+
+
+def _tabela_arrow(df):
+    """Converte o DataFrame para Arrow
+
+    Colunas object com tipos misturados (ex.: números e textos na mesma
+    coluna da planilha) não têm tipo Arrow único e são gravadas como texto.
+    """
+    colunas = {}
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype == object:
+            try:
+                pa.array(serie, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                serie = serie.where(serie.isna(), serie.astype(str))
+        colunas[str(col)] = serie
+    return pa.Table.from_pandas(pd.DataFrame(colunas, index=df.index), preserve_index=None)
+
+
+class CacheDisco:
+    """Arquivos .arrow por aba com metadados {revisao, versao, carregado_em, formato}
+
+    A gravação é atômica (arquivo temporário + os.replace), então outro
+    processo lendo o mesmo diretório nunca vê um arquivo pela metade.
+    `namespace` separa os arquivos de cada carregador (ex.: o app guarda as
+    abas já preparadas, o snapshot guarda as abas como vieram), que ficam em
+    subdiretórios diferentes mesmo com o mesmo CRM_CACHE_DIR. `formato`
+    identifica como os DataFrames foram preparados (ex.: esquema.
+    formato_preparacao()); arquivos gravados com outro formato são
+    descartados em vez de servir dados no formato antigo.
+    """
+
+    def __init__(self, namespace, formato="", diretorio=None):
+        self.diretorio = os.path.join(diretorio or os.getenv("CRM_CACHE_DIR", DIRETORIO_PADRAO), namespace)
+        self.formato = formato
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho(self, aba):
+        nome = "".join(c if c.isalnum() or c in "-_" else f"%{ord(c):x}" for c in aba)
+        return os.path.join(self.diretorio, f"{nome}.arrow")
+
+    def salvar(self, aba, df, revisao, versao, carregado_em):
+        """Grava a aba e seus metadados"""
+        tabela = _tabela_arrow(df)
+        metadados = dict(tabela.schema.metadata or {})
+        metadados[b"crm"] = json.dumps({
+            "revisao": revisao,
+            "versao": versao,
+            "carregado_em": carregado_em,
+            "formato": self.formato,
+        }).encode()
+        tabela = tabela.replace_schema_metadata(metadados)
+
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                opcoes = pa.ipc.IpcWriteOptions(compression=COMPRESSAO)
+                with pa.ipc.new_file(arquivo, tabela.schema, options=opcoes) as escritor:
+                    escritor.write_table(tabela)
+            os.replace(temporario, self._caminho(aba))
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    def carregar(self, aba):
+        """(df, revisao, versao, carregado_em) gravados para a aba, ou None (também se o formato é outro)"""
+        caminho = self._caminho(aba)
+        if not os.path.exists(caminho):
+            return None
+        with pa.memory_map(caminho, "r") as origem:
+            tabela = pa.ipc.open_file(origem).read_all()
+        info = json.loads(tabela.schema.metadata[b"crm"])
+        if info.get("formato") != self.formato:
+            self.remover(aba)
+            return None
+        return tabela.to_pandas(), info["revisao"], info["versao"], info["carregado_em"]
+
+    def remover(self, aba):
+        """Apaga o arquivo da aba (dados que se sabe estarem desatualizados)"""
+        try:
+            os.remove(self._caminho(aba))
+        except FileNotFoundError:
+            pass
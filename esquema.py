@@ -0,0 +1,171 @@
+# ============================================================================
+# CRM PÓS-VENDAS - PREPARAÇÃO DAS ABAS
+# Descrição: Conversões aplicadas uma única vez quando a aba é carregada
+#            (tipos declarados por aba e datas em texto -> colunas datetime)
+# ============================================================================
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+# Texto guardado em Arrow, com NaN para célula vazia (mesmo comportamento do
+# dtype "str" padrão do pandas 3)
+TEXTO = pd.StringDtype("pyarrow", na_value=np.nan)
+
+# Abas de clientes (a classificação nelas tem um espaço no fim do nome)
+ABAS_CLIENTES = ["Total", "Novo", "Promissor", "Leal", "Campeão", "Em risco", "Dormente"]
+
+_CLIENTES = {
+    'Nome': 'texto',
+    'Email': 'texto',
+    'Valor': 'numero',
+    'Compras': 'numero',
+    'Dias desde a compra': 'numero',
+    'Classificação ': 'categoria',
+}
+
+_ATENDIMENTOS = {
+    'ID_Agendamento': 'texto',
+    'Data de contato': 'texto',
+    'Nome': 'texto',
+    'Classificação': 'categoria',
+    'Valor': 'numero',
+    'Relato da conversa': 'texto',
+    'Follow up': 'categoria',
+    'Data de chamada': 'texto',
+    'Observação': 'texto',
+}
+
+# Tipo de cada coluna por aba: 'numero' (float, texto inválido vira NaN),
+# 'categoria' (poucos valores repetidos) ou 'texto'. Colunas não declaradas,
+# como Telefone, ficam como vieram da planilha.
+ESQUEMAS = {
+    **{aba: _CLIENTES for aba in ABAS_CLIENTES},
+    'AGENDAMENTOS_ATIVOS': _ATENDIMENTOS,
+    'HISTORICO': {**_ATENDIMENTOS, 'Data de conclusão': 'texto', 'Data de finalização': 'texto'},
+    'SUPORTE': {
+        'ID_Ticket': 'texto',
+        'Nome': 'texto',
+        'Classificação': 'categoria',
+        'Tipo_Problema': 'categoria',
+        'Prioridade': 'categoria',
+        'Status': 'categoria',
+        'Descrição do problema': 'texto',
+        'Data de abertura': 'texto',
+        'Progresso': 'numero',
+        'Observações': 'texto',
+    },
+}
+
+# Formatos aceitos em 'Data de chamada', na ordem de tentativa
+FORMATOS_DATA = ['%d/%m/%Y', '%Y/%m/%d', '%Y-%m-%d']
+
+# Colunas derivadas (prefixo "_") criadas ao carregar cada aba: destino -> origem
+COLUNAS_DATA = {
+    'AGENDAMENTOS_ATIVOS': {'_Data_Chamada': 'Data de chamada'},
+}
+
+
+# Versão das conversões abaixo: incrementar ao mudar um conversor ou o
+# tratamento das datas, para descartar as abas preparadas gravadas em disco
+VERSAO_PREPARACAO = 1
+
+
+def formato_preparacao():
+    """Chave do formato das abas preparadas (esquemas, datas e VERSAO_PREPARACAO)
+
+    Gravada junto com a cópia em disco de cada aba: um arquivo com outra
+    chave foi preparado por outra versão do código e não é usado.
+    """
+    conteudo = json.dumps([VERSAO_PREPARACAO, ESQUEMAS, FORMATOS_DATA, COLUNAS_DATA], sort_keys=True)
+    return hashlib.blake2b(conteudo.encode(), digest_size=8).hexdigest()
+
+
+def normalizar_datas(valores, formatos=FORMATOS_DATA):
+    """Converte uma coluna de datas em texto (vários formatos) para datetime
+
+    Cada formato é aplicado de forma vetorizada apenas às linhas que os
+    formatos anteriores não reconheceram. Valores inválidos viram NaT.
+    """
+    valores = pd.Series(valores)
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return valores.dt.normalize()
+
+    texto = valores.astype('string').str.strip()
+    datas = pd.Series(pd.NaT, index=valores.index, dtype='datetime64[ns]')
+    for formato in formatos:
+        faltando = datas.isna() & texto.notna()
+        if not faltando.any():
+            break
+        datas[faltando] = pd.to_datetime(texto[faltando], format=formato, errors='coerce')
+    return datas
+
+
+def converter_numeros(valores):
+    """Converte uma coluna para float de forma vetorizada
+
+    Aceita números, texto com ponto decimal ("1234.5") e no formato
+    brasileiro ("R$ 1.234,56"). Vazios e textos inválidos viram NaN.
+    """
+    valores = pd.Series(valores)
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores.astype('float64')
+
+    texto = valores.astype(TEXTO).str.strip().str.replace(r'^R\$\s*', '', regex=True)
+    numeros = pd.to_numeric(texto, errors='coerce')
+    faltando = numeros.isna() & texto.notna() & (texto != '')
+    if faltando.any():
+        brasileiro = texto[faltando].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        numeros[faltando] = pd.to_numeric(brasileiro, errors='coerce')
+    return pd.Series(numeros.to_numpy(dtype='float64', na_value=np.nan), index=valores.index)
+
+
+def converter_texto(valores):
+    """Texto Arrow; números inteiros vindos como float perdem o '.0'"""
+    valores = pd.Series(valores)
+    if pd.api.types.is_float_dtype(valores):
+        valores = valores.astype('Int64') if (valores.dropna() % 1 == 0).all() else valores
+    return valores.astype(TEXTO)
+
+
+def converter_categoria(valores):
+    """Categoria quando há poucos valores distintos; senão texto"""
+    texto = converter_texto(valores)
+    if texto.nunique() <= max(1, len(texto) // 2):
+        return texto.astype('category')
+    return texto
+
+
+CONVERSORES = {
+    'numero': converter_numeros,
+    'texto': converter_texto,
+    'categoria': converter_categoria,
+}
+
+
+def aplicar_esquema(nome_aba, df):
+    """Converte as colunas declaradas em ESQUEMAS para os tipos compactos"""
+    convertidas = {
+        col: CONVERSORES[tipo](df[col])
+        for col, tipo in ESQUEMAS.get(nome_aba, {}).items()
+        if col in df.columns
+    }
+    return df.assign(**convertidas) if convertidas else df
+
+
+def preparar_aba(nome_aba, df):
+    """Aplica o esquema da aba e acrescenta as colunas derivadas (ex.: datas já convertidas)"""
+    df = aplicar_esquema(nome_aba, df)
+    derivadas = {
+        destino: normalizar_datas(df[origem])
+        for destino, origem in COLUNAS_DATA.get(nome_aba, {}).items()
+        if origem in df.columns
+    }
+    return df.assign(**derivadas) if derivadas else df
+
+
+def registro(linha):
+    """Converte uma linha (Series/dict) em dicionário para gravação, sem as colunas derivadas"""
+    return {col: valor for col, valor in dict(linha).items() if not str(col).startswith('_')}
@@ -4,130 +4,236 @@ from datetime import datetime
 import pytz
 import os
 import json
+import argparse
+
+from armazenamento import ArmazenamentoSQLite, carregar_abas, criar_armazenamento, sincronizar_abas
+from cache_dados import CacheAbas
+from cache_disco import CacheDisco
+from segmentos import Segmentos
+
+ABAS_SEGMENTOS = {
+    'Total_Novo': "Novo",
+    'Total_Promissor': "Promissor",
+    'Total_Leal': "Leal",
+    'Total_Campeao': "Campeão",
+    'Total_EmRisco': "Em risco",
+    'Total_Dormente': "Dormente",
+    'Total_Clientes': "Total",
+}
+
+ABAS_OPERACIONAIS = [
+    "LOG_CHECKINS", "AGENDAMENTOS_ATIVOS", "HISTORICO", "SUPORTE", "LOG_CONVERSOES"
+]
+
+# Contador diário -> (aba, coluna de data, comparar só os 10 primeiros caracteres)
+CONTADORES_DIARIOS = {
+    'CheckIns_Realizados': ("LOG_CHECKINS", 'Data_Checkin', False),
+    'Agendamentos_Criados': ("AGENDAMENTOS_ATIVOS", 'Data de contato', False),
+    'Agendamentos_Concluidos': ("HISTORICO", 'Data de conclusão', True),
+    'Tickets_Abertos': ("SUPORTE", 'Data de abertura', False),
+    'Conversoes_Dia': ("LOG_CONVERSOES", 'Data_Conversao', False),
+}
+
+# Coluna de classificação em Total (na planilha ela tem um espaço no fim)
+COLUNA_CLASSIFICACAO = 'Classificação '
+
+# Abas copiadas por --exportar-sqlite / --importar-sqlite
+ABAS_SINCRONIZADAS = ["Total"] + ABAS_OPERACIONAIS + ["HISTORICO_METRICAS"]
 
 def get_gsheets_connection():
     """Conexão com Google Sheets usando credenciais do GitHub Secrets"""
     credentials_json = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
     if not credentials_json:
         raise Exception("❌ GOOGLE_SHEETS_CREDENTIALS não encontrado!")
-    
+
     # Cria objeto de credenciais
     credentials_dict = json.loads(credentials_json)
     conn = GSheetsConnection("gsheets", {"credentials": credentials_dict})
     return conn
 
+def get_armazenamento():
+    """Backend de armazenamento (Google Sheets por padrão, SQLite via CRM_ARMAZENAMENTO=sqlite)"""
+    return criar_armazenamento(conectar_gsheets=get_gsheets_connection)
+
+def sincronizar_sqlite(caminho, importar=False, abas=None):
+    """Copia as abas do backend configurado para o SQLite em `caminho` (ou de volta, com `importar`)"""
+    armazenamento = get_armazenamento()
+    sqlite = ArmazenamentoSQLite(caminho)
+    origem, destino = (sqlite, armazenamento) if importar else (armazenamento, sqlite)
+    abas = abas or ABAS_SINCRONIZADAS
+    sincronizar_abas(origem, destino, abas)
+    print(f"✅ {len(abas)} aba(s) {'importada(s) de' if importar else 'exportada(s) para'} {caminho}")
+
+def get_cache_abas(conn):
+    """Cache das abas, com cópia em disco só quando CRM_CACHE_DIR está definido
+
+    Com o disco, cada aba gravada por uma execução anterior é revalidada
+    pela revisão e só é baixada de novo se mudou desde então. No GitHub
+    Actions a variável não é definida: as abas têm dados de clientes e não
+    devem ir para o cache do Actions.
+    """
+    return CacheAbas(
+        lambda aba: conn.read(worksheet=aba, ttl=0),
+        ttl=0,
+        max_defasagem=0,
+        revisao=conn.revision,
+        disco=CacheDisco("snapshot") if os.getenv("CRM_CACHE_DIR") else None
+    )
+
+def contar_por_data(df, coluna, datas, somente_data=False):
+    """Conta as linhas de `df` por valor de `coluna` para cada data da lista
+
+    Um único value_counts por coluna atende qualquer quantidade de datas.
+    """
+    if df.empty or coluna not in df.columns:
+        return pd.Series(0, index=datas)
+
+    valores = df[coluna].astype(str)
+    if somente_data:
+        valores = valores.str[:10]
+    return valores.value_counts().reindex(datas, fill_value=0)
+
+def calcular_snapshots(datas, contagens, abas):
+    """Monta as linhas de HISTORICO_METRICAS para todas as datas informadas"""
+    contadores = pd.DataFrame({
+        nome: contar_por_data(abas[aba], coluna, datas, somente_data)
+        for nome, (aba, coluna, somente_data) in CONTADORES_DIARIOS.items()
+    })
+
+    df_suporte = abas["SUPORTE"]
+
+    snapshots = []
+    for data_snapshot in datas:
+        snapshot = {'Data': data_snapshot}
+        for campo, aba in ABAS_SEGMENTOS.items():
+            snapshot[campo] = contagens[aba]
+
+        snapshot.update({
+            'CheckIns_Realizados': int(contadores.at[data_snapshot, 'CheckIns_Realizados']),
+            'Meta_Dia': 0,  # ajuste se tiver lógica específica
+            'Agendamentos_Criados': int(contadores.at[data_snapshot, 'Agendamentos_Criados']),
+            'Agendamentos_Concluidos': int(contadores.at[data_snapshot, 'Agendamentos_Concluidos']),
+            'Tickets_Abertos': int(contadores.at[data_snapshot, 'Tickets_Abertos']),
+            'Tickets_Resolvidos': 0,  # ajuste conforme necessário
+            'Tickets_Pendentes': len(df_suporte),
+            'Conversoes_Dia': int(contadores.at[data_snapshot, 'Conversoes_Dia'])
+        })
+        snapshots.append(snapshot)
+
+    return snapshots
+
+def salvar_snapshots(conn, snapshots, df_metricas=None):
+    """Grava os snapshots em HISTORICO_METRICAS com upsert pela coluna 'Data'
+
+    Apenas as linhas das datas informadas são escritas. Quando
+    `df_metricas` é informado, datas que já têm linha mantêm os totais de
+    clientes/tickets registrados na época (só os contadores diários são
+    recalculados).
+    """
+    if df_metricas is not None and not df_metricas.empty and 'Data' in df_metricas.columns:
+        existentes = df_metricas.drop_duplicates('Data').set_index('Data')
+        campos_preservados = list(ABAS_SEGMENTOS) + ['Meta_Dia', 'Tickets_Resolvidos', 'Tickets_Pendentes']
+        for snapshot in snapshots:
+            if snapshot['Data'] in existentes.index:
+                for campo in campos_preservados:
+                    if campo in existentes.columns and pd.notna(existentes.at[snapshot['Data'], campo]):
+                        snapshot[campo] = existentes.at[snapshot['Data'], campo]
+
+    conn.upsert_rows("HISTORICO_METRICAS", 'Data', snapshots)
+
+def carregar_dados_snapshot(conn, abas_extras=()):
+    """Carrega contagens por classificação e as abas operacionais"""
+    print("📊 Carregando dados das abas...")
+
+    # Abas operacionais em paralelo (tempo ≈ aba mais lenta); as que não
+    # mudaram desde a última execução vêm do cache em disco
+    abas = carregar_abas(ABAS_OPERACIONAIS + list(abas_extras), get_cache_abas(conn).get)
+
+    # Totais por classificação contados na coluna de classificação de Total,
+    # e não nas abas de cada segmento: uma coluna só é baixada e as
+    # contagens sempre somam o total
+    classificacao = conn.read_column("Total", COLUNA_CLASSIFICACAO)
+    segmentos = Segmentos(classificacao.to_frame())
+    contagens = {**segmentos.contagens(), "Total": segmentos.total}
+
+    return contagens, abas
+
 def gerar_snapshot_diario(data_especifica=None):
     """Gera snapshot de todas as métricas do dia e salva em HISTORICO_METRICAS"""
     try:
         timezone_brasilia = pytz.timezone('America/Sao_Paulo')
         agora = datetime.now(timezone_brasilia)
-        
+
         if data_especifica:
             data_snapshot = data_especifica
         else:
             data_snapshot = agora.strftime('%d/%m/%Y')
-        
+
         print(f"📅 Gerando snapshot para: {data_snapshot}")
-        
-        conn = get_gsheets_connection()
-        
-        # Carregar abas de clientes
-        print("📊 Carregando dados das abas...")
-        df_novo = conn.read(worksheet="Novo", ttl=0)
-        df_promissor = conn.read(worksheet="Promissor", ttl=0)
-        df_leal = conn.read(worksheet="Leal", ttl=0)
-        df_campeao = conn.read(worksheet="Campeão", ttl=0)
-        df_emrisco = conn.read(worksheet="Em risco", ttl=0)
-        df_dormente = conn.read(worksheet="Dormente", ttl=0)
-        df_total = conn.read(worksheet="Total", ttl=0)
-        
-        # Outras abas operacionais
-        df_log_checkins = conn.read(worksheet="LOG_CHECKINS", ttl=0)
-        df_agendamentos = conn.read(worksheet="AGENDAMENTOS_ATIVOS", ttl=0)
-        df_historico = conn.read(worksheet="HISTORICO", ttl=0)
-        df_suporte = conn.read(worksheet="SUPORTE", ttl=0)
-        df_conversoes = conn.read(worksheet="LOG_CONVERSOES", ttl=0)
-        
-        # Totais de clientes por classificação
-        total_novo = len(df_novo)
-        total_promissor = len(df_promissor)
-        total_leal = len(df_leal)
-        total_campeao = len(df_campeao)
-        total_emrisco = len(df_emrisco)
-        total_dormente = len(df_dormente)
-        total_clientes = len(df_total)
-        
-        print(f"👥 Clientes: Novo={total_novo}, Promissor={total_promissor}, Leal={total_leal}")
-        
-        # Check-ins do dia
-        checkins_realizados = 0
-        if not df_log_checkins.empty and 'Data_Checkin' in df_log_checkins.columns:
-            checkins_realizados = len(df_log_checkins[df_log_checkins['Data_Checkin'] == data_snapshot])
-        
-        # Meta do dia (simplificado, sem session_state)
-        meta_dia = 0  # ajuste se tiver lógica específica
-        
-        # Agendamentos criados no dia
-        agendamentos_criados = 0
-        if not df_agendamentos.empty and 'Data de contato' in df_agendamentos.columns:
-            agendamentos_criados = len(df_agendamentos[df_agendamentos['Data de contato'] == data_snapshot])
-        
-        # Agendamentos concluídos no dia
-        agendamentos_concluidos = 0
-        if not df_historico.empty and 'Data de conclusão' in df_historico.columns:
-            df_hist_temp = df_historico.copy()
-            df_hist_temp['Data_Simples'] = df_hist_temp['Data de conclusão'].astype(str).str[:10]
-            agendamentos_concluidos = len(df_hist_temp[df_hist_temp['Data_Simples'] == data_snapshot])
-        
-        # Tickets abertos no dia
-        tickets_abertos = 0
-        if not df_suporte.empty and 'Data de abertura' in df_suporte.columns:
-            tickets_abertos = len(df_suporte[df_suporte['Data de abertura'] == data_snapshot])
-        
-        # Tickets pendentes
-        tickets_pendentes = len(df_suporte)
-        tickets_resolvidos = 0  # ajuste conforme necessário
-        
-        # Conversões do dia
-        conversoes_dia = 0
-        if not df_conversoes.empty and 'Data_Conversao' in df_conversoes.columns:
-            conversoes_dia = len(df_conversoes[df_conversoes['Data_Conversao'] == data_snapshot])
-        
-        snapshot = {
-            'Data': data_snapshot,
-            'Total_Novo': total_novo,
-            'Total_Promissor': total_promissor,
-            'Total_Leal': total_leal,
-            'Total_Campeao': total_campeao,
-            'Total_EmRisco': total_emrisco,
-            'Total_Dormente': total_dormente,
-            'Total_Clientes': total_clientes,
-            'CheckIns_Realizados': checkins_realizados,
-            'Meta_Dia': meta_dia,
-            'Agendamentos_Criados': agendamentos_criados,
-            'Agendamentos_Concluidos': agendamentos_concluidos,
-            'Tickets_Abertos': tickets_abertos,
-            'Tickets_Resolvidos': tickets_resolvidos,
-            'Tickets_Pendentes': tickets_pendentes,
-            'Conversoes_Dia': conversoes_dia
-        }
-        
-        # Salvar no HISTORICO_METRICAS
-        df_metricas = conn.read(worksheet="HISTORICO_METRICAS", ttl=0)
-        if not df_metricas.empty and 'Data' in df_metricas.columns:
-            df_metricas = df_metricas[df_metricas['Data'] != data_snapshot]
-        
-        df_metricas_novo = pd.concat([df_metricas, pd.DataFrame([snapshot])], ignore_index=True)
-        conn.update(worksheet="HISTORICO_METRICAS", data=df_metricas_novo)
-        
+
+        conn = get_armazenamento()
+        contagens, abas = carregar_dados_snapshot(conn)
+
+        print(f"👥 Clientes: Novo={contagens['Novo']}, Promissor={contagens['Promissor']}, Leal={contagens['Leal']}")
+
+        snapshots = calcular_snapshots([data_snapshot], contagens, abas)
+
+        # Salvar no HISTORICO_METRICAS (somente a linha da data)
+        salvar_snapshots(conn, snapshots)
+
         print(f"✅ Snapshot salvo com sucesso para {data_snapshot}!")
         return True
-        
+
     except Exception as e:
         print(f"❌ Erro ao gerar snapshot: {e}")
         import traceback
         print(traceback.format_exc())
         return False
 
+def gerar_snapshots_periodo(data_inicio, data_fim):
+    """Recalcula HISTORICO_METRICAS para todas as datas do período (DD/MM/AAAA)
+
+    As abas são carregadas uma única vez e todas as linhas são gravadas
+    em uma única escrita (upsert por data). Datas que já têm snapshot mantêm os totais de
+    clientes da época; datas sem snapshot recebem os totais atuais.
+    """
+    try:
+        inicio = datetime.strptime(data_inicio, '%d/%m/%Y')
+        fim = datetime.strptime(data_fim, '%d/%m/%Y')
+        if fim < inicio:
+            raise ValueError("Data final anterior à data inicial")
+
+        datas = [d.strftime('%d/%m/%Y') for d in pd.date_range(inicio, fim, freq='D')]
+        print(f"📅 Gerando snapshots de {data_inicio} a {data_fim} ({len(datas)} dias)")
+
+        conn = get_armazenamento()
+        contagens, abas = carregar_dados_snapshot(conn, abas_extras=["HISTORICO_METRICAS"])
+
+        snapshots = calcular_snapshots(datas, contagens, abas)
+        salvar_snapshots(conn, snapshots, df_metricas=abas["HISTORICO_METRICAS"])
+
+        print(f"✅ {len(snapshots)} snapshots salvos com sucesso!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Erro ao gerar snapshots do período: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return False
+
 if __name__ == "__main__":
-    gerar_snapshot_diario()
+    parser = argparse.ArgumentParser(description="Gera snapshots em HISTORICO_METRICAS")
+    parser.add_argument("--data", help="Data do snapshot (DD/MM/AAAA); padrão: hoje")
+    parser.add_argument("--inicio", help="Início do período para reprocessar (DD/MM/AAAA)")
+    parser.add_argument("--fim", help="Fim do período para reprocessar (DD/MM/AAAA); padrão: início")
+    parser.add_argument("--exportar-sqlite", metavar="CAMINHO", help="Copia as abas para um banco SQLite local")
+    parser.add_argument("--importar-sqlite", metavar="CAMINHO", help="Copia as abas de um banco SQLite local de volta")
+    parser.add_argument("--abas", nargs="+", help="Abas copiadas (padrão: Total, operacionais e HISTORICO_METRICAS)")
+    args = parser.parse_args()
+
+    if args.exportar_sqlite or args.importar_sqlite:
+        sincronizar_sqlite(args.importar_sqlite or args.exportar_sqlite, bool(args.importar_sqlite), args.abas)
+    elif args.inicio:
+        gerar_snapshots_periodo(args.inicio, args.fim or args.inicio)
+    else:
+        gerar_snapshot_diario(args.data)
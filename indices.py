@@ -0,0 +1,254 @@
+# ============================================================================
+# CRM PÓS-VENDAS - ÍNDICES DE BUSCA
+# Descrição: Estruturas pré-calculadas para buscas rápidas nas abas
+#            (IDs, telefone normalizado e trigramas de nomes -> posições
+#            das linhas)
+# ============================================================================
+
+import hashlib
+import sys
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Menor sufixo de telefone considerado quando o termo tem mais dígitos que o
+# telefone cadastrado (ex.: termo com 55 + DDD e cadastro só com o número)
+MIN_DIGITOS_SUFIXO = 8
+
+# Fração mínima dos trigramas do termo que um nome precisa conter
+COBERTURA_MINIMA_NOME = 0.6
+
+# Termos menores que isso são buscados por varredura linear (substring)
+TAMANHO_MINIMO_TRIGRAMAS = 3
+
+
+def versao_dados(dados):
+    """Impressão digital do conteúdo de um DataFrame/Series
+
+    Usada como chave de cache dos índices: muda sempre que o conteúdo muda,
+    inclusive quando só a ordem das linhas muda (os índices guardam
+    posições iloc).
+    """
+    hashes = pd.util.hash_pandas_object(dados, index=False).to_numpy()
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+
+def normalizar_telefones(telefones):
+    """Versão vetorizada de limpar_telefone: mantém apenas os dígitos"""
+    telefones = pd.Series(telefones)
+    if pd.api.types.is_numeric_dtype(telefones):
+        telefones = telefones.astype('Int64')
+    return (
+        telefones.astype('string')
+        .fillna('')
+        .str.replace(r'\.0$', '', regex=True)
+        .str.replace(r'\D', '', regex=True)
+        .astype(object)
+    )
+
+
+class IndiceTelefone:
+    """Mapeia telefone normalizado -> posições (iloc) das linhas de uma aba
+
+    Busca exata em O(1) pelo dicionário, por sufixo (telefone digitado sem
+    DDI/DDD) sobre os telefones invertidos e ordenados e por prefixo (número
+    digitado pela metade) sobre os telefones ordenados, ambas em O(log n)
+    mais o número de resultados.
+    """
+
+    def __init__(self, telefones):
+        normalizados = normalizar_telefones(telefones).to_numpy()
+        posicoes = pd.Series(np.arange(len(normalizados))).groupby(normalizados, sort=False).indices
+        posicoes.pop('', None)
+
+        self._posicoes = posicoes
+        self._ordenados = sorted(posicoes)
+        self._invertidos = sorted(tel[::-1] for tel in posicoes)
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def exato(self, telefone):
+        """Posições das linhas com exatamente este telefone normalizado"""
+        return self._posicoes.get(telefone, np.array([], dtype=np.intp))
+
+    @staticmethod
+    def _com_inicio(ordenados, inicio_busca):
+        """Itens de uma lista ordenada que começam com `inicio_busca`"""
+        encontrados = []
+        for tel in ordenados[bisect_left(ordenados, inicio_busca):]:
+            if not tel.startswith(inicio_busca):
+                break
+            encontrados.append(tel)
+        return encontrados
+
+    def _com_sufixo(self, digitos):
+        """Telefones cadastrados que terminam com os dígitos informados"""
+        return [tel[::-1] for tel in self._com_inicio(self._invertidos, digitos[::-1])]
+
+    def _com_prefixo(self, digitos):
+        """Telefones cadastrados que começam com os dígitos informados"""
+        return self._com_inicio(self._ordenados, digitos)
+
+    def buscar(self, termo):
+        """Posições (em ordem de linha) dos cadastros que batem com o telefone
+
+        Considera o telefone exato, cadastros que começam ou terminam com o
+        termo e, se o termo tiver dígitos a mais (DDI/DDD), cadastros iguais
+        a um sufixo do termo.
+        """
+        digitos = ''.join(c for c in str(termo) if c.isdigit())
+        if not digitos:
+            return np.array([], dtype=np.intp)
+
+        telefones = set(self._com_sufixo(digitos)) | set(self._com_prefixo(digitos))
+        for tamanho in range(len(digitos) - 1, MIN_DIGITOS_SUFIXO - 1, -1):
+            if digitos[-tamanho:] in self._posicoes:
+                telefones.add(digitos[-tamanho:])
+
+        if not telefones:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate([self._posicoes[tel] for tel in telefones]))
+
+
+def normalizar_chave(valor):
+    """Chave de ID para comparação: texto sem espaços nas bordas, em maiúsculas"""
+    return '' if valor is None or pd.isna(valor) else str(valor).strip().upper()
+
+
+class IndiceChave:
+    """Mapeia o valor de uma coluna de ID (ex.: ID_Ticket) -> posições (iloc)
+
+    Busca exata em O(1) pelo dicionário; IDs repetidos na planilha devolvem
+    todas as linhas.
+    """
+
+    def __init__(self, valores):
+        normalizados = (
+            pd.Series(valores).astype('string').fillna('')
+            .str.strip().str.upper()
+            .astype(object).to_numpy()
+        )
+        posicoes = pd.Series(np.arange(len(normalizados))).groupby(normalizados, sort=False).indices
+        posicoes.pop('', None)
+        self._posicoes = posicoes
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def exato(self, chave):
+        """Posições das linhas com exatamente este ID (sem diferenciar maiúsculas)"""
+        return self._posicoes.get(normalizar_chave(chave), np.array([], dtype=np.intp))
+
+
+def dobrar_acentos(texto):
+    """Minúsculas, sem acentos e com espaços simples: 'João  Simões' -> 'joao simoes'"""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+@lru_cache(maxsize=1)
+def _tabela_marcas():
+    """Tabela de str.translate que remove as marcas combinantes (acentos após NFKD)"""
+    return {c: None for c in range(sys.maxunicode + 1) if unicodedata.combining(chr(c))}
+
+
+def normalizar_nomes(nomes):
+    """Versão vetorizada de dobrar_acentos para uma coluna inteira
+
+    Remove as mesmas marcas combinantes que dobrar_acentos (letras que não
+    se decompõem, como 'ø', são mantidas dos dois lados da busca).
+    """
+    return (
+        pd.Series(nomes).astype('string').fillna('')
+        .str.normalize('NFKD')
+        .str.translate(_tabela_marcas())
+        .str.lower()
+        .str.split().str.join(' ')
+        .astype(object)
+    )
+
+
+def _trigramas(texto, completo=True):
+    """Trigramas de cada palavra, com espaço nas bordas (' jo', 'joa', 'oao', 'ao ')
+
+    Com `completo=False` a última palavra não ganha a borda final, para que
+    um termo ainda sendo digitado ('sil') case com o início da palavra.
+    """
+    palavras = texto.split()
+    trigramas = set()
+    for i, palavra in enumerate(palavras):
+        ultima = i == len(palavras) - 1
+        marcada = f" {palavra} " if (completo or not ultima) else f" {palavra}"
+        for j in range(len(marcada) - 2):
+            trigramas.add(marcada[j:j + 3])
+    return trigramas
+
+
+class IndiceNomes:
+    """Índice invertido de trigramas sobre nomes sem acento
+
+    A busca conta, para cada linha candidata, quantos trigramas do termo
+    ela contém (np.unique sobre as listas de posições desses trigramas) e
+    ordena por cobertura, então o custo depende do tamanho das listas dos
+    trigramas do termo e não do número de linhas. 'Joao' encontra 'João' e pequenos erros de digitação
+    ainda retornam o nome certo.
+    """
+
+    def __init__(self, nomes):
+        self._nomes = normalizar_nomes(nomes).to_numpy()
+
+        postings = defaultdict(list)
+        for posicao, nome in enumerate(self._nomes):
+            for trigrama in _trigramas(nome):
+                postings[trigrama].append(posicao)
+        self._postings = {t: np.asarray(p, dtype=np.int64) for t, p in postings.items()}
+
+    def __len__(self):
+        return len(self._nomes)
+
+    def _buscar_curto(self, consulta, limite):
+        """Termos com menos de 3 caracteres não formam trigramas: busca linear
+
+        Nomes que contêm o termo, primeiro os que começam com ele e os mais curtos.
+        """
+        contem = np.fromiter((consulta in nome for nome in self._nomes), dtype=bool, count=len(self._nomes))
+        candidatos = np.flatnonzero(contem)
+        nomes = self._nomes[candidatos]
+        inicio = np.fromiter((nome.startswith(consulta) for nome in nomes), dtype=bool, count=len(nomes))
+        tamanhos = np.fromiter((len(nome) for nome in nomes), dtype=np.int64, count=len(nomes))
+        resultado = candidatos[np.lexsort((candidatos, tamanhos, ~inicio))]
+        return resultado[:limite] if limite else resultado
+
+    def buscar(self, termo, limite=None):
+        """Posições das linhas ordenadas por relevância (mais relevantes primeiro)"""
+        consulta = dobrar_acentos(termo)
+        if not consulta or len(self._nomes) == 0:
+            return np.array([], dtype=np.intp)
+        if len(consulta) < TAMANHO_MINIMO_TRIGRAMAS:
+            return self._buscar_curto(consulta, limite)
+
+        trigramas = _trigramas(consulta, completo=False)
+        listas = [self._postings[t] for t in trigramas if t in self._postings]
+        if not listas:
+            return np.array([], dtype=np.intp)
+
+        candidatos, acertos = np.unique(np.concatenate(listas), return_counts=True)
+        suficientes = acertos >= max(1, np.ceil(COBERTURA_MINIMA_NOME * len(trigramas)))
+        candidatos, acertos = candidatos[suficientes], acertos[suficientes]
+        if len(candidatos) == 0:
+            return np.array([], dtype=np.intp)
+
+        nomes = self._nomes[candidatos]
+        contem = np.fromiter((consulta in nome for nome in nomes), dtype=bool, count=len(nomes))
+        tamanhos = np.fromiter((len(nome) for nome in nomes), dtype=np.int64, count=len(nomes))
+
+        # np.lexsort ordena pela última chave primeiro
+        ordem = np.lexsort((candidatos, tamanhos, -acertos, ~contem))
+        resultado = candidatos[ordem]
+        return resultado[:limite] if limite else resultado
@@ -0,0 +1,156 @@
+# ============================================================================
+# CRM PÓS-VENDAS - RESUMO POR CLIENTE
+# Descrição: Aba RESUMO_CLIENTES com uma linha por telefone (atendimentos
+#            finalizados, agendamentos ativos, tickets e último contato),
+#            atualizada linha a linha a cada escrita do app
+# ============================================================================
+
+from datetime import datetime
+
+import pandas as pd
+
+from esquema import normalizar_datas
+from visao_cliente import chave_telefone, chaves_telefone
+
+ABA_RESUMO = "RESUMO_CLIENTES"
+
+# Contadores -> aba de onde vêm quando o resumo é recalculado do zero
+CONTADORES_RESUMO = {
+    'Atendimentos_Finalizados': "HISTORICO",
+    'Agendamentos_Ativos': "AGENDAMENTOS_ATIVOS",
+    'Tickets_Abertos': "SUPORTE",
+}
+COLUNAS_RESUMO = ['Telefone', *CONTADORES_RESUMO, 'Ultimo_Contato']
+
+# Colunas com datas de contato consideradas no recálculo
+DATAS_CONTATO = {
+    "HISTORICO": ['Data de contato', 'Data de conclusão', 'Data de finalização'],
+    "AGENDAMENTOS_ATIVOS": ['Data de contato'],
+}
+
+FORMATO_DATA = '%d/%m/%Y'
+
+
+def _datas(valores):
+    """Datas em texto ('dd/mm/aaaa' com ou sem hora) -> datetime (NaT se inválida)"""
+    return normalizar_datas(pd.Series(valores).astype('string').str[:10])
+
+
+def calcular_resumo(abas):
+    """Resumo completo a partir de {aba: DataFrame} (HISTORICO, AGENDAMENTOS_ATIVOS, SUPORTE)
+
+    Usado para criar a aba ou corrigi-la; no dia a dia ela é mantida por
+    `atualizar_linha` a cada escrita.
+    """
+    contagens = {}
+    ultimos = []
+    for coluna, nome_aba in CONTADORES_RESUMO.items():
+        df = abas.get(nome_aba, pd.DataFrame())
+        if df.empty or 'Telefone' not in df.columns:
+            continue
+        chaves = chaves_telefone(df['Telefone'])
+        contagens[coluna] = chaves.value_counts()
+        for coluna_data in DATAS_CONTATO.get(nome_aba, []):
+            if coluna_data in df.columns:
+                ultimos.append(_datas(df[coluna_data]).groupby(chaves.to_numpy()).max())
+
+    resumo = pd.DataFrame(contagens, columns=list(CONTADORES_RESUMO)).fillna(0).astype(int)
+    if ultimos:
+        ultimo = pd.concat(ultimos, axis=1).max(axis=1).reindex(resumo.index)
+    else:
+        ultimo = pd.Series(pd.NaT, index=resumo.index)
+    resumo['Ultimo_Contato'] = ultimo.dt.strftime(FORMATO_DATA).fillna('')
+
+    resumo = resumo.drop(index='', errors='ignore')
+    return resumo.rename_axis('Telefone').reset_index()[COLUNAS_RESUMO]
+
+
+def linha_calculada(telefone, registros):
+    """Linha do cliente calculada nos seus registros ({aba: DataFrame} da visão 360)
+
+    Usada para clientes que ainda não estão no resumo: a primeira escrita
+    parte dos números reais, e não de contadores zerados.
+    """
+    resumo = calcular_resumo(registros)
+    if resumo.empty:
+        return atualizar_linha(None, telefone)
+    return resumo.iloc[0].to_dict()
+
+
+def atualizar_linha(atual, telefone, finalizados=0, ativos=0, tickets=0, contato=None):
+    """Nova linha do cliente: a atual (dict ou None) com as variações aplicadas
+
+    `contato` (datetime) substitui o último contato; contadores nunca ficam
+    negativos.
+    """
+    atual = atual or {}
+    linha = {'Telefone': chave_telefone(telefone)}
+    for coluna, variacao in zip(CONTADORES_RESUMO, (finalizados, ativos, tickets)):
+        valor = pd.to_numeric(atual.get(coluna), errors='coerce')
+        linha[coluna] = max(0, int(valor if pd.notna(valor) else 0) + variacao)
+    ultimo = atual.get('Ultimo_Contato', '')
+    linha['Ultimo_Contato'] = contato.strftime(FORMATO_DATA) if contato else (ultimo if pd.notna(ultimo) else '')
+    return linha
+
+
+class ResumoClientes:
+    """Consulta ao RESUMO_CLIENTES carregado: telefone -> linha em O(1)"""
+
+    def __init__(self, df):
+        self.df = df
+        if df.empty or 'Telefone' not in df.columns:
+            self._posicoes = {}
+            self._ultimo_contato = pd.Series(dtype='datetime64[ns]', index=pd.Index([], dtype=object))
+            return
+
+        chaves = chaves_telefone(df['Telefone'])
+        self._posicoes = {chave: i for i, chave in enumerate(chaves) if chave}
+        ultimo = df['Ultimo_Contato'] if 'Ultimo_Contato' in df.columns else pd.Series('', index=df.index)
+        ultimo = pd.Series(_datas(ultimo).to_numpy(), index=chaves.to_numpy())
+        self._ultimo_contato = ultimo[~ultimo.index.duplicated()]
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def linha(self, telefone):
+        """Linha do cliente como dict, ou None se ele não está no resumo"""
+        posicao = self._posicoes.get(chave_telefone(telefone))
+        return None if posicao is None else self.df.iloc[posicao].to_dict()
+
+    def com_linhas(self, linhas):
+        """DataFrame do resumo com as linhas (dicts) gravadas aplicadas
+
+        A linha de um cliente que já está no resumo substitui a atual; as
+        demais entram no fim, como no upsert da aba.
+        """
+        if self.df.empty:
+            return pd.DataFrame(linhas, columns=COLUNAS_RESUMO)
+
+        atualizadas = {}  # posição -> linha
+        novas = []
+        for linha in linhas:
+            posicao = self._posicoes.get(chave_telefone(linha['Telefone']))
+            if posicao is None:
+                novas.append(linha)
+            else:
+                atualizadas[posicao] = linha
+
+        df = self.df
+        if atualizadas:
+            posicoes = list(atualizadas)
+            colunas = {}
+            for coluna in COLUNAS_RESUMO[1:]:
+                valores = df[coluna].astype(object) if coluna in df.columns else pd.Series('', index=df.index, dtype=object)
+                valores.iloc[posicoes] = [atualizadas[p][coluna] for p in posicoes]
+                colunas[coluna] = valores
+            df = df.assign(**colunas)
+        if novas:
+            df = pd.concat([df, pd.DataFrame(novas, columns=COLUNAS_RESUMO)], ignore_index=True)
+        return df
+
+    def dias_sem_contato(self, telefones, hoje=None):
+        """Dias desde o último contato de cada telefone (NaN = nunca contatado)"""
+        hoje = pd.Timestamp(hoje or datetime.now()).normalize()
+        ultimo = self._ultimo_contato.reindex(chaves_telefone(telefones).to_numpy())
+        dias = (hoje - pd.to_datetime(ultimo)).dt.days
+        return pd.Series(dias.to_numpy(), index=pd.Series(telefones).index)
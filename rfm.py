@@ -0,0 +1,130 @@
+# ============================================================================
+# CRM PÓS-VENDAS - CLASSIFICAÇÃO RFM
+# Descrição: Segmento de cada cliente calculado no app a partir de recência
+#            ('Dias desde a compra'), frequência ('Compras') e valor ('Valor'),
+#            sem depender das fórmulas da planilha
+# ============================================================================
+
+import numpy as np
+import pandas as pd
+
+from indices import normalizar_nomes
+from segmentos import CLASSIFICACOES, coluna_classificacao
+
+# Limites padrão (sobrescritos por `[rfm]` no secrets.toml)
+LIMITES_PADRAO = {
+    'dias_novo': 30,          # Novo: uma compra, feita há no máximo N dias
+    'dias_em_risco': 90,      # Em risco: sem comprar há mais de N dias
+    'dias_dormente': 180,     # Dormente: sem comprar há mais de N dias
+    'compras_leal': 3,        # Leal: pelo menos N compras
+    'compras_campeao': 5,     # Campeão: pelo menos N compras...
+    'valor_campeao': 1000.0,  # ...somando pelo menos R$ N
+}
+
+
+def validar_limites(limites=None):
+    """Problemas nos limites (lista vazia se estão consistentes)
+
+    As faixas de dias precisam crescer de Novo para Em risco e Dormente, e
+    Campeão exige pelo menos as compras de Leal; senão uma regra esconde a
+    outra no np.select.
+    """
+    limites = {**LIMITES_PADRAO, **(limites or {})}
+    problemas = []
+    if any(limites[chave] <= 0 for chave in ('dias_novo', 'dias_em_risco', 'dias_dormente', 'compras_leal', 'compras_campeao')):
+        problemas.append("dias e compras precisam ser maiores que zero")
+    if limites['valor_campeao'] < 0:
+        problemas.append("o valor mínimo de Campeão não pode ser negativo")
+    if limites['dias_novo'] > limites['dias_em_risco']:
+        problemas.append("os dias de Novo não podem passar dos dias de Em risco")
+    if limites['dias_em_risco'] >= limites['dias_dormente']:
+        problemas.append("os dias de Em risco precisam ser menores que os de Dormente")
+    if limites['compras_leal'] > limites['compras_campeao']:
+        problemas.append("as compras de Leal não podem passar das compras de Campeão")
+    return problemas
+
+
+def _coluna_numerica(df, coluna):
+    """Coluna como float (NaN se não existe ou não é número)"""
+    if coluna not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[coluna], errors='coerce').astype('float64')
+
+
+def classificar(df, limites=None):
+    """Classificação RFM de todos os clientes de uma vez
+
+    As regras são avaliadas na ordem abaixo e vale a primeira que se aplica
+    (np.select): Dormente, Em risco, Campeão, Leal, Novo; quem não se
+    encaixa em nenhuma é Promissor. Clientes sem 'Dias desde a compra'
+    ficam sem classificação (NaN). Limites inconsistentes (ver
+    `validar_limites`) geram ValueError.
+    """
+    problemas = validar_limites(limites)
+    if problemas:
+        raise ValueError(f"Limites RFM inconsistentes: {'; '.join(problemas)}")
+    limites = {**LIMITES_PADRAO, **(limites or {})}
+    dias = _coluna_numerica(df, 'Dias desde a compra').to_numpy()
+    compras = _coluna_numerica(df, 'Compras').fillna(0).to_numpy()
+    valor = _coluna_numerica(df, 'Valor').fillna(0).to_numpy()
+
+    condicoes = [
+        np.isnan(dias),
+        dias > limites['dias_dormente'],
+        dias > limites['dias_em_risco'],
+        (compras >= limites['compras_campeao']) & (valor >= limites['valor_campeao']),
+        compras >= limites['compras_leal'],
+        (compras <= 1) & (dias <= limites['dias_novo']),
+    ]
+    escolhas = [None, "Dormente", "Em risco", "Campeão", "Leal", "Novo"]
+    resultado = np.select(condicoes, escolhas, default="Promissor")
+    return pd.Series(pd.Categorical(resultado, categories=CLASSIFICACOES), index=df.index)
+
+
+def _chaves_telefone(df):
+    """Telefone de cada linha como texto sem espaços nas bordas ('' se vazio)"""
+    return df['Telefone'].astype('string').str.strip().fillna('')
+
+
+def classificacoes_alteradas(df, limites=None):
+    """Clientes cuja classificação calculada difere da gravada em Total
+
+    Retorna um DataFrame com 'Telefone', 'Atual' e 'Nova'. A gravação é
+    feita pelo telefone e altera só a primeira linha com ele, então só essa
+    linha é comparada (ver `telefones_repetidos`). Clientes sem telefone
+    não entram.
+    """
+    colunas = ['Telefone', 'Atual', 'Nova']
+    coluna = coluna_classificacao(df)
+    if df.empty or coluna is None or 'Telefone' not in df.columns:
+        return pd.DataFrame(columns=colunas)
+
+    chaves = _chaves_telefone(df)
+    primeira = (chaves != '') & ~chaves.duplicated()
+
+    nova = classificar(df, limites)
+    atual = df[coluna]
+    mudou = nova.notna() & (normalizar_nomes(atual) != normalizar_nomes(nova))
+
+    return pd.DataFrame({
+        'Telefone': df['Telefone'],
+        'Atual': atual.astype(object),
+        'Nova': nova.astype(object),
+    })[mudou & primeira]
+
+
+def telefones_repetidos(df):
+    """Telefones que aparecem em mais de uma linha de Total (só a primeira é reclassificada)"""
+    if df.empty or 'Telefone' not in df.columns:
+        return []
+    chaves = _chaves_telefone(df)
+    return chaves[(chaves != '') & chaves.duplicated()].unique().tolist()
+
+
+def linhas_reclassificadas(alteradas, coluna='Classificação '):
+    """Linhas para update_rows(aba, 'Telefone', ...) com apenas a nova classificação"""
+    return [
+        {'Telefone': telefone, coluna: nova}
+        for telefone, nova in zip(alteradas['Telefone'], alteradas['Nova'])
+    ]
+
@@ -0,0 +1,58 @@
+# ============================================================================
+# CRM PÓS-VENDAS - SEGMENTOS DE CLIENTES
+# Descrição: Listas por classificação (Novo, Promissor, ...) derivadas da aba
+#            Total, sem ler as abas de cada segmento
+# ============================================================================
+
+import numpy as np
+
+from indices import dobrar_acentos, normalizar_nomes
+
+# Classificações na ordem usada pelo app
+CLASSIFICACOES = ["Novo", "Promissor", "Leal", "Campeão", "Em risco", "Dormente"]
+
+
+def coluna_classificacao(df):
+    """Nome da coluna de classificação em Total (na planilha ela tem um espaço no fim)"""
+    for col in df.columns:
+        if str(col).strip() == 'Classificação':
+            return col
+    return None
+
+
+class Segmentos:
+    """Posições de Total agrupadas por classificação
+
+    A ordenação (estável: dentro do segmento vale a ordem de Total) é feita
+    uma única vez e só as posições são guardadas; `segmento(nome)` monta o
+    DataFrame do segmento na hora com `iloc`, então a única cópia de Total
+    mantida é a do cache. Os rótulos do índice são os de Total, então
+    buscas feitas nos índices de Total se aplicam direto aos segmentos.
+    Valores da planilha são comparados sem acento/caixa/espaços extras.
+    """
+
+    def __init__(self, df_total):
+        coluna = coluna_classificacao(df_total)
+        codigos = np.full(len(df_total), len(CLASSIFICACOES), dtype=np.int64)
+        if coluna is not None:
+            por_chave = {dobrar_acentos(nome): i for i, nome in enumerate(CLASSIFICACOES)}
+            chaves = normalizar_nomes(df_total[coluna])
+            codigos = chaves.map(por_chave).fillna(len(CLASSIFICACOES)).to_numpy(dtype=np.int64)
+
+        self._total = df_total
+        self._ordem = np.argsort(codigos, kind='stable')
+        limites = np.searchsorted(codigos[self._ordem], np.arange(len(CLASSIFICACOES) + 1))
+        self._faixas = {
+            nome: (int(limites[i]), int(limites[i + 1]))
+            for i, nome in enumerate(CLASSIFICACOES)
+        }
+        self.total = len(df_total)
+
+    def segmento(self, nome):
+        """Clientes da classificação (DataFrame vazio se ela não existe)"""
+        inicio, fim = self._faixas.get(nome, (0, 0))
+        return self._total.iloc[self._ordem[inicio:fim]]
+
+    def contagens(self):
+        """{classificação: quantidade de clientes}"""
+        return {nome: fim - inicio for nome, (inicio, fim) in self._faixas.items()}
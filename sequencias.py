@@ -0,0 +1,62 @@
+# ============================================================================
+# CRM PÓS-VENDAS - SEQUÊNCIAS DE IDS
+# Descrição: Números sequenciais (ex.: TKT-2025-00042) entregues a partir de
+#            blocos reservados no armazenamento, sem ler a aba dos registros
+# ============================================================================
+
+import re
+import threading
+
+import pandas as pd
+
+
+def maior_sufixo(valores, prefixo):
+    """Maior N entre os valores no formato '<prefixo>-N' (0 se não houver)
+
+    Usado para iniciar uma sequência a partir dos IDs já existentes.
+    """
+    numeros = (
+        pd.Series(valores, dtype='string')
+        .str.strip()
+        .str.extract(rf'^{re.escape(prefixo)}-(\d+)$')[0]
+    )
+    numeros = pd.to_numeric(numeros, errors='coerce').dropna()
+    return int(numeros.max()) if not numeros.empty else 0
+
+
+class AlocadorSequencias:
+    """Entrega números de sequências nomeadas reservando blocos de `bloco`
+
+    `reservar(sequencia, quantidade, inicial)` (Armazenamento.reserve_sequence)
+    incrementa a sequência de forma atômica e devolve o primeiro número do
+    bloco; os números seguintes do bloco saem da memória, sem nenhuma
+    requisição. Processos diferentes recebem blocos diferentes, então os IDs
+    nunca se repetem; números de um bloco não usado até o processo terminar
+    ficam de fora (a sequência pode ter lacunas, nunca duplicados).
+
+    `inicial` (valor ou função) é o último número já usado antes da
+    sequência existir; só vale na primeira reserva de cada sequência e, se
+    for uma função, é chamada uma vez por sequência no processo.
+    """
+
+    def __init__(self, reservar, bloco=10):
+        self._reservar = reservar
+        self.bloco = bloco
+        self._blocos = {}  # sequência -> (próximo número, último número do bloco)
+        self._iniciais = {}
+        self._lock = threading.Lock()
+
+    def _inicial(self, sequencia, inicial):
+        if sequencia not in self._iniciais:
+            self._iniciais[sequencia] = inicial() if callable(inicial) else inicial
+        return self._iniciais[sequencia]
+
+    def proximo(self, sequencia, inicial=0):
+        """Próximo número da sequência"""
+        with self._lock:
+            proximo, ultimo = self._blocos.get(sequencia, (1, 0))
+            if proximo > ultimo:
+                proximo = self._reservar(sequencia, self.bloco, self._inicial(sequencia, inicial))
+                ultimo = proximo + self.bloco - 1
+            self._blocos[sequencia] = (proximo + 1, ultimo)
+            return proximo
@@ -9,7 +9,24 @@ import streamlit as st
 from streamlit_gsheets import GSheetsConnection
 import pandas as pd
 from datetime import datetime
+import math
+import re
+import threading
 import time
+import uuid
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from armazenamento import carregar_abas, criar_armazenamento
+from cache_dados import CacheAbas
+from cache_disco import CacheDisco
+from esquema import formato_preparacao, preparar_aba, registro
+from indices import IndiceChave, IndiceNomes, IndiceTelefone, versao_dados
+from resumo_clientes import ABA_RESUMO, ResumoClientes, atualizar_linha, calcular_resumo, linha_calculada
+from rfm import LIMITES_PADRAO, classificacoes_alteradas, linhas_reclassificadas, telefones_repetidos, validar_limites
+from segmentos import CLASSIFICACOES, Segmentos, coluna_classificacao
+from sequencias import AlocadorSequencias, maior_sufixo
+from visao_cliente import Visao360, chave_telefone
 
 # ============================================================================
 # CONFIGURAÇÃO DA PÁGINA
@@ -30,6 +47,20 @@ def get_gsheets_connection():
     """Retorna conexão única reutilizável com Google Sheets"""
     return st.connection("gsheets", type=GSheetsConnection)
 
+
+@st.cache_resource
+def get_armazenamento():
+    """Retorna o backend de armazenamento configurado (Google Sheets ou SQLite)
+    
+    Configurável em `[armazenamento]` no secrets.toml (backend = "sqlite",
+    caminho_sqlite = "crm.db") ou pelas variáveis CRM_ARMAZENAMENTO/CRM_SQLITE.
+    """
+    try:
+        config = dict(st.secrets.get("armazenamento", {}))
+    except Exception:
+        config = {}
+    return criar_armazenamento(config, conectar_gsheets=get_gsheets_connection)
+
 # ============================================================================
 # FUNÇÕES AUXILIARES - UTILITÁRIOS
 # ============================================================================
@@ -38,27 +69,238 @@ def limpar_telefone(telefone):
     """Remove caracteres especiais do telefone para comparação"""
     if not telefone or pd.isna(telefone):
         return ''
+    if isinstance(telefone, float) and telefone.is_integer():
+        telefone = int(telefone)  # mesmo tratamento de normalizar_telefones
     return re.sub(r'[^\d]', '', str(telefone))
 
-@st.cache_data(ttl=60)
-def carregar_dados(nome_aba, _force_refresh=False):
+def _ler_aba(armazenamento, nome_aba):
+    """Lê a aba direto do armazenamento (sem cache) e aplica as conversões"""
+    df = armazenamento.read(worksheet=nome_aba, ttl=0)
+    return preparar_aba(nome_aba, df)
+
+
+@st.cache_resource
+def cache_abas():
+    """Cache das abas compartilhado entre as sessões
+    
+    Após 60s a aba é revalidada em segundo plano enquanto a versão anterior
+    continua sendo exibida (só é baixada de novo se a revisão mudou); dados
+    com mais de 10 minutos não são usados. Cada aba lida também é gravada
+    em disco (CRM_CACHE_DIR), então um reinício começa pelos arquivos locais.
+    """
+    # O armazenamento é resolvido aqui: as threads de atualização não têm
+    # contexto de sessão para chamar get_armazenamento()
+    armazenamento = get_armazenamento()
+    return CacheAbas(
+        lambda nome_aba: _ler_aba(armazenamento, nome_aba),
+        ttl=60,
+        max_defasagem=600,
+        revisao=armazenamento.revision,
+        disco=CacheDisco("app", formato=formato_preparacao())
+    )
+
+
+def carregar_dados(nome_aba):
     """Carrega dados de uma aba específica do Google Sheets"""
     try:
-        conn = get_gsheets_connection()
-        df = conn.read(worksheet=nome_aba, ttl=60)
-        return df
+        return cache_abas().get(nome_aba)
     except Exception as e:
         st.error(f"Erro ao carregar aba '{nome_aba}': {e}")
         return pd.DataFrame()
 
 
+def legenda_dados(*abas):
+    """Exibe de quando são os dados em tela (carregamento mais antigo entre as abas)"""
+    cache = cache_abas()
+    instantes = [cache.carregado_em(aba) for aba in abas if cache.carregado_em(aba)]
+    if not instantes:
+        return
+    texto = f"🕒 Dados de {datetime.fromtimestamp(min(instantes)).strftime('%H:%M')}"
+    if any(cache.erro(aba) for aba in abas):
+        texto += " · ⚠️ falha ao atualizar, exibindo a última versão carregada"
+    st.caption(texto)
+
+
+def invalidar(*abas):
+    """Descarta do cache apenas as abas alteradas por uma escrita"""
+    cache_abas().invalidate(*abas)
+
+
+def versao_aba(nome_aba, df, coluna):
+    """Versão usada como chave dos índices da aba
+    
+    Se `df` é o DataFrame em cache, reaproveita a versão calculada no
+    carregamento; caso contrário calcula pela coluna indexada.
+    """
+    versao = cache_abas().versao_de(nome_aba, df)
+    return versao if versao is not None else versao_dados(df[coluna])
+
+
+@st.cache_resource(max_entries=20)
+def _indice_telefone(nome_aba, versao, _telefones):
+    """Índice de telefones de uma aba, construído uma vez por versão dos dados"""
+    return IndiceTelefone(_telefones)
+
+
+def indice_telefone(nome_aba, df):
+    """Retorna o índice telefone -> posições (iloc) para o DataFrame da aba"""
+    if df.empty or 'Telefone' not in df.columns:
+        return IndiceTelefone(pd.Series([], dtype=object))
+    return _indice_telefone(nome_aba, versao_aba(nome_aba, df, 'Telefone'), df['Telefone'])
+
+
+@st.cache_resource(max_entries=20)
+def _indice_ids(nome_aba, versao, _ids):
+    """Índice de IDs de uma aba, construído uma vez por versão dos dados"""
+    return IndiceChave(_ids)
+
+
+def indice_ids(nome_aba, df, coluna):
+    """Retorna o índice ID -> posições (iloc) da coluna `coluna` da aba"""
+    if df.empty or coluna not in df.columns:
+        return IndiceChave(pd.Series([], dtype=object))
+    return _indice_ids(nome_aba, versao_aba(nome_aba, df, coluna), df[coluna])
+
+
+@st.cache_resource(max_entries=20)
+def _indice_nomes(nome_aba, versao, _nomes):
+    """Índice de trigramas dos nomes de uma aba, construído uma vez por versão"""
+    return IndiceNomes(_nomes)
+
+
+def indice_nomes(nome_aba, df):
+    """Retorna o índice de nomes (sem acento) -> posições (iloc) da aba"""
+    if df.empty or 'Nome' not in df.columns:
+        return IndiceNomes(pd.Series([], dtype=object))
+    return _indice_nomes(nome_aba, versao_aba(nome_aba, df, 'Nome'), df['Nome'])
+
+
+def filtrar_por_nome(df, nome_aba, df_aba, termo):
+    """Filtra `df` (subconjunto de `df_aba`) pelo nome, em ordem de relevância
+    
+    O índice é o da aba completa, reaproveitado entre buscas; aqui só se
+    mantém as linhas que ainda estão em `df`.
+    """
+    posicoes = indice_nomes(nome_aba, df_aba).buscar(termo)
+    rotulos = df_aba.index[posicoes]
+    return df.loc[rotulos[rotulos.isin(df.index)]]
+
+
+@st.cache_resource(max_entries=2)
+def _segmentos(versao, _df_total):
+    """Posições dos segmentos de Total, agrupadas uma vez por versão dos dados"""
+    return Segmentos(_df_total)
+
+
+def segmentos_clientes(df_total):
+    """Clientes de cada classificação montados a partir de Total (sem ler as abas dos segmentos)"""
+    versao = cache_abas().versao_de("Total", df_total)
+    if versao is None:
+        versao = versao_dados(df_total)
+    return _segmentos(versao, df_total)
+
+
+# Abas que compõem a linha do tempo do cliente em Histórico
+ABAS_CLIENTE_360 = ["HISTORICO", "AGENDAMENTOS_ATIVOS", "SUPORTE"]
+
+
+@st.cache_resource
+def visao_clientes():
+    """Visão 360 compartilhada entre as sessões (ver Visao360)"""
+    return Visao360(ABAS_CLIENTE_360)
+
+
+def registros_cliente(telefone):
+    """{aba: DataFrame com as linhas do cliente} em HISTORICO, AGENDAMENTOS_ATIVOS e SUPORTE
+    
+    Só as abas cuja versão mudou desde a última consulta são reagrupadas.
+    """
+    dados = aquecer_cache(ABAS_CLIENTE_360)
+    visao = visao_clientes()
+    for nome_aba, df in dados.items():
+        versao = cache_abas().versao_de(nome_aba, df)
+        visao.atualizar(nome_aba, versao if versao is not None else versao_dados(df), df)
+    return visao.cliente(telefone)
+
+
+@st.cache_resource(max_entries=2)
+def _resumo_clientes(versao, _df):
+    """Consulta ao resumo por cliente, montada uma vez por versão dos dados"""
+    return ResumoClientes(_df)
+
+
+def resumo_clientes():
+    """RESUMO_CLIENTES carregado (vazio enquanto a aba ainda não existe)"""
+    try:
+        entrada = cache_abas().entrada(ABA_RESUMO)
+    except Exception:
+        return ResumoClientes(pd.DataFrame())
+    return _resumo_clientes(entrada.versao, entrada.df)
+
+
+@st.cache_resource
+def _lock_resumo():
+    """Serializa as atualizações do resumo entre as sessões deste servidor"""
+    return threading.Lock()
+
+
+def registrar_no_resumo(*telefones, finalizados=0, ativos=0, tickets=0, contato=False):
+    """Aplica as variações às linhas dos clientes em RESUMO_CLIENTES (uma escrita)
+    
+    Chamado depois de cada escrita que muda os números do cliente (e depois
+    de invalidar as abas alteradas); só as linhas desses clientes são
+    gravadas. Um cliente que ainda não está no resumo tem a linha calculada
+    nos seus registros, que já incluem a escrita. Em vez de descartar a
+    aba, o resumo em cache recebe as linhas gravadas, então a próxima
+    escrita não baixa a aba de novo. Uma falha aqui não desfaz a operação
+    principal (o resumo pode ser recalculado no Dashboard).
+    """
+    agora = datetime.now() if contato else None
+    with _lock_resumo():
+        resumo = resumo_clientes()
+        linhas = {}
+        calculadas = set()
+        for telefone in telefones:
+            chave = chave_telefone(telefone)
+            if not chave or chave in calculadas:
+                continue
+            atual = linhas.get(chave) or resumo.linha(telefone)
+            if atual is not None:
+                linhas[chave] = atualizar_linha(atual, telefone, finalizados, ativos, tickets, agora)
+            else:
+                # Registros lidos depois da escrita: as variações já estão neles
+                atual = linha_calculada(telefone, registros_cliente(telefone))
+                linhas[chave] = atualizar_linha(atual, telefone, contato=agora)
+                calculadas.add(chave)
+        
+        if not linhas:
+            return
+        try:
+            get_armazenamento().upsert_rows(ABA_RESUMO, 'Telefone', list(linhas.values()))
+        except Exception as e:
+            st.warning(f"⚠️ Resumo do cliente não atualizado: {e}")
+            return
+        df_resumo = preparar_aba(ABA_RESUMO, resumo.com_linhas(list(linhas.values())))
+        cache_abas().substituir(ABA_RESUMO, resumo.df, df_resumo)
+
+
+def aquecer_cache(abas):
+    """Carrega várias abas em paralelo no cache e devolve {aba: DataFrame}"""
+    ctx = get_script_run_ctx()
+    
+    def carregar(nome_aba):
+        # Threads auxiliares precisam do contexto da sessão para usar o cache/st.*
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return carregar_dados(nome_aba)
+    
+    return carregar_abas(abas, carregar)
+
+
 def adicionar_agendamento(dados_cliente, classificacao_origem):
     """Adiciona um cliente na aba AGENDAMENTOS_ATIVOS"""
     try:
-        conn = get_gsheets_connection()
-        df_agendamentos = conn.read(worksheet="AGENDAMENTOS_ATIVOS", ttl=0)
-        
         nova_linha = {
+            'ID_Agendamento': novo_id_agendamento(),
             'Data de contato': datetime.now().strftime('%d/%m/%Y'),
             'Nome': dados_cliente.get('Nome', ''),
             'Classificação': dados_cliente.get('Classificação ', classificacao_origem),
@@ -70,9 +312,9 @@ def adicionar_agendamento(dados_cliente, classificacao_origem):
             'Observação': 'Check-in realizado via CRM'
         }
         
-        df_nova_linha = pd.DataFrame([nova_linha])
-        df_atualizado = pd.concat([df_agendamentos, df_nova_linha], ignore_index=True)
-        conn.update(worksheet="AGENDAMENTOS_ATIVOS", data=df_atualizado)
+        get_armazenamento().append_rows("AGENDAMENTOS_ATIVOS", [nova_linha])
+        invalidar("AGENDAMENTOS_ATIVOS")
+        registrar_no_resumo(nova_linha['Telefone'], ativos=1, contato=True)
         
         return True
     except Exception as e:
@@ -80,78 +322,102 @@ def adicionar_agendamento(dados_cliente, classificacao_origem):
         return False
 
 
-def atualizar_agendamento(index, dados_atualizados):
+def atualizar_agendamento(agendamento, dados_atualizados):
     """Atualiza um registro na aba AGENDAMENTOS_ATIVOS"""
     try:
-        conn = get_gsheets_connection()
-        df_agendamentos = conn.read(worksheet="AGENDAMENTOS_ATIVOS", ttl=0)
-        
-        for campo, valor in dados_atualizados.items():
-            if campo in df_agendamentos.columns:
-                df_agendamentos.at[index, campo] = valor
-        
-        conn.update(worksheet="AGENDAMENTOS_ATIVOS", data=df_agendamentos)
+        get_armazenamento().update_row(
+            "AGENDAMENTOS_ATIVOS",
+            chave_agendamento(agendamento),
+            dados_atualizados
+        )
+        invalidar("AGENDAMENTOS_ATIVOS")
         return True
     except Exception as e:
         st.error(f"Erro ao atualizar: {e}")
         return False
 
 
-def finalizar_atendimento(index, dados_completos):
-    """Move atendimento para HISTORICO e remove de AGENDAMENTOS_ATIVOS"""
+def novo_id_agendamento():
+    """Gera a chave estável que identifica um agendamento na planilha"""
+    return uuid.uuid4().hex[:12]
+
+
+def chave_agendamento(agendamento):
+    """Retorna a chave usada para localizar o agendamento em AGENDAMENTOS_ATIVOS"""
+    id_agendamento = agendamento.get('ID_Agendamento', '')
+    if pd.notna(id_agendamento) and str(id_agendamento).strip():
+        return {'ID_Agendamento': id_agendamento}
+    
+    # Agendamentos antigos (sem ID): identificar pelos campos do registro
+    return {
+        campo: agendamento.get(campo, '')
+        for campo in ['Nome', 'Telefone', 'Data de contato', 'Data de chamada']
+    }
+
+
+def finalizar_atendimento(dados_completos, novo_agendamento=None):
+    """Move atendimento para HISTORICO e remove de AGENDAMENTOS_ATIVOS
+    
+    Exclusão, gravação no histórico e (opcionalmente) o novo agendamento
+    vão em uma única requisição à planilha.
+    """
     try:
-        conn = get_gsheets_connection()
-        
-        # Carregar histórico
-        df_historico = conn.read(worksheet="HISTORICO", ttl=0)
-        
         # Preparar linha para histórico
-        nova_linha_historico = dados_completos.to_dict()
+        nova_linha_historico = registro(dados_completos)
         nova_linha_historico['Data de finalização'] = datetime.now().strftime('%d/%m/%Y %H:%M')
         
-        # Adicionar ao histórico
-        df_historico_novo = pd.concat([df_historico, pd.DataFrame([nova_linha_historico])], ignore_index=True)
-        conn.update(worksheet="HISTORICO", data=df_historico_novo)
-        
-        # Remover de agendamentos ativos
-        df_agendamentos = conn.read(worksheet="AGENDAMENTOS_ATIVOS", ttl=0)
-        df_agendamentos_novo = df_agendamentos.drop(index).reset_index(drop=True)
-        conn.update(worksheet="AGENDAMENTOS_ATIVOS", data=df_agendamentos_novo)
+        get_armazenamento().move_row(
+            "AGENDAMENTOS_ATIVOS",
+            chave_agendamento(dados_completos),
+            "HISTORICO",
+            nova_linha_historico,
+            replacement_row=novo_agendamento
+        )
+        invalidar("AGENDAMENTOS_ATIVOS", "HISTORICO")
+        registrar_no_resumo(
+            dados_completos.get('Telefone', ''),
+            finalizados=1,
+            ativos=0 if novo_agendamento else -1,
+            contato=True
+        )
         
         return True
     except Exception as e:
         st.error(f"Erro ao finalizar: {e}")
         return False
         
+# ID completo de ticket (TKT-YYYY-NNNNN), buscado direto no índice de IDs
+PADRAO_ID_TICKET = re.compile(r'TKT-\d{4}-\d{5}', re.IGNORECASE)
+
+
+@st.cache_resource
+def alocador_ids():
+    """Alocador de IDs do processo: reserva blocos de números no armazenamento"""
+    return AlocadorSequencias(get_armazenamento().reserve_sequence, bloco=10)
+
+
 def gerar_id_ticket():
-    """Gera um ID único para o ticket no formato TKT-YYYY-NNNNN"""
-    try:
-        conn = st.connection("gsheets", type="GSheetsConnection")
-        df_suporte = conn.read(worksheet="SUPORTE", ttl=0)
-        
-        ano_atual = datetime.now().year
-        
-        # Contar tickets do ano atual
-        if not df_suporte.empty and 'ID_Ticket' in df_suporte.columns:
-            tickets_ano = df_suporte[df_suporte['ID_Ticket'].str.contains(f'TKT-{ano_atual}', na=False)]
-            numero = len(tickets_ano) + 1
-        else:
-            numero = 1
-        
-        return f"TKT-{ano_atual}-{numero:05d}"
-    
-    except:
-        # Fallback caso haja erro
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        return f"TKT-{datetime.now().year}-{timestamp[-5:]}"
+    """Gera um ID único para o ticket no formato TKT-YYYY-NNNNN
+    
+    O número vem da sequência do ano (uma por ano, reservada em blocos), sem
+    ler SUPORTE. Na primeira reserva do ano a sequência continua do maior
+    ID já existente na aba.
+    """
+    prefixo = f"TKT-{datetime.now().year}"
+    
+    def maior_id_existente():
+        df_suporte = cache_abas().get("SUPORTE")
+        if df_suporte.empty or 'ID_Ticket' not in df_suporte.columns:
+            return 0
+        return maior_sufixo(df_suporte['ID_Ticket'], prefixo)
+    
+    numero = alocador_ids().proximo(prefixo, inicial=maior_id_existente)
+    return f"{prefixo}-{numero:05d}"
 
 
 def registrar_ticket_log_aberto(id_ticket, dados_ticket, aberto_por):
     """Registra a abertura do ticket em LOG_TICKETS_ABERTOS"""
     try:
-        conn = st.connection("gsheets", type="GSheetsConnection")
-        df_log = conn.read(worksheet="LOG_TICKETS_ABERTOS", ttl=0)
-        
         novo_log = {
             'Data_Registro': datetime.now().strftime('%d/%m/%Y %H:%M'),
             'ID_Ticket': id_ticket,
@@ -164,8 +430,7 @@ def registrar_ticket_log_aberto(id_ticket, dados_ticket, aberto_por):
             'Aberto_Por': aberto_por
         }
         
-        df_log_novo = pd.concat([df_log, pd.DataFrame([novo_log])], ignore_index=True)
-        conn.update(worksheet="LOG_TICKETS_ABERTOS", data=df_log_novo)
+        get_armazenamento().append_rows("LOG_TICKETS_ABERTOS", [novo_log])
         
     except Exception as e:
         st.warning(f"⚠️ Log não registrado: {e}")
@@ -174,9 +439,6 @@ def registrar_ticket_log_aberto(id_ticket, dados_ticket, aberto_por):
 def registrar_ticket_log_resolvido(id_ticket, dados_resolucao, resolvido_por):
     """Registra a resolução do ticket em LOG_TICKETS_RESOLVIDOS"""
     try:
-        conn = st.connection("gsheets", type="GSheetsConnection")
-        df_log = conn.read(worksheet="LOG_TICKETS_RESOLVIDOS", ttl=0)
-        
         novo_log = {
             'Data_Resolucao': datetime.now().strftime('%d/%m/%Y %H:%M'),
             'ID_Ticket': id_ticket,
@@ -186,62 +448,113 @@ def registrar_ticket_log_resolvido(id_ticket, dados_resolucao, resolvido_por):
             'Resolvido_Por': resolvido_por
         }
         
-        df_log_novo = pd.concat([df_log, pd.DataFrame([novo_log])], ignore_index=True)
-        conn.update(worksheet="LOG_TICKETS_RESOLVIDOS", data=df_log_novo)
+        get_armazenamento().append_rows("LOG_TICKETS_RESOLVIDOS", [novo_log])
         
     except Exception as e:
         st.warning(f"⚠️ Log de resolução não registrado: {e}")
 
-@st.cache_data(ttl=60)
-def carregar_dados_suporte():
-    """Carrega dados da planilha SUPORTE com cache"""
-    try:
-        conn = st.connection("gsheets", type="GSheetsConnection")
-        return conn.read(worksheet="SUPORTE", ttl=0)
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame()
 
 
+# Classificação -> chave em st.session_state.metas_checkin
+CHAVES_METAS = {
+    "Novo": 'novo',
+    "Promissor": 'promissor',
+    "Leal": 'leal',
+    "Campeão": 'campeao',
+    "Em risco": 'risco',
+    "Dormente": 'dormente'
+}
+
+# Filtro de frequência de contato do Check-in: rótulo -> mínimo de dias sem
+# contato (0 = todos os clientes; None = só quem nunca foi contatado)
+FILTROS_CONTATO = {
+    "Todos": 0,
+    "Nunca contatados": None,
+    "Sem contato há 30+ dias": 30,
+    "Sem contato há 90+ dias": 90,
+}
 
 # ============================================================================
-# RENDER - PÁGINA CHECK-IN (VERSÃO OTIMIZADA)
+# COMPONENTES - LISTAS PAGINADAS
 # ============================================================================
 
-def render_checkin():
-    """Renderiza a página de Check-in de clientes - Versão otimizada"""
-# Primeira vez que a página carrega? Criar valores padrão
-    if 'metas_checkin' not in st.session_state:
-        st.session_state.metas_checkin = {
-            'novo': 5,
-            'promissor': 5,
-            'leal': 5,
-            'campeao': 3,
-            'risco': 5,
-            'dormente': 5
-        }
-
-    # Variável para rastrear se metas foram alteradas nesta sessão
-    if 'metas_alteradas' not in st.session_state:
-        st.session_state.metas_alteradas = False
-
+def paginar(df, chave, tamanhos=(10, 25, 50)):
+    """Exibe os controles de paginação e devolve apenas as linhas da página atual
+    
+    O tamanho da página e o cursor ficam no session_state (`{chave}_tamanho`
+    e `{chave}_pagina`), então cada lista mantém a sua posição entre reruns.
+    """
+    col_tamanho, col_pagina, col_info = st.columns([1, 1, 2])
+    
+    with col_tamanho:
+        tamanho = st.selectbox("Itens por página", tamanhos, key=f"{chave}_tamanho")
+    
+    total_paginas = max(1, math.ceil(len(df) / tamanho))
+    chave_pagina = f"{chave}_pagina"
+    # O valor do widget vem só do session_state (sem `value=`), para poder
+    # ajustar a página quando a lista encolhe
+    if chave_pagina not in st.session_state:
+        st.session_state[chave_pagina] = 1
+    elif st.session_state[chave_pagina] > total_paginas:
+        st.session_state[chave_pagina] = total_paginas
+    
+    with col_pagina:
+        pagina = st.number_input(
+            "Página",
+            min_value=1,
+            max_value=total_paginas,
+            step=1,
+            key=chave_pagina
+        )
     
-    st.title("✅ Check-in de Clientes")
-    st.markdown("Selecione clientes para iniciar o fluxo de atendimento")
-    st.markdown("---")
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, len(df))
     
-    # ========== PAINEL DE PLANEJAMENTO DIÁRIO ==========
-    st.subheader("📊 Planejamento de Check-ins do Dia")
+    with col_info:
+        st.caption(f"Exibindo {inicio + 1 if len(df) else 0}–{fim} de {len(df)} | Página {pagina} de {total_paginas}")
     
-    # Carregar agendamentos para contar check-ins de hoje
-    df_agendamentos_hoje = carregar_dados("AGENDAMENTOS_ATIVOS")
-    hoje = datetime.now().strftime('%d/%m/%Y')
+    return df.iloc[inicio:fim]
+
+
+def abrir_card(titulo, chave, aberto=False):
+    """Cabeçalho de card: o conteúdo só é montado quando o card está aberto
+    
+    Devolve um container para o conteúdo, ou None se o card estiver fechado
+    (nesse caso nada além do cabeçalho é desenhado nesta execução).
+    """
+    if st.toggle(titulo, value=aberto, key=chave):
+        return st.container(border=True)
+    return None
+
+
+def concluir_card(chave, mensagem):
+    """Marca o card como concluído nesta sessão (ele deixa de exibir o formulário)"""
+    st.session_state.setdefault('cards_concluidos', {})[chave] = mensagem
+
+
+def mostrar_card_concluido(chave):
+    """Exibe o resumo de um card já concluído; devolve False se ele ainda está aberto"""
+    mensagem = st.session_state.get('cards_concluidos', {}).get(chave)
+    if mensagem is None:
+        return False
+    st.success(mensagem)
+    return True
+
+
+# ============================================================================
+# RENDER - PÁGINA CHECK-IN (VERSÃO OTIMIZADA)
+# ============================================================================
+
+@st.fragment
+def painel_metas_checkin():
+    """Painel de metas diárias e progresso do dia (fragmento: alterar uma meta não recarrega a página)
     
-    # Contar check-ins de hoje
-    if not df_agendamentos_hoje.empty and 'Data de contato' in df_agendamentos_hoje.columns:
-        checkins_hoje = len(df_agendamentos_hoje[df_agendamentos_hoje['Data de contato'] == hoje])
-    else:
-        checkins_hoje = 0
+    O progresso fica dentro do fragmento porque depende das metas: mudar
+    uma meta o redesenha junto. Só quando muda a meta da classificação
+    exibida a página inteira é reexecutada, porque ela define quantos
+    clientes aparecem na lista.
+    """
+    metas_antes = dict(st.session_state.metas_checkin)
     
     # Painel de metas diárias
     with st.expander("🎯 Definir Metas de Check-in por Classificação", expanded=True):
@@ -347,11 +660,31 @@ def render_checkin():
                 st.caption("💾 Metas carregadas")
     
     st.markdown("---")
-
     
+    painel_progresso_checkin()
+    
+    chave_meta = CHAVES_METAS.get(st.session_state.get('classificacao_checkin', "Novo"))
+    if st.session_state.metas_checkin.get(chave_meta) != metas_antes.get(chave_meta):
+        st.rerun()
+
+
+def texto_progresso_checkin():
+    """Check-ins de hoje em relação à meta, para o resumo de um card concluído"""
+    checkins_hoje = st.session_state.get('checkins_hoje', 0)
+    meta_total = sum(st.session_state.metas_checkin.values())
+    return f"📈 {checkins_hoje} de {meta_total} check-ins da meta de hoje"
+
+
+def painel_progresso_checkin():
+    """Progresso do dia (desenhado pelo painel de metas)"""
     # ========== BARRA DE PROGRESSO E MOTIVAÇÃO ==========
     st.subheader("📈 Progresso do Dia")
     
+    # Contador do session_state: o card que faz o check-in o incrementa e
+    # mostra o novo valor no seu resumo, sem reexecutar a página inteira
+    checkins_hoje = st.session_state.get('checkins_hoje', 0)
+    meta_total = sum(st.session_state.metas_checkin.values())
+    
     # Calcular progresso
     if meta_total > 0:
         progresso = min(checkins_hoje / meta_total, 1.0)
@@ -409,35 +742,314 @@ def render_checkin():
             value=meta_total,
             delta=f"Faltam {max(0, meta_total - checkins_hoje)}"
         )
+
+
+def linha_checkin(cliente, classificacao, relato, proximo_contato, data_proximo, observacoes):
+    """Linha de AGENDAMENTOS_ATIVOS gerada pelo check-in de um cliente"""
+    return {
+        'ID_Agendamento': novo_id_agendamento(),
+        'Data de contato': datetime.now().strftime('%d/%m/%Y'),
+        'Nome': cliente.get('Nome', ''),
+        'Classificação': classificacao,
+        'Valor': cliente.get('Valor', ''),
+        'Telefone': cliente.get('Telefone', ''),
+        'Relato da conversa': relato,
+        'Follow up': proximo_contato,
+        'Data de chamada': data_proximo.strftime('%d/%m/%Y') if data_proximo else '',
+        'Observação': observacoes if observacoes else 'Check-in realizado via CRM'
+    }
+
+
+def checkin_em_lote(df_clientes, classificacao_selecionada):
+    """Check-in de vários clientes com os mesmos dados, gravados em uma única escrita"""
+    with st.form(key="form_checkin_lote"):
+        st.info("💡 Selecione os clientes e preencha os dados comuns a todos os check-ins")
+        
+        todos = st.checkbox(f"Selecionar todos os {len(df_clientes)} clientes da lista")
+        selecionados = st.multiselect(
+            "👥 Clientes:",
+            list(df_clientes.index),
+            format_func=lambda i: f"{df_clientes.at[i, 'Nome'] if 'Nome' in df_clientes.columns else i}",
+            placeholder="Escolha os clientes..."
+        )
+        
+        relato = st.text_area(
+            "📝 Como foi a conversa?",
+            height=100,
+            help="O mesmo relato é gravado para todos os clientes selecionados"
+        )
+        proximo_contato = st.text_input("🎯 Qual o motivo do próximo contato?")
+        data_proximo = st.date_input("📅 Data do próximo contato:", value=None)
+        observacoes = st.text_area("💬 Observações adicionais:", height=80)
+        
+        btn_lote = st.form_submit_button(
+            "✅ Realizar Check-in dos Selecionados",
+            type="primary",
+            use_container_width=True
+        )
+    
+    if not btn_lote:
+        return
+    
+    indices_selecionados = list(df_clientes.index) if todos else selecionados
+    if not indices_selecionados:
+        st.error("❌ Selecione pelo menos um cliente!")
+        return
+    if not relato:
+        st.error("❌ Preencha como foi a conversa antes de continuar!")
+        return
+    if not proximo_contato:
+        st.error("❌ Defina o motivo do próximo contato!")
+        return
+    if data_proximo and data_proximo < datetime.now().date():
+        st.error("❌ A data do próximo contato não pode estar no passado!")
+        return
+    
+    clientes = df_clientes.loc[indices_selecionados]
+    sem_nome = clientes['Nome'].isna().sum() if 'Nome' in clientes.columns else len(clientes)
+    if sem_nome:
+        st.error(f"❌ {sem_nome} cliente(s) selecionado(s) sem nome cadastrado")
+        return
+    
+    with st.spinner(f"Processando {len(clientes)} check-ins..."):
+        try:
+            novas_linhas = [
+                linha_checkin(cliente, classificacao_selecionada, relato, proximo_contato, data_proximo, observacoes)
+                for cliente in clientes.to_dict('records')
+            ]
+            
+            # Todas as linhas em uma única escrita e uma única invalidação
+            get_armazenamento().append_rows("AGENDAMENTOS_ATIVOS", novas_linhas)
+            invalidar("AGENDAMENTOS_ATIVOS")
+            registrar_no_resumo(*[linha['Telefone'] for linha in novas_linhas], ativos=1, contato=True)
+            
+            st.session_state.checkins_hoje = st.session_state.get('checkins_hoje', 0) + len(novas_linhas)
+            st.toast(f"✅ {len(novas_linhas)} check-ins realizados!", icon="✅")
+            st.rerun()
+        
+        except Exception as e:
+            st.error(f"❌ Erro ao realizar check-in em lote: {e}")
+
+
+@st.fragment
+def card_checkin(index, cliente, classificacao_selecionada):
+    """Card de check-in de um cliente
+    
+    Fragmento: abrir o card ou enviar o formulário reexecuta apenas este card.
+    """
+    chave_card = f"card_checkin_{index}"
+    if mostrar_card_concluido(chave_card):
+        return
+    
+    # Título do card com informações principais
+    nome_cliente = cliente.get('Nome', 'Nome não disponível')
+    valor_cliente = cliente.get('Valor', 0)
+    
+    # Formatação do valor (já numérico: o esquema da aba converte no carregamento)
+    valor_formatado = f"R$ {valor_cliente:,.2f}" if pd.notna(valor_cliente) else "R$ 0,00"
+    
+    # Card com tema azul (conteúdo e formulário só quando aberto)
+    card = abrir_card(
+        f"👤 {nome_cliente} | 💰 {valor_formatado} | 🏷️ {classificacao_selecionada}",
+        chave=chave_card
+    )
+    if card is None:
+        return
+    
+    with card:
+        # Dividir em 2 colunas
+        col_info_card, col_form = st.columns([1, 1])
+        
+        # ========== COLUNA ESQUERDA: INFORMAÇÕES DO CLIENTE ==========
+        with col_info_card:
+            st.markdown("### 📊 Informações do Cliente")
+            
+            # Dados principais
+            st.write(f"**👤 Nome Completo:** {nome_cliente}")
+            st.write(f"**📧 E-mail:** {cliente.get('Email', 'N/D')}")
+            st.write(f"**📱 Telefone:** {cliente.get('Telefone', 'N/D')}")
+            st.write(f"**🏷️ Classificação:** {classificacao_selecionada}")
+            
+            st.markdown("---")
+            
+            # Métricas em mini cards
+            st.markdown("### 📈 Histórico de Compras")
+            
+            met1, met2, met3 = st.columns(3)
+            
+            with met1:
+                st.metric(
+                    label="💰 Gasto Total",
+                    value=valor_formatado,
+                    help="Valor total gasto pelo cliente"
+                )
+            
+            with met2:
+                if 'Compras' in cliente.index:
+                    compras = cliente.get('Compras')
+                    st.metric("🛒 Compras", int(compras) if pd.notna(compras) else 0)
+                else:
+                    st.metric("🛒 Compras", "N/D")
+            
+            with met3:
+                if 'Dias desde a compra' in cliente.index:
+                    dias = cliente.get('Dias desde a compra')
+                    st.metric("📅 Dias", int(round(dias)) if pd.notna(dias) else 0, help="Dias desde a última compra")
+                else:
+                    st.metric("📅 Dias", "N/D")
+        
+        # ========== COLUNA DIREITA: FORMULÁRIO DE CHECK-IN ==========
+        with col_form:
+            st.markdown("### ✏️ Registrar Check-in")
+            
+            # Formulário de check-in
+            with st.form(key=f"form_checkin_{index}"):
+                
+                st.info("💡 Preencha as informações do primeiro contato com o cliente")
+                
+                # Campo: Primeira conversa
+                primeira_conversa = st.text_area(
+                    "📝 Como foi a primeira conversa?",
+                    height=120,
+                    help="Registre os principais pontos da conversa inicial",
+                    placeholder="Ex: Cliente demonstrou interesse em produtos premium. Mencionou necessidade de entrega rápida..."
+                )
+                
+                # Campo: Motivo do próximo contato
+                proximo_contato = st.text_input(
+                    "🎯 Qual o motivo do próximo contato?",
+                    help="Defina o objetivo do próximo follow-up",
+                    placeholder="Ex: Enviar catálogo de produtos, Confirmar orçamento..."
+                )
+                
+                # Campo: Data do próximo contato
+                data_proximo = st.date_input(
+                    "📅 Data do próximo contato:",
+                    value=None,
+                    help="Quando será o próximo follow-up?"
+                )
+                
+                # Campo: Observações adicionais
+                observacoes = st.text_area(
+                    "💬 Observações adicionais:",
+                    height=80,
+                    placeholder="Informações extras relevantes sobre o cliente..."
+                )
+                
+                st.markdown("---")
+                
+                # Botão de check-in
+                btn_checkin = st.form_submit_button(
+                    "✅ Realizar Check-in",
+                    type="primary",
+                    use_container_width=True
+                )
+                
+                # Ação do botão
+                if btn_checkin:
+                    # Validação
+                    if not primeira_conversa:
+                        st.error("❌ Preencha como foi a primeira conversa antes de continuar!")
+                    elif not proximo_contato:
+                        st.error("❌ Defina o motivo do próximo contato!")
+                    else:
+                        with st.spinner('Processando check-in...'):
+                            # Preparar dados para agendamento
+                            try:
+                                nova_linha = linha_checkin(
+                                    cliente, classificacao_selecionada,
+                                    primeira_conversa, proximo_contato, data_proximo, observacoes
+                                )
+                                
+                                get_armazenamento().append_rows("AGENDAMENTOS_ATIVOS", [nova_linha])
+                                
+                                invalidar("AGENDAMENTOS_ATIVOS")
+                                registrar_no_resumo(nova_linha['Telefone'], ativos=1, contato=True)
+                                st.session_state.checkins_hoje = st.session_state.get('checkins_hoje', 0) + 1
+                                concluir_card(
+                                    chave_card,
+                                    f"✅ Check-in realizado com sucesso para **{nome_cliente}**!  \n{texto_progresso_checkin()}"
+                                )
+                                st.toast(f"✅ Check-in realizado para {nome_cliente}!", icon="✅")
+                                st.rerun(scope="fragment")
+                                
+                            except Exception as e:
+                                st.error(f"❌ Erro ao realizar check-in: {e}")
+    
+    # Separador entre cards
+    st.markdown("---")
+
+
+def render_checkin():
+    """Renderiza a página de Check-in de clientes - Versão otimizada"""
+# Primeira vez que a página carrega? Criar valores padrão
+    if 'metas_checkin' not in st.session_state:
+        st.session_state.metas_checkin = {
+            'novo': 5,
+            'promissor': 5,
+            'leal': 5,
+            'campeao': 3,
+            'risco': 5,
+            'dormente': 5
+        }
+
+    # Variável para rastrear se metas foram alteradas nesta sessão
+    if 'metas_alteradas' not in st.session_state:
+        st.session_state.metas_alteradas = False
+
+    # Execução completa: a lista é recarregada, os cards concluídos já saíram dela
+    st.session_state.cards_concluidos = {}
+
+    
+    st.title("✅ Check-in de Clientes")
+    st.markdown("Selecione clientes para iniciar o fluxo de atendimento")
+    st.markdown("---")
+    
+    # ========== PAINEL DE PLANEJAMENTO DIÁRIO ==========
+    st.subheader("📊 Planejamento de Check-ins do Dia")
+    
+    # Carregar agendamentos para contar check-ins de hoje
+    df_agendamentos_hoje = carregar_dados("AGENDAMENTOS_ATIVOS")
+    hoje = datetime.now().strftime('%d/%m/%Y')
+    
+    # Contar check-ins de hoje
+    if not df_agendamentos_hoje.empty and 'Data de contato' in df_agendamentos_hoje.columns:
+        checkins_hoje = len(df_agendamentos_hoje[df_agendamentos_hoje['Data de contato'] == hoje])
+    else:
+        checkins_hoje = 0
+    
+    # Guardar no session_state para o painel de progresso e os cards de check-in
+    st.session_state.checkins_hoje = checkins_hoje
+    
+    painel_metas_checkin()
     
     st.markdown("---")
     
     # Configurações de filtros
-    col_config1, col_config2 = st.columns([2, 1])
+    col_config1, col_config2, col_config3 = st.columns([2, 1, 1])
     
     with col_config1:
         # Seletor de classificação (SEM "Total")
-        classificacoes = ["Novo", "Promissor", "Leal", "Campeão", "Em risco", "Dormente"]
         classificacao_selecionada = st.selectbox(
             "📂 Escolha a classificação:",
-            classificacoes,
+            CLASSIFICACOES,
             index=0,
+            key="classificacao_checkin",
             help="Selecione o grupo de clientes que deseja visualizar"
         )
     
     with col_config2:
+        filtro_contato = st.selectbox(
+            "📞 Último contato:",
+            list(FILTROS_CONTATO),
+            key="filtro_contato_checkin",
+            help="Filtra pelo resumo de cada cliente (RESUMO_CLIENTES)"
+        )
+    
+    with col_config3:
         # Vincular com o planejamento de metas
-        metas_por_classificacao = {
-    "Novo": st.session_state.metas_checkin['novo'],
-    "Promissor": st.session_state.metas_checkin['promissor'],
-    "Leal": st.session_state.metas_checkin['leal'],
-    "Campeão": st.session_state.metas_checkin['campeao'],
-    "Em risco": st.session_state.metas_checkin['risco'],
-    "Dormente": st.session_state.metas_checkin['dormente']
-}
-        
         # Pegar limite baseado na meta definida
-        limite_clientes = metas_por_classificacao.get(classificacao_selecionada, 10)
+        limite_clientes = st.session_state.metas_checkin.get(CHAVES_METAS.get(classificacao_selecionada), 10)
         
         # Mostrar info de quantos serão carregados
         st.info(f"📊 **{limite_clientes}** clientes da meta do dia")
@@ -446,8 +1058,11 @@ def render_checkin():
     
     # Carregar dados
     with st.spinner(f"Carregando clientes de '{classificacao_selecionada}'..."):
-        df_clientes = carregar_dados(classificacao_selecionada)
-        df_agendamentos_ativos = carregar_dados("AGENDAMENTOS_ATIVOS")
+        dados = aquecer_cache(["Total", "AGENDAMENTOS_ATIVOS"])
+        df_total = dados["Total"]
+        df_clientes = segmentos_clientes(df_total).segmento(classificacao_selecionada)
+        df_agendamentos_ativos = dados["AGENDAMENTOS_ATIVOS"]
+    legenda_dados("Total", "AGENDAMENTOS_ATIVOS")
     
     if df_clientes.empty:
         st.warning(f"⚠️ Nenhum cliente encontrado na classificação '{classificacao_selecionada}'")
@@ -455,11 +1070,10 @@ def render_checkin():
     
     # Remover clientes que já estão em agendamentos ativos
     if not df_agendamentos_ativos.empty and 'Nome' in df_agendamentos_ativos.columns:
-        clientes_em_atendimento = df_agendamentos_ativos['Nome'].tolist()
-        df_clientes_original = df_clientes.copy()
-        df_clientes = df_clientes[~df_clientes['Nome'].isin(clientes_em_atendimento)]
+        total_antes = len(df_clientes)
+        df_clientes = df_clientes[~df_clientes['Nome'].isin(df_agendamentos_ativos['Nome'])]
         
-        clientes_removidos = len(df_clientes_original) - len(df_clientes)
+        clientes_removidos = total_antes - len(df_clientes)
         if clientes_removidos > 0:
             st.warning(f"⚠️ {clientes_removidos} cliente(s) já estão em atendimento ativo e foram removidos da lista")
     
@@ -467,6 +1081,17 @@ def render_checkin():
         st.info("✅ Todos os clientes desta classificação já estão em atendimento!")
         return
     
+    # Frequência de contato: consulta ao resumo por telefone, sem ler o histórico
+    minimo_dias = FILTROS_CONTATO[filtro_contato]
+    if minimo_dias != 0 and 'Telefone' in df_clientes.columns:
+        dias_sem_contato = resumo_clientes().dias_sem_contato(df_clientes['Telefone'])
+        nunca = dias_sem_contato.isna()
+        df_clientes = df_clientes[nunca if minimo_dias is None else nunca | (dias_sem_contato >= minimo_dias)]
+        
+        if df_clientes.empty:
+            st.info(f"Nenhum cliente desta classificação no filtro '{filtro_contato}'")
+            return
+    
     # Aplicar limite baseado na meta definida
     df_clientes = df_clientes.head(limite_clientes)
     
@@ -476,211 +1101,268 @@ def render_checkin():
     with col_info:
         st.metric("✅ Disponíveis", len(df_clientes), help="Clientes disponíveis para check-in")
     
-    with col_busca:
-        busca_nome = st.text_input(
-            "🔍 Buscar cliente:",
-            "",
-            placeholder="Digite o nome...",
-            label_visibility="collapsed"
-        )
+    with col_busca:
+        busca_nome = st.text_input(
+            "🔍 Buscar cliente:",
+            "",
+            placeholder="Digite o nome...",
+            label_visibility="collapsed"
+        )
+    
+    with col_dias:
+        if 'Dias desde a compra' in df_clientes.columns:
+            dias_min = 0
+            dias_max = int(df_clientes['Dias desde a compra'].max()) if df_clientes['Dias desde a compra'].max() > 0 else 365
+            filtro_dias = st.slider(
+                "📅 Dias desde última compra:",
+                dias_min,
+                dias_max,
+                (dias_min, dias_max),
+                label_visibility="collapsed"
+            )
+        else:
+            filtro_dias = None
+    
+    # Aplicar filtros (cada filtro gera um novo DataFrame; o do cache nunca é alterado)
+    df_filtrado = df_clientes
+    if busca_nome and 'Nome' in df_filtrado.columns:
+        df_filtrado = filtrar_por_nome(df_filtrado, "Total", df_total, busca_nome)
+    if filtro_dias and 'Dias desde a compra' in df_filtrado.columns:
+        df_filtrado = df_filtrado[(df_filtrado['Dias desde a compra'] >= filtro_dias[0]) & (df_filtrado['Dias desde a compra'] <= filtro_dias[1])]
+    
+    st.markdown("---")
+    st.subheader(f"📋 Clientes para Check-in ({len(df_filtrado)})")
+    
+    if df_filtrado.empty:
+        st.info("Nenhum cliente encontrado com os filtros aplicados")
+        return
+    
+    # Modo em lote: vários clientes, dados em comum, uma única escrita
+    if st.toggle("⚡ Check-in em lote", key="checkin_lote", help="Selecione vários clientes e registre todos de uma vez"):
+        checkin_em_lote(df_filtrado, classificacao_selecionada)
+        return
+    
+    # Cards de clientes - apenas os da página atual; conteúdo montado ao abrir
+    df_pagina = paginar(df_filtrado, "pag_checkin")
+    
+    for index, cliente in df_pagina.iterrows():
+        card_checkin(index, cliente, classificacao_selecionada)
+
+
+
+# ============================================================================
+# RENDER - PÁGINA EM ATENDIMENTO
+# ============================================================================
+
+def texto_resumo_atendimento():
+    """Pendentes e vencidos restantes, para o resumo de um card concluído"""
+    resumo = st.session_state.resumo_atendimento
+    return f"⏳ Pendentes hoje: {resumo['pendentes']} · 🔥 Vencidos: {resumo['vencidos']}"
+
+
+def painel_resumo_atendimento():
+    """Métricas do dia (os cards mostram os valores atualizados no seu resumo)"""
+    resumo = st.session_state.resumo_atendimento
+    total_hoje = resumo['total']
+    pendentes_hoje = resumo['pendentes']
+    total_vencidos = resumo['vencidos']
+    
+    # Exibir métricas
+    col_m1, col_m2, col_m3 = st.columns(3)
+    
+    with col_m1:
+        st.metric("📊 Total do Dia", total_hoje, help="Total de atendimentos agendados para hoje")
+    
+    with col_m2:
+        st.metric("⏳ Pendentes", pendentes_hoje, help="Atendimentos que faltam finalizar hoje")
+    
+    with col_m3:
+        st.metric("🔥 Vencidos", total_vencidos, 
+                  delta=f"-{total_vencidos}" if total_vencidos > 0 else "0",
+                  delta_color="inverse", 
+                  help="Atendimentos de dias anteriores não concluídos")
+    
+    # Alerta de vencidos
+    if total_vencidos > 0:
+        st.error(f"⚠️ **ATENÇÃO:** Você tem {total_vencidos} atendimento(s) vencido(s) de dias anteriores! Priorize-os.")
+
+
+@st.fragment
+def card_atendimento(idx, agend, hoje_dt):
+    """Card de um agendamento ativo
+    
+    Fragmento: abrir o card ou enviar o formulário reexecuta apenas este card.
+    """
+    chave_card = f"card_atend_{idx}"
+    if mostrar_card_concluido(chave_card):
+        return
     
-    with col_dias:
-        if 'Dias desde a compra' in df_clientes.columns:
-            dias_min = 0
-            dias_max = int(df_clientes['Dias desde a compra'].max()) if df_clientes['Dias desde a compra'].max() > 0 else 365
-            filtro_dias = st.slider(
-                "📅 Dias desde última compra:",
-                dias_min,
-                dias_max,
-                (dias_min, dias_max),
-                label_visibility="collapsed"
-            )
-        else:
-            filtro_dias = None
+    # Verificar se está vencido
+    data_chamada_str = agend.get('Data de chamada', '')
+    esta_vencido = bool(agend.get('_Data_Chamada', pd.NaT) < hoje_dt)
     
-    # Aplicar filtros
-    df_filtrado = df_clientes.copy()
-    if busca_nome and 'Nome' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['Nome'].str.contains(busca_nome, case=False, na=False)]
-    if filtro_dias and 'Dias desde a compra' in df_filtrado.columns:
-        df_filtrado = df_filtrado[(df_filtrado['Dias desde a compra'] >= filtro_dias[0]) & (df_filtrado['Dias desde a compra'] <= filtro_dias[1])]
+    # Badge de status
+    nome_cliente = agend.get('Nome', 'N/D')
+    classificacao = agend.get('Classificação', 'N/D')
+    status_badge = "🔥 VENCIDO" if esta_vencido else "📅 HOJE"
     
-    st.markdown("---")
-    st.subheader(f"📋 Clientes para Check-in ({len(df_filtrado)})")
+    # Título do card com status visual
+    titulo_card = f"{status_badge} | 👤 {nome_cliente} | 🏷️ {classificacao}"
     
-    if df_filtrado.empty:
-        st.info("Nenhum cliente encontrado com os filtros aplicados")
+    card = abrir_card(titulo_card, chave=chave_card)
+    if card is None:
         return
     
-    # Cards de clientes - Estilo otimizado com expander
-    for index, cliente in df_filtrado.iterrows():
+    with card:
+        col_esq, col_dir = st.columns([1, 1])
         
-        # Título do card com informações principais
-        nome_cliente = cliente.get('Nome', 'Nome não disponível')
-        valor_cliente = cliente.get('Valor', 0)
+        # ========== COLUNA ESQUERDA: INFORMAÇÕES ==========
+        with col_esq:
+            st.markdown("### 📊 Dados do Cliente")
+            
+            # Informações básicas
+            st.write(f"**👤 Nome:** {nome_cliente}")
+            st.write(f"**📱 Telefone:** {agend.get('Telefone', 'N/D')}")
+            st.write(f"**🏷️ Classificação:** {classificacao}")
+            
+            # Valor com formatação
+            val = agend.get('Valor', 0)
+            st.write(f"**💰 Valor Total:** R$ {val if pd.notna(val) else 0:,.2f}")
+            
+            st.markdown("---")
+            
+            # Histórico do último atendimento
+            st.markdown("### 📝 Último Atendimento")
+            
+            data_contato = agend.get('Data de contato', 'N/D')
+            st.write(f"**📅 Data:** {data_contato}")
+            
+            rel_at = agend.get('Relato da conversa', '')
+            if rel_at and rel_at != '':
+                st.info(f"**Relato anterior:**\n\n{rel_at}")
+            else:
+                st.caption("_Sem relato anterior_")
+            
+            fol_at = agend.get('Follow up', '')
+            if fol_at and fol_at != '':
+                st.info(f"**Motivo deste contato:** {fol_at}")
+            else:
+                st.caption("_Sem motivo registrado_")
+            
+            if data_chamada_str and data_chamada_str != '':
+                if esta_vencido:
+                    st.error(f"**Agendado para:** {data_chamada_str} ⚠️ VENCIDA")
+                else:
+                    st.success(f"**Agendado para:** {data_chamada_str} ✅ HOJE")
+            
+            obs_at = agend.get('Observação', '')
+            if obs_at and obs_at != '':
+                st.info(f"**Obs anterior:** {obs_at}")
         
-        # Formatação do valor
-        if pd.notna(valor_cliente) and valor_cliente != '':
-            try:
-                valor_formatado = f"R$ {float(valor_cliente):,.2f}"
-            except:
-                valor_formatado = "R$ 0,00"
-        else:
-            valor_formatado = "R$ 0,00"
-        
-        # Card expansível com tema azul
-        with st.expander(
-            f"👤 {nome_cliente} | 💰 {valor_formatado} | 🏷️ {classificacao_selecionada}",
-            expanded=False
-        ):
-            # Dividir em 2 colunas
-            col_info_card, col_form = st.columns([1, 1])
+        # ========== COLUNA DIREITA: NOVO AGENDAMENTO ==========
+        with col_dir:
+            st.markdown("### ✏️ Registrar Novo Atendimento")
             
-            # ========== COLUNA ESQUERDA: INFORMAÇÕES DO CLIENTE ==========
-            with col_info_card:
-                st.markdown("### 📊 Informações do Cliente")
+            with st.form(key=f"form_atend_{idx}"):
                 
-                # Dados principais
-                st.write(f"**👤 Nome Completo:** {nome_cliente}")
-                st.write(f"**📧 E-mail:** {cliente.get('Email', 'N/D')}")
-                st.write(f"**📱 Telefone:** {cliente.get('Telefone', 'N/D')}")
-                st.write(f"**🏷️ Classificação:** {classificacao_selecionada}")
+                st.info("💡 Preencha como foi a conversa de hoje e agende o próximo contato")
                 
-                st.markdown("---")
+                # Campos do formulário
+                novo_relato = st.text_area(
+                    "📝 Como foi a conversa de hoje?",
+                    height=120,
+                    placeholder="Descreva os principais pontos da conversa...",
+                    help="Registre o que foi conversado neste atendimento"
+                )
                 
-                # Métricas em mini cards
-                st.markdown("### 📈 Histórico de Compras")
+                novo_follow = st.text_input(
+                    "🎯 Motivo do Próximo Contato:",
+                    placeholder="Ex: Enviar proposta, Confirmar interesse...",
+                    help="Defina o próximo passo"
+                )
                 
-                met1, met2, met3 = st.columns(3)
+                nova_data = st.date_input(
+                    "📅 Data do Próximo Contato:",
+                    value=None,
+                    help="Quando será o próximo follow-up?"
+                )
                 
-                with met1:
-                    st.metric(
-                        label="💰 Gasto Total",
-                        value=valor_formatado,
-                        help="Valor total gasto pelo cliente"
-                    )
+                nova_obs = st.text_area(
+                    "💬 Observações Adicionais:",
+                    height=80,
+                    placeholder="Informações extras relevantes..."
+                )
                 
-                with met2:
-                    if 'Compras' in df_filtrado.columns:
-                        compras = cliente.get('Compras', 0)
-                        if pd.notna(compras) and compras != '':
-                            try:
-                                st.metric("🛒 Compras", int(float(compras)))
-                            except:
-                                st.metric("🛒 Compras", "0")
-                        else:
-                            st.metric("🛒 Compras", "0")
-                    else:
-                        st.metric("🛒 Compras", "N/D")
+                st.markdown("---")
                 
-                with met3:
-                    if 'Dias desde a compra' in df_filtrado.columns:
-                        dias = cliente.get('Dias desde a compra', 0)
-                        if pd.notna(dias) and dias != '':
-                            try:
-                                dias_int = int(round(float(dias)))
-                                st.metric("📅 Dias", dias_int, help="Dias desde a última compra")
-                            except:
-                                st.metric("📅 Dias", "0")
-                        else:
-                            st.metric("📅 Dias", "0")
-                    else:
-                        st.metric("📅 Dias", "N/D")
-            
-            # ========== COLUNA DIREITA: FORMULÁRIO DE CHECK-IN ==========
-            with col_form:
-                st.markdown("### ✏️ Registrar Check-in")
+                # Botão único: Realizar Novo Agendamento
+                btn_novo_agendamento = st.form_submit_button(
+                    "✅ Realizar Novo Agendamento",
+                    type="primary",
+                    use_container_width=True
+                )
                 
-                # Formulário de check-in
-                with st.form(key=f"form_checkin_{index}"):
-                    
-                    st.info("💡 Preencha as informações do primeiro contato com o cliente")
-                    
-                    # Campo: Primeira conversa
-                    primeira_conversa = st.text_area(
-                        "📝 Como foi a primeira conversa?",
-                        height=120,
-                        help="Registre os principais pontos da conversa inicial",
-                        placeholder="Ex: Cliente demonstrou interesse em produtos premium. Mencionou necessidade de entrega rápida..."
-                    )
-                    
-                    # Campo: Motivo do próximo contato
-                    proximo_contato = st.text_input(
-                        "🎯 Qual o motivo do próximo contato?",
-                        help="Defina o objetivo do próximo follow-up",
-                        placeholder="Ex: Enviar catálogo de produtos, Confirmar orçamento..."
-                    )
-                    
-                    # Campo: Data do próximo contato
-                    data_proximo = st.date_input(
-                        "📅 Data do próximo contato:",
-                        value=None,
-                        help="Quando será o próximo follow-up?"
-                    )
-                    
-                    # Campo: Observações adicionais
-                    observacoes = st.text_area(
-                        "💬 Observações adicionais:",
-                        height=80,
-                        placeholder="Informações extras relevantes sobre o cliente..."
-                    )
-                    
-                    st.markdown("---")
-                    
-                    # Botão de check-in
-                    btn_checkin = st.form_submit_button(
-                        "✅ Realizar Check-in",
-                        type="primary",
-                        use_container_width=True
-                    )
-                    
-                    # Ação do botão
-                    if btn_checkin:
-                        # Validação
-                        if not primeira_conversa:
-                            st.error("❌ Preencha como foi a primeira conversa antes de continuar!")
-                        elif not proximo_contato:
-                            st.error("❌ Defina o motivo do próximo contato!")
-                        else:
-                            with st.spinner('Processando check-in...'):
-                                # Preparar dados para agendamento
-                                try:
-                                    conn = get_gsheets_connection()
-                                    df_agendamentos = conn.read(worksheet="AGENDAMENTOS_ATIVOS", ttl=0)
-                                    
-                                    nova_linha = {
-                                        'Data de contato': datetime.now().strftime('%d/%m/%Y'),
-                                        'Nome': cliente.get('Nome', ''),
-                                        'Classificação': classificacao_selecionada,
-                                        'Valor': cliente.get('Valor', ''),
-                                        'Telefone': cliente.get('Telefone', ''),
-                                        'Relato da conversa': primeira_conversa,
-                                        'Follow up': proximo_contato,
-                                        'Data de chamada': data_proximo.strftime('%d/%m/%Y') if data_proximo else '',
-                                        'Observação': observacoes if observacoes else 'Check-in realizado via CRM'
-                                    }
-                                    
-                                    df_nova_linha = pd.DataFrame([nova_linha])
-                                    df_atualizado = pd.concat([df_agendamentos, df_nova_linha], ignore_index=True)
-                                    conn.update(worksheet="AGENDAMENTOS_ATIVOS", data=df_atualizado)
-                                    
-                                    carregar_dados.clear()
-                                    st.success(f"✅ Check-in realizado com sucesso para **{nome_cliente}**!")
-                                    st.balloons()
-                                    time.sleep(2)
-                                    st.rerun()
-                                    
-                                except Exception as e:
-                                    st.error(f"❌ Erro ao realizar check-in: {e}")
-        
-        # Separador entre cards
-        st.markdown("---")
-
+                # ========== AÇÃO DO BOTÃO ==========
+                if btn_novo_agendamento:
+                    # Validação
+                    if not novo_relato:
+                        st.error("❌ Preencha como foi a conversa de hoje!")
+                    elif not novo_follow:
+                        st.error("❌ Defina o motivo do próximo contato!")
+                    elif not nova_data:
+                        st.error("❌ Selecione a data do próximo contato!")
+                    else:
+                        with st.spinner("Processando novo agendamento..."):
+                            try:
+                                # 1. Preparar linha para histórico com data de conclusão
+                                linha_historico = registro(agend)
+                                linha_historico['Data de conclusão'] = datetime.now().strftime('%d/%m/%Y %H:%M')
+                                
+                                # 2. Preparar NOVO agendamento para AGENDAMENTOS_ATIVOS
+                                novo_agendamento = {
+                                    'ID_Agendamento': novo_id_agendamento(),
+                                    'Data de contato': datetime.now().strftime('%d/%m/%Y'),
+                                    'Nome': agend.get('Nome', ''),
+                                    'Classificação': agend.get('Classificação', ''),
+                                    'Valor': agend.get('Valor', ''),
+                                    'Telefone': agend.get('Telefone', ''),
+                                    'Relato da conversa': novo_relato,
+                                    'Follow up': novo_follow,
+                                    'Data de chamada': nova_data.strftime('%d/%m/%Y'),
+                                    'Observação': nova_obs
+                                }
+                                
+                                # 3. Remover o antigo, gravar no histórico e incluir o novo
+                                #    em uma única requisição (localizando pela chave, não pelo índice)
+                                get_armazenamento().move_row(
+                                    "AGENDAMENTOS_ATIVOS",
+                                    chave_agendamento(agend),
+                                    "HISTORICO",
+                                    linha_historico,
+                                    replacement_row=novo_agendamento
+                                )
+                                
+                                # Limpar cache das abas alteradas e atualizar só este card e os contadores
+                                invalidar("AGENDAMENTOS_ATIVOS", "HISTORICO")
+                                registrar_no_resumo(agend.get('Telefone', ''), finalizados=1, contato=True)
+                                contador = 'vencidos' if esta_vencido else 'pendentes'
+                                resumo = st.session_state.resumo_atendimento
+                                resumo[contador] = max(0, resumo[contador] - 1)
+                                concluir_card(
+                                    chave_card,
+                                    f"✅ Atendimento de **{nome_cliente}** registrado; próximo contato em "
+                                    f"{nova_data.strftime('%d/%m/%Y')}  \n{texto_resumo_atendimento()}"
+                                )
+                                st.toast("✅ Agendamento atualizado!", icon="✅")
+                                st.rerun(scope="fragment")
+                                
+                            except Exception as e:
+                                st.error(f"❌ Erro ao processar agendamento: {e}")
+    
+    
+    st.markdown("---")
 
 
-# ============================================================================
-# RENDER - PÁGINA EM ATENDIMENTO
-# ============================================================================
 
 def render_em_atendimento():
     """Renderiza a página de Em Atendimento - Versão Otimizada"""
@@ -689,9 +1371,13 @@ def render_em_atendimento():
     st.markdown("Gerencie os atendimentos agendados para hoje")
     st.markdown("---")
     
+    # Execução completa: a lista é recarregada, os cards concluídos já saíram dela
+    st.session_state.cards_concluidos = {}
+    
     # Carregar dados
     with st.spinner("Carregando agendamentos..."):
         df_agendamentos = carregar_dados("AGENDAMENTOS_ATIVOS")
+    legenda_dados("AGENDAMENTOS_ATIVOS")
     
     if df_agendamentos.empty:
         st.info("✅ Nenhum agendamento ativo no momento")
@@ -699,85 +1385,28 @@ def render_em_atendimento():
         return
     
     # ========== FILTRAR APENAS ATENDIMENTOS DO DIA ==========
-    hoje_dt = datetime.now()
-    hoje_str_br = hoje_dt.strftime('%d/%m/%Y')  # Formato brasileiro
-    hoje_str_iso = hoje_dt.strftime('%Y/%m/%d')  # Formato ISO
-    hoje_str_iso2 = hoje_dt.strftime('%Y-%m-%d')  # Formato ISO com hífen
-
-    # Filtrar apenas agendamentos para hoje (aceita múltiplos formatos)
+    # '_Data_Chamada' já vem convertida para datetime no carregamento da aba
+    # (aceita DD/MM/AAAA, AAAA/MM/DD e AAAA-MM-DD)
+    hoje_dt = pd.Timestamp(datetime.now().date())
+    
     df_hoje = pd.DataFrame()
-    if 'Data de chamada' in df_agendamentos.columns:
-        df_hoje = df_agendamentos[
-            (df_agendamentos['Data de chamada'] == hoje_str_br) |
-            (df_agendamentos['Data de chamada'] == hoje_str_iso) |
-            (df_agendamentos['Data de chamada'] == hoje_str_iso2)
-        ].copy()
-
-    # Calcular vencidos (datas anteriores a hoje)
     df_vencidos = pd.DataFrame()
-    if 'Data de chamada' in df_agendamentos.columns:
-        vencidos_lista = []
-        for idx, row in df_agendamentos.iterrows():
-            data_chamada_str = row.get('Data de chamada', '')
-            if data_chamada_str and data_chamada_str != '':
-                try:
-                    # Tentar múltiplos formatos
-                    data_chamada_dt = None
-                    
-                    # Tentar formato brasileiro DD/MM/YYYY
-                    try:
-                        data_chamada_dt = datetime.strptime(data_chamada_str, '%d/%m/%Y')
-                    except:
-                        pass
-                    
-                    # Tentar formato ISO YYYY/MM/DD
-                    if not data_chamada_dt:
-                        try:
-                            data_chamada_dt = datetime.strptime(data_chamada_str, '%Y/%m/%d')
-                        except:
-                            pass
-                    
-                    # Tentar formato ISO com hífen YYYY-MM-DD
-                    if not data_chamada_dt:
-                        try:
-                            data_chamada_dt = datetime.strptime(data_chamada_str, '%Y-%m-%d')
-                        except:
-                            pass
-                    
-                    # Se conseguiu converter e está vencida
-                    if data_chamada_dt and data_chamada_dt.date() < hoje_dt.date():
-                        vencidos_lista.append(idx)
-                except:
-                    pass
-        
-        if vencidos_lista:
-            df_vencidos = df_agendamentos.loc[vencidos_lista].copy()
+    if '_Data_Chamada' in df_agendamentos.columns:
+        datas_chamada = df_agendamentos['_Data_Chamada']
+        df_hoje = df_agendamentos[datas_chamada == hoje_dt]
+        df_vencidos = df_agendamentos[datas_chamada < hoje_dt]
     
     # ========== DASHBOARD DE MÉTRICAS ==========
     st.subheader("📊 Resumo do Dia")
     
-    total_hoje = len(df_hoje)
-    total_vencidos = len(df_vencidos)
-    pendentes_hoje = total_hoje  # Todos os de hoje são pendentes até serem finalizados
-    
-    # Exibir métricas
-    col_m1, col_m2, col_m3 = st.columns(3)
-    
-    with col_m1:
-        st.metric("📊 Total do Dia", total_hoje, help="Total de atendimentos agendados para hoje")
-    
-    with col_m2:
-        st.metric("⏳ Pendentes", pendentes_hoje, help="Atendimentos que faltam finalizar hoje")
-    
-    with col_m3:
-        st.metric("🔥 Vencidos", total_vencidos, 
-                  delta=f"-{total_vencidos}" if total_vencidos > 0 else "0",
-                  delta_color="inverse", 
-                  help="Atendimentos de dias anteriores não concluídos")
-    
-    # Alerta de vencidos
-    if total_vencidos > 0:
-        st.error(f"⚠️ **ATENÇÃO:** Você tem {total_vencidos} atendimento(s) vencido(s) de dias anteriores! Priorize-os.")
+    # Todos os de hoje são pendentes até serem finalizados; os cards
+    # descontam daqui ao finalizar e mostram o que resta no próprio resumo
+    st.session_state.resumo_atendimento = {
+        'total': len(df_hoje),
+        'pendentes': len(df_hoje),
+        'vencidos': len(df_vencidos)
+    }
+    painel_resumo_atendimento()
     
     st.markdown("---")
     
@@ -805,11 +1434,11 @@ def render_em_atendimento():
     with col_f3:
         # Selecionar dataset baseado na visualização
         if visualizar == "Hoje":
-            df_trabalho = df_hoje.copy()
+            df_trabalho = df_hoje
         elif visualizar == "Vencidos":
-            df_trabalho = df_vencidos.copy()
-        else:  # Todos
-            df_trabalho = pd.concat([df_hoje, df_vencidos]).drop_duplicates()
+            df_trabalho = df_vencidos
+        else:  # Todos (os dois grupos não se sobrepõem)
+            df_trabalho = pd.concat([df_hoje, df_vencidos])
         
         if 'Classificação' in df_trabalho.columns and not df_trabalho.empty:
             class_opts = ['Todos'] + sorted(list(df_trabalho['Classificação'].dropna().unique()))
@@ -818,10 +1447,10 @@ def render_em_atendimento():
             filtro_class = 'Todos'
     
     # Aplicar filtros
-    df_filt = df_trabalho.copy()
+    df_filt = df_trabalho
     
     if busca and 'Nome' in df_filt.columns:
-        df_filt = df_filt[df_filt['Nome'].str.contains(busca, case=False, na=False)]
+        df_filt = filtrar_por_nome(df_filt, "AGENDAMENTOS_ATIVOS", df_agendamentos, busca)
     
     if filtro_class != 'Todos' and 'Classificação' in df_filt.columns:
         df_filt = df_filt[df_filt['Classificação'] == filtro_class]
@@ -840,206 +1469,11 @@ def render_em_atendimento():
             st.info("Nenhum agendamento encontrado")
         return
     
-    # Cards de agendamentos
-    for idx, agend in df_filt.iterrows():
-        
-        # Verificar se está vencido
-        esta_vencido = False
-        data_chamada_str = agend.get('Data de chamada', '')
-        
-        if data_chamada_str and data_chamada_str != '':
-            try:
-                # Tentar múltiplos formatos de data
-                data_chamada_dt = None
-                
-                # Formato brasileiro DD/MM/YYYY
-                try:
-                    data_chamada_dt = datetime.strptime(data_chamada_str, '%d/%m/%Y')
-                except:
-                    pass
-                
-                # Formato ISO YYYY/MM/DD
-                if not data_chamada_dt:
-                    try:
-                        data_chamada_dt = datetime.strptime(data_chamada_str, '%Y/%m/%d')
-                    except:
-                        pass
-                
-                # Formato ISO com hífen YYYY-MM-DD
-                if not data_chamada_dt:
-                    try:
-                        data_chamada_dt = datetime.strptime(data_chamada_str, '%Y-%m-%d')
-                    except:
-                        pass
-                
-                # Verificar se está vencido
-                if data_chamada_dt and data_chamada_dt.date() < hoje_dt.date():
-                    esta_vencido = True
-            except:
-                pass
-        
-        # Badge de status
-        nome_cliente = agend.get('Nome', 'N/D')
-        classificacao = agend.get('Classificação', 'N/D')
-        status_badge = "🔥 VENCIDO" if esta_vencido else "📅 HOJE"
-        
-        # Título do expander com status visual
-        titulo_card = f"{status_badge} | 👤 {nome_cliente} | 🏷️ {classificacao}"
-        
-        with st.expander(titulo_card, expanded=False):
-            col_esq, col_dir = st.columns([1, 1])
-            
-            # ========== COLUNA ESQUERDA: INFORMAÇÕES ==========
-            with col_esq:
-                st.markdown("### 📊 Dados do Cliente")
-                
-                # Informações básicas
-                st.write(f"**👤 Nome:** {nome_cliente}")
-                st.write(f"**📱 Telefone:** {agend.get('Telefone', 'N/D')}")
-                st.write(f"**🏷️ Classificação:** {classificacao}")
-                
-                # Valor com formatação
-                val = agend.get('Valor', 0)
-                if pd.notna(val) and val != '':
-                    try:
-                        st.write(f"**💰 Valor Total:** R$ {float(val):,.2f}")
-                    except:
-                        st.write(f"**💰 Valor Total:** {val}")
-                else:
-                    st.write("**💰 Valor Total:** R$ 0,00")
-                
-                st.markdown("---")
-                
-                # Histórico do último atendimento
-                st.markdown("### 📝 Último Atendimento")
-                
-                data_contato = agend.get('Data de contato', 'N/D')
-                st.write(f"**📅 Data:** {data_contato}")
-                
-                rel_at = agend.get('Relato da conversa', '')
-                if rel_at and rel_at != '':
-                    st.info(f"**Relato anterior:**\n\n{rel_at}")
-                else:
-                    st.caption("_Sem relato anterior_")
-                
-                fol_at = agend.get('Follow up', '')
-                if fol_at and fol_at != '':
-                    st.info(f"**Motivo deste contato:** {fol_at}")
-                else:
-                    st.caption("_Sem motivo registrado_")
-                
-                if data_chamada_str and data_chamada_str != '':
-                    if esta_vencido:
-                        st.error(f"**Agendado para:** {data_chamada_str} ⚠️ VENCIDA")
-                    else:
-                        st.success(f"**Agendado para:** {data_chamada_str} ✅ HOJE")
-                
-                obs_at = agend.get('Observação', '')
-                if obs_at and obs_at != '':
-                    st.info(f"**Obs anterior:** {obs_at}")
-            
-            # ========== COLUNA DIREITA: NOVO AGENDAMENTO ==========
-            with col_dir:
-                st.markdown("### ✏️ Registrar Novo Atendimento")
-                
-                with st.form(key=f"form_atend_{idx}"):
-                    
-                    st.info("💡 Preencha como foi a conversa de hoje e agende o próximo contato")
-                    
-                    # Campos do formulário
-                    novo_relato = st.text_area(
-                        "📝 Como foi a conversa de hoje?",
-                        height=120,
-                        placeholder="Descreva os principais pontos da conversa...",
-                        help="Registre o que foi conversado neste atendimento"
-                    )
-                    
-                    novo_follow = st.text_input(
-                        "🎯 Motivo do Próximo Contato:",
-                        placeholder="Ex: Enviar proposta, Confirmar interesse...",
-                        help="Defina o próximo passo"
-                    )
-                    
-                    nova_data = st.date_input(
-                        "📅 Data do Próximo Contato:",
-                        value=None,
-                        help="Quando será o próximo follow-up?"
-                    )
-                    
-                    nova_obs = st.text_area(
-                        "💬 Observações Adicionais:",
-                        height=80,
-                        placeholder="Informações extras relevantes..."
-                    )
-                    
-                    st.markdown("---")
-                    
-                    # Botão único: Realizar Novo Agendamento
-                    btn_novo_agendamento = st.form_submit_button(
-                        "✅ Realizar Novo Agendamento",
-                        type="primary",
-                        use_container_width=True
-                    )
-                    
-                    # ========== AÇÃO DO BOTÃO ==========
-                    if btn_novo_agendamento:
-                        # Validação
-                        if not novo_relato:
-                            st.error("❌ Preencha como foi a conversa de hoje!")
-                        elif not novo_follow:
-                            st.error("❌ Defina o motivo do próximo contato!")
-                        elif not nova_data:
-                            st.error("❌ Selecione a data do próximo contato!")
-                        else:
-                            with st.spinner("Processando novo agendamento..."):
-                                try:
-                                    conn = get_gsheets_connection()
-                                    
-                                    # 1. Mover agendamento atual para HISTORICO
-                                    df_historico = conn.read(worksheet="HISTORICO", ttl=0)
-                                    
-                                    # Preparar linha para histórico com data de conclusão
-                                    linha_historico = agend.to_dict()
-                                    linha_historico['Data de conclusão'] = datetime.now().strftime('%d/%m/%Y %H:%M')
-                                    
-                                    # Adicionar ao histórico
-                                    df_historico_novo = pd.concat([df_historico, pd.DataFrame([linha_historico])], ignore_index=True)
-                                    conn.update(worksheet="HISTORICO", data=df_historico_novo)
-                                    
-                                    # 2. Criar NOVO agendamento em AGENDAMENTOS_ATIVOS
-                                    df_agendamentos_atual = conn.read(worksheet="AGENDAMENTOS_ATIVOS", ttl=0)
-                                    
-                                    novo_agendamento = {
-                                        'Data de contato': datetime.now().strftime('%d/%m/%Y'),
-                                        'Nome': agend.get('Nome', ''),
-                                        'Classificação': agend.get('Classificação', ''),
-                                        'Valor': agend.get('Valor', ''),
-                                        'Telefone': agend.get('Telefone', ''),
-                                        'Relato da conversa': novo_relato,
-                                        'Follow up': novo_follow,
-                                        'Data de chamada': nova_data.strftime('%d/%m/%Y'),
-                                        'Observação': nova_obs
-                                    }
-                                    
-                                    # 3. Remover o agendamento antigo
-                                    df_agendamentos_atualizado = df_agendamentos_atual.drop(idx).reset_index(drop=True)
-                                    
-                                    # 4. Adicionar o novo agendamento
-                                    df_agendamentos_final = pd.concat([df_agendamentos_atualizado, pd.DataFrame([novo_agendamento])], ignore_index=True)
-                                    
-                                    # 5. Salvar em AGENDAMENTOS_ATIVOS
-                                    conn.update(worksheet="AGENDAMENTOS_ATIVOS", data=df_agendamentos_final)
-                                    
-                                    # Limpar cache e recarregar
-                                    carregar_dados.clear()
-                                    st.toast("✅ Agendamento atualizado!", icon="✅")
-                                    time.sleep(0.5)
-                                    st.rerun()
-                                    
-                                except Exception as e:
-                                    st.error(f"❌ Erro ao processar agendamento: {e}")
-        
-        st.markdown("---")
+    # Cards de agendamentos - apenas os da página atual; conteúdo montado ao abrir
+    df_pagina = paginar(df_filt, "pag_atend")
+    
+    for idx, agend in df_pagina.iterrows():
+        card_atendimento(idx, agend, hoje_dt)
 
 
 
@@ -1069,6 +1503,9 @@ def render_suporte():
     if 'cliente_selecionado_ticket' not in st.session_state:
         st.session_state.cliente_selecionado_ticket = None
     
+    if 'tickets_encontrados' not in st.session_state:
+        st.session_state.tickets_encontrados = []
+    
     # ========== BARRA DE BUSCA E CRIAÇÃO ==========
     st.subheader("🔍 Buscar Ticket ou Criar Novo")
     
@@ -1093,6 +1530,7 @@ def render_suporte():
     if btn_novo_ticket:
         st.session_state.mostrar_form_novo = True
         st.session_state.ticket_encontrado = None
+        st.session_state.tickets_encontrados = []
         st.session_state.cliente_selecionado_ticket = None
     
     # ========== FORMULÁRIO: CRIAR NOVO TICKET ==========
@@ -1123,8 +1561,7 @@ def render_suporte():
             if btn_buscar_cliente and termo_busca_cliente:
                 with st.spinner("Buscando cliente..."):
                     try:
-                        conn = get_gsheets_connection()
-                        df_total = conn.read(worksheet="Total", ttl=0)
+                        df_total = carregar_dados("Total")
                         
                         if df_total.empty:
                             st.warning("⚠️ Nenhum cliente na base de dados")
@@ -1136,18 +1573,13 @@ def render_suporte():
                             if 'Telefone' in df_total.columns:
                                 telefone_busca = limpar_telefone(termo_limpo)
                                 if telefone_busca:  # ✅ CORREÇÃO: Verificar se tem números
-                                    df_total['Tel_Limpo'] = df_total['Telefone'].apply(limpar_telefone)
-                                    mask_tel = df_total['Tel_Limpo'].str.contains(
-                                        telefone_busca, case=False, na=False, regex=False
-                                    )
-                                    resultados = df_total[mask_tel].head(10).to_dict('records')
+                                    posicoes = indice_telefone("Total", df_total).buscar(telefone_busca)
+                                    resultados = df_total.iloc[posicoes[:10]].to_dict('records')
                             
                             # Se não encontrou, buscar por nome
                             if not resultados and 'Nome' in df_total.columns:
-                                mask_nome = df_total['Nome'].astype(str).str.contains(
-                                    termo_limpo, case=False, na=False, regex=False
-                                )
-                                resultados = df_total[mask_nome].head(10).to_dict('records')
+                                posicoes = indice_nomes("Total", df_total).buscar(termo_limpo, limite=10)
+                                resultados = df_total.iloc[posicoes].to_dict('records')
                             
                             if resultados:
                                 st.success(f"✅ {len(resultados)} cliente(s) encontrado(s)!")
@@ -1287,14 +1719,9 @@ def render_suporte():
                     else:
                         with st.spinner("Criando ticket..."):
                             try:
-                                conn = get_gsheets_connection()  # ✅ CORREÇÃO: Usar função correta
-                                
                                 # Gerar ID
                                 id_ticket = gerar_id_ticket()
                                 
-                                # Ler planilha atual
-                                df_suporte = conn.read(worksheet="SUPORTE", ttl=0)
-                                
                                 # Criar novo ticket
                                 novo_ticket = {
                                     'ID_Ticket': id_ticket,
@@ -1311,12 +1738,8 @@ def render_suporte():
                                     'Observações': f'Ticket criado via CRM por {aberto_por}'
                                 }
                                 
-                                # Adicionar à planilha
-                                df_novo = pd.concat(
-                                    [df_suporte, pd.DataFrame([novo_ticket])],
-                                    ignore_index=True
-                                )
-                                conn.update(worksheet="SUPORTE", data=df_novo)
+                                # Adicionar à planilha (apenas a linha nova)
+                                get_armazenamento().append_rows("SUPORTE", [novo_ticket])
                                 
                                 # Registrar log
                                 dados_log = {
@@ -1331,8 +1754,8 @@ def render_suporte():
                                 registrar_ticket_log_aberto(id_ticket, dados_log, aberto_por)
                                 
                                 # Limpar cache
-                                carregar_dados_suporte.clear()
-                                carregar_dados.clear()
+                                invalidar("SUPORTE", "LOG_TICKETS_ABERTOS")
+                                registrar_no_resumo(novo_ticket['Telefone'], tickets=1)
                                 
                                 # Feedback
                                 st.success(f"✅ Ticket **{id_ticket}** criado com sucesso!")
@@ -1355,57 +1778,86 @@ def render_suporte():
     if btn_buscar and termo_busca:
         with st.spinner("Buscando ticket..."):
             try:
-                conn = get_gsheets_connection()  # ✅ CORREÇÃO
-                df_suporte = conn.read(worksheet="SUPORTE", ttl=0)
+                df_suporte = carregar_dados("SUPORTE")
+                st.session_state.ticket_encontrado = None
+                st.session_state.tickets_encontrados = []
                 
                 if df_suporte.empty:
                     st.warning("⚠️ Nenhum ticket no sistema")
-                    st.session_state.ticket_encontrado = None
                 else:
                     termo_limpo = termo_busca.strip()
-                    resultado = None
+                    posicoes = []
                     
-                    # Buscar por ID
-                    if 'ID_Ticket' in df_suporte.columns:
+                    # ID completo: consulta direta no índice de IDs
+                    id_completo = PADRAO_ID_TICKET.fullmatch(termo_limpo) is not None
+                    if id_completo:
+                        posicoes = indice_ids("SUPORTE", df_suporte, 'ID_Ticket').exato(termo_limpo)
+                    
+                    # Parte do ID (ex.: só o número)
+                    if not id_completo and 'ID_Ticket' in df_suporte.columns:
                         mask_id = df_suporte['ID_Ticket'].astype(str).str.contains(
                             termo_limpo, case=False, na=False, regex=False
                         )
-                        if mask_id.any():
-                            resultado = df_suporte[mask_id].iloc[0]
+                        posicoes = mask_id.to_numpy().nonzero()[0]
+                    
+                    # Um ID completo que não existe não é telefone nem nome: não
+                    # cair nas buscas seguintes (os dígitos do ID achariam outros clientes)
                     
                     # Buscar por telefone
-                    if resultado is None and 'Telefone' in df_suporte.columns:
+                    if not id_completo and not len(posicoes) and 'Telefone' in df_suporte.columns:
                         tel_busca = limpar_telefone(termo_limpo)
                         if tel_busca:  # ✅ CORREÇÃO
-                            df_suporte['Tel_Limpo'] = df_suporte['Telefone'].apply(limpar_telefone)
-                            mask_tel = df_suporte['Tel_Limpo'].str.contains(
-                                tel_busca, case=False, na=False, regex=False
-                            )
-                            if mask_tel.any():
-                                resultado = df_suporte[mask_tel].iloc[0]
+                            posicoes = indice_telefone("SUPORTE", df_suporte).buscar(tel_busca)
                     
-                    # Buscar por nome
-                    if resultado is None and 'Nome' in df_suporte.columns:
-                        mask_nome = df_suporte['Nome'].astype(str).str.contains(
-                            termo_limpo, case=False, na=False, regex=False
-                        )
-                        if mask_nome.any():
-                            resultado = df_suporte[mask_nome].iloc[0]
+                    # Buscar por nome (mais relevantes primeiro)
+                    if not id_completo and not len(posicoes) and 'Nome' in df_suporte.columns:
+                        posicoes = indice_nomes("SUPORTE", df_suporte).buscar(termo_limpo)
                     
-                    if resultado is not None:
-                        st.session_state.ticket_encontrado = resultado.to_dict()
+                    encontrados = df_suporte.iloc[posicoes].to_dict('records')
+                    if len(encontrados) == 1:
+                        st.session_state.ticket_encontrado = encontrados[0]
+                    elif encontrados:
+                        st.session_state.tickets_encontrados = encontrados
                     else:
                         st.warning(f"⚠️ Ticket não encontrado: {termo_busca}")
-                        st.session_state.ticket_encontrado = None
             
             except Exception as e:
                 st.error(f"❌ Erro na busca: {e}")
                 st.exception(e)
                 st.session_state.ticket_encontrado = None
+                st.session_state.tickets_encontrados = []
     
     elif btn_buscar:
         st.warning("⚠️ Digite algo para buscar")
     
+    # ========== VÁRIOS TICKETS ENCONTRADOS ==========
+    if st.session_state.ticket_encontrado is None and st.session_state.tickets_encontrados:
+        tickets = st.session_state.tickets_encontrados
+        st.info(f"🔎 **{len(tickets)}** tickets encontrados para a busca")
+        
+        col_sel1, col_sel2, col_sel3 = st.columns([3, 1, 1])
+        with col_sel1:
+            escolhido = st.selectbox(
+                "Selecione o ticket:",
+                range(len(tickets)),
+                format_func=lambda i: (
+                    f"{tickets[i].get('ID_Ticket', 'N/D')} - {tickets[i].get('Nome', 'N/D')}"
+                    f" ({tickets[i].get('Status', 'N/D')})"
+                ),
+                key="ticket_escolhido_sup",
+                label_visibility="collapsed"
+            )
+        with col_sel2:
+            if st.button("📂 Abrir", type="primary", use_container_width=True, key="abrir_ticket_sup"):
+                st.session_state.ticket_encontrado = tickets[escolhido]
+                st.rerun()
+        with col_sel3:
+            if st.button("❌ Limpar busca", use_container_width=True, key="limpar_busca_ticket_sup"):
+                st.session_state.tickets_encontrados = []
+                st.rerun()
+        
+        st.markdown("---")
+    
     # ========== EXIBIR TICKET ENCONTRADO ==========
     if st.session_state.ticket_encontrado is not None:
         ticket = st.session_state.ticket_encontrado
@@ -1440,10 +1892,7 @@ def render_suporte():
             st.write(f"**📅 Aberto em:** {ticket.get('Data de abertura', 'N/D')}")
             
             progresso = ticket.get('Progresso', 0)
-            try:
-                prog_val = float(progresso) if progresso else 0
-            except:
-                prog_val = 0
+            prog_val = float(progresso) if pd.notna(progresso) else 0
             
             st.write(f"**📊 Progresso:** {prog_val}%")
             st.progress(prog_val / 100)
@@ -1479,7 +1928,8 @@ def render_suporte():
     st.subheader("📋 Tickets Ativos")
     
     with st.spinner("Carregando tickets..."):
-        df_suporte = carregar_dados_suporte()
+        df_suporte = carregar_dados("SUPORTE")
+    legenda_dados("SUPORTE")
     
     if df_suporte.empty:
         st.info("📭 Nenhum ticket ativo no momento")
@@ -1531,15 +1981,13 @@ def render_suporte():
         )
     
     # Aplicar filtros
-    df_filtrado = df_suporte.copy()
+    df_filtrado = df_suporte
     
     if filtro_prioridade != "Todas":
         df_filtrado = df_filtrado[df_filtrado['Prioridade'] == filtro_prioridade]
     
     if busca_lista:
-        df_filtrado = df_filtrado[
-            df_filtrado['Nome'].astype(str).str.contains(busca_lista, case=False, na=False, regex=False)
-        ]
+        df_filtrado = filtrar_por_nome(df_filtrado, "SUPORTE", df_suporte, busca_lista)
     
     st.markdown("---")
     
@@ -1550,26 +1998,26 @@ def render_suporte():
     # Ordenar por prioridade
     ordem_prioridade = {'Urgente': 0, 'Alta': 1, 'Média': 2, 'Baixa': 3}
     if 'Prioridade' in df_filtrado.columns:
-        df_filtrado['Ordem'] = df_filtrado['Prioridade'].map(ordem_prioridade).fillna(4)
-        df_filtrado = df_filtrado.sort_values('Ordem')
+        # Ordena por uma chave calculada, sem acrescentar coluna ao DataFrame
+        df_filtrado = df_filtrado.sort_values(
+            'Prioridade',
+            key=lambda prioridade: prioridade.map(ordem_prioridade).astype('float64').fillna(4),
+            kind='stable'
+        )
     
     # Exibir tickets
-    st.subheader(f"📚 Lista de Tickets ({len(df_filtrado)})
-
-")
+    st.subheader(f"📚 Lista de Tickets ({len(df_filtrado)})")
     
     icones = {'Urgente': '🔴', 'Alta': '🟠', 'Média': '🟡', 'Baixa': '🟢'}
     
-    for idx, row in df_filtrado.iterrows():
+    df_pagina = paginar(df_filtrado, "pag_suporte")
+    
+    for idx, row in df_pagina.iterrows():
         id_ticket = row.get('ID_Ticket', 'N/D')
         nome = row.get('Nome', 'N/D')
         prioridade = row.get('Prioridade', 'Média')
         progresso = row.get('Progresso', 0)
-        
-        try:
-            prog_val = float(progresso) if progresso else 0
-        except:
-            prog_val = 0
+        prog_val = float(progresso) if pd.notna(progresso) else 0
         
         icone = icones.get(prioridade, '⚪')
         
@@ -1585,7 +2033,11 @@ def render_suporte():
         
         expandir = prioridade == 'Urgente'
         
-        with st.expander(titulo, expanded=expandir):
+        card = abrir_card(titulo, chave=f"card_sup_{idx}_{id_ticket}", aberto=expandir)
+        if card is None:
+            continue
+        
+        with card:
             col_info, col_acao = st.columns([3, 1])
             
             with col_info:
@@ -1663,19 +2115,17 @@ def render_historico():
             if not df_total.empty:
                 # Buscar por telefone
                 if 'Telefone' in df_total.columns:
-                    mask_telefone = df_total['Telefone'].astype(str).str.contains(termo_limpo, case=False, na=False, regex=False)
-                    resultado_telefone = df_total[mask_telefone]
+                    posicoes = indice_telefone("Total", df_total).buscar(termo_limpo)
                     
-                    if not resultado_telefone.empty:
-                        cliente_encontrado = resultado_telefone.iloc[0]
+                    if len(posicoes):
+                        cliente_encontrado = df_total.iloc[posicoes[0]]
                 
                 # Se não encontrou por telefone, buscar por nome
                 if cliente_encontrado is None and 'Nome' in df_total.columns:
-                    mask_nome = df_total['Nome'].astype(str).str.contains(termo_limpo, case=False, na=False, regex=False)
-                    resultado_nome = df_total[mask_nome]
+                    posicoes = indice_nomes("Total", df_total).buscar(termo_limpo, limite=1)
                     
-                    if not resultado_nome.empty:
-                        cliente_encontrado = resultado_nome.iloc[0]
+                    if len(posicoes):
+                        cliente_encontrado = df_total.iloc[posicoes[0]]
             
             # Salvar no session_state
             if cliente_encontrado is not None:
@@ -1713,81 +2163,46 @@ def render_historico():
             st.write(f"**🏷️ Classificação:** {cliente.get('Classificação ', 'N/D')}")
             
             valor = cliente.get('Valor', 0)
-            if pd.notna(valor) and valor != '':
-                try:
-                    st.write(f"**💰 Valor Total:** R$ {float(valor):,.2f}")
-                except:
-                    st.write(f"**💰 Valor Total:** {valor}")
-            else:
-                st.write("**💰 Valor Total:** R$ 0,00")
+            st.write(f"**💰 Valor Total:** R$ {valor if pd.notna(valor) else 0:,.2f}")
             
             compras = cliente.get('Compras', 0)
-            if pd.notna(compras) and compras != '':
-                try:
-                    st.write(f"**🛒 Total de Compras:** {int(float(compras))}")
-                except:
-                    st.write(f"**🛒 Total de Compras:** {compras}")
-            else:
-                st.write("**🛒 Total de Compras:** 0")
+            st.write(f"**🛒 Total de Compras:** {int(compras) if pd.notna(compras) else 0}")
         
         with col_info3:
-            dias = cliente.get('Dias desde a compra', 0)
-            if pd.notna(dias) and dias != '':
-                try:
-                    st.write(f"**📅 Dias desde última compra:** {int(round(float(dias)))}")
-                except:
-                    st.write(f"**📅 Dias desde última compra:** {dias}")
-            else:
-                st.write("**📅 Dias desde última compra:** N/D")
+            dias = cliente.get('Dias desde a compra')
+            st.write(f"**📅 Dias desde última compra:** {int(round(dias)) if pd.notna(dias) else 'N/D'}")
         
         st.markdown("---")
         
         # ========== BUSCAR HISTÓRICO POR TELEFONE ==========
-        df_historico = carregar_dados("HISTORICO")
-        df_agendamentos = carregar_dados("AGENDAMENTOS_ATIVOS")
-        df_suporte = carregar_dados("SUPORTE")
+        dfs_cliente = registros_cliente(telefone_cliente)
+        registros = {nome_aba: df.to_dict('records') for nome_aba, df in dfs_cliente.items()}
+        legenda_dados(*ABAS_CLIENTE_360)
         
-        historico_cliente = []
-        agendamentos_ativos = []
-        tickets_suporte = []
-        
-        # Limpar telefone do cliente para comparação
-        telefone_limpo = limpar_telefone(telefone_cliente)
-        
-        # Histórico de atendimentos finalizados
-        if not df_historico.empty and 'Telefone' in df_historico.columns:
-            df_historico['Telefone_Limpo'] = df_historico['Telefone'].apply(limpar_telefone)
-            historico_cliente = df_historico[
-                df_historico['Telefone_Limpo'].str.contains(telefone_limpo, case=False, na=False, regex=False)
-            ].to_dict('records')
-        
-        # Agendamentos ativos
-        if not df_agendamentos.empty and 'Telefone' in df_agendamentos.columns:
-            df_agendamentos['Telefone_Limpo'] = df_agendamentos['Telefone'].apply(limpar_telefone)
-            agendamentos_ativos = df_agendamentos[
-                df_agendamentos['Telefone_Limpo'].str.contains(telefone_limpo, case=False, na=False, regex=False)
-            ].to_dict('records')
-        
-        # Tickets de suporte
-        if not df_suporte.empty and 'Telefone' in df_suporte.columns:
-            df_suporte['Telefone_Limpo'] = df_suporte['Telefone'].apply(limpar_telefone)
-            tickets_suporte = df_suporte[
-                df_suporte['Telefone_Limpo'].str.contains(telefone_limpo, case=False, na=False, regex=False)
-            ].to_dict('records')
+        historico_cliente = registros["HISTORICO"]
+        agendamentos_ativos = registros["AGENDAMENTOS_ATIVOS"]
+        tickets_suporte = registros["SUPORTE"]
         
         # ========== MÉTRICAS DE HISTÓRICO ==========
         st.subheader("📈 Resumo de Atendimentos")
         
-        col_m1, col_m2, col_m3 = st.columns(3)
+        # Números do resumo por cliente; sem linha no resumo, calculados nos registros
+        resumo = resumo_clientes().linha(telefone_cliente) or linha_calculada(telefone_cliente, dfs_cliente)
+        ultimo_contato = resumo.get('Ultimo_Contato')
+        
+        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
         
         with col_m1:
-            st.metric("📜 Histórico", len(historico_cliente), help="Atendimentos finalizados")
+            st.metric("📜 Histórico", int(resumo['Atendimentos_Finalizados']), help="Atendimentos finalizados")
         
         with col_m2:
-            st.metric("📞 Agendamentos Ativos", len(agendamentos_ativos), help="Atendimentos em andamento")
+            st.metric("📞 Agendamentos Ativos", int(resumo['Agendamentos_Ativos']), help="Atendimentos em andamento")
         
         with col_m3:
-            st.metric("🆘 Tickets de Suporte", len(tickets_suporte), help="Chamados de suporte")
+            st.metric("🆘 Tickets de Suporte", int(resumo['Tickets_Abertos']), help="Chamados de suporte")
+        
+        with col_m4:
+            st.metric("🕒 Último Contato", ultimo_contato if pd.notna(ultimo_contato) and ultimo_contato else "N/D")
         
         st.markdown("---")
         
@@ -1887,10 +2302,8 @@ def render_historico():
                         st.error("❌ Selecione a data do agendamento!")
                     else:
                         try:
-                            conn = get_gsheets_connection()
-                            df_agend_atual = conn.read(worksheet="AGENDAMENTOS_ATIVOS", ttl=0)
-                            
                             novo_agend = {
+                                'ID_Agendamento': novo_id_agendamento(),
                                 'Data de contato': datetime.now().strftime('%d/%m/%Y'),
                                 'Nome': nome_cliente,
                                 'Classificação': cliente.get('Classificação ', 'N/D'),
@@ -1902,10 +2315,10 @@ def render_historico():
                                 'Observação': obs_agend if obs_agend else 'Agendamento criado via Histórico'
                             }
                             
-                            df_novo = pd.concat([df_agend_atual, pd.DataFrame([novo_agend])], ignore_index=True)
-                            conn.update(worksheet="AGENDAMENTOS_ATIVOS", data=df_novo)
+                            get_armazenamento().append_rows("AGENDAMENTOS_ATIVOS", [novo_agend])
                             
-                            carregar_dados.clear()
+                            invalidar("AGENDAMENTOS_ATIVOS")
+                            registrar_no_resumo(telefone_cliente, ativos=1)
                             st.success(f"✅ Agendamento criado!")
                             time.sleep(1)
                             st.rerun()
@@ -1948,9 +2361,6 @@ def render_historico():
                         st.error("❌ Descreva o problema!")
                     else:
                         try:
-                            conn = get_gsheets_connection()
-                            df_suporte_atual = conn.read(worksheet="SUPORTE", ttl=0)
-                            
                             novo_ticket = {
                                 'Data de abertura': datetime.now().strftime('%d/%m/%Y %H:%M'),
                                 'Nome': nome_cliente,
@@ -1964,10 +2374,10 @@ def render_historico():
                                 'Data de resolução': ''
                             }
                             
-                            df_novo = pd.concat([df_suporte_atual, pd.DataFrame([novo_ticket])], ignore_index=True)
-                            conn.update(worksheet="SUPORTE", data=df_novo)
+                            get_armazenamento().append_rows("SUPORTE", [novo_ticket])
                             
-                            carregar_dados.clear()
+                            invalidar("SUPORTE")
+                            registrar_no_resumo(telefone_cliente, tickets=1)
                             st.success(f"✅ Ticket aberto!")
                             time.sleep(1)
                             st.rerun()
@@ -1985,6 +2395,109 @@ def render_historico():
 # RENDER - PÁGINA DASHBOARD
 # ============================================================================
 
+def limites_rfm():
+    """Limites da classificação RFM: `[rfm]` no secrets.toml sobre os padrões"""
+    try:
+        config = dict(st.secrets.get("rfm", {}))
+    except Exception:
+        config = {}
+    return {**LIMITES_PADRAO, **config}
+
+
+def reclassificar_clientes(alteradas, coluna):
+    """Grava em Total apenas a nova classificação dos clientes alterados
+
+    Só linhas já existentes são alteradas; telefones que não estão mais em
+    Total (ex.: removidos desde a leitura) são ignorados e informados.
+    Retorna quantos clientes foram reclassificados (None em erro).
+    """
+    try:
+        nao_encontrados = get_armazenamento().update_rows("Total", 'Telefone', linhas_reclassificadas(alteradas, coluna))
+        invalidar("Total")
+        if nao_encontrados:
+            st.toast(f"⚠️ {len(nao_encontrados)} telefone(s) não encontrado(s) em Total", icon="⚠️")
+        return len(alteradas) - len(nao_encontrados)
+    except Exception as e:
+        st.error(f"Erro ao atualizar classificações: {e}")
+        return None
+
+
+def render_classificacao_rfm():
+    """Recalcula os segmentos de toda a base e grava só os que mudaram"""
+    st.subheader("🎯 Classificação RFM")
+    
+    if 'limites_rfm' not in st.session_state:
+        st.session_state.limites_rfm = limites_rfm()
+    limites = st.session_state.limites_rfm
+    
+    with st.expander("⚙️ Limites da classificação"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            limites['dias_novo'] = st.number_input("🆕 Novo: compra há até (dias)", min_value=1, value=int(limites['dias_novo']))
+            limites['dias_em_risco'] = st.number_input("⚠️ Em risco: sem comprar há mais de (dias)", min_value=1, value=int(limites['dias_em_risco']))
+        with col2:
+            limites['dias_dormente'] = st.number_input("😴 Dormente: sem comprar há mais de (dias)", min_value=1, value=int(limites['dias_dormente']))
+            limites['compras_leal'] = st.number_input("💙 Leal: compras (mínimo)", min_value=1, value=int(limites['compras_leal']))
+        with col3:
+            limites['compras_campeao'] = st.number_input("🏆 Campeão: compras (mínimo)", min_value=1, value=int(limites['compras_campeao']))
+            limites['valor_campeao'] = st.number_input("🏆 Campeão: valor total (mínimo)", min_value=0.0, value=float(limites['valor_campeao']), step=100.0)
+    
+    df_total = carregar_dados("Total")
+    legenda_dados("Total")
+    if df_total.empty:
+        st.info("Nenhum cliente na aba Total")
+        return
+    
+    problemas = validar_limites(limites)
+    if problemas:
+        st.error("❌ Limites inconsistentes: " + "; ".join(problemas))
+        return
+    
+    repetidos = telefones_repetidos(df_total)
+    if repetidos:
+        st.warning(
+            f"⚠️ {len(repetidos)} telefone(s) aparecem em mais de uma linha de Total; "
+            "só a primeira linha de cada um é reclassificada"
+        )
+        with st.expander("Ver telefones repetidos"):
+            st.write(", ".join(repetidos))
+    
+    alteradas = classificacoes_alteradas(df_total, limites)
+    if alteradas.empty:
+        st.success("✅ Todas as classificações estão de acordo com os limites atuais")
+        return
+    
+    st.info(f"📊 **{len(alteradas)}** cliente(s) mudam de segmento com os limites atuais")
+    transicoes = alteradas.groupby(['Atual', 'Nova'], dropna=False).size().reset_index(name='Clientes')
+    st.dataframe(transicoes, hide_index=True, use_container_width=True)
+    
+    if st.button(f"🔄 Atualizar {len(alteradas)} classificação(ões)", type="primary"):
+        with st.spinner("Gravando classificações..."):
+            reclassificados = reclassificar_clientes(alteradas, coluna_classificacao(df_total))
+            if reclassificados is not None:
+                st.toast(f"✅ {reclassificados} cliente(s) reclassificado(s)!", icon="✅")
+                st.rerun()
+
+
+def render_recalculo_resumo():
+    """Reconstrói RESUMO_CLIENTES a partir de HISTORICO, AGENDAMENTOS_ATIVOS e SUPORTE"""
+    st.subheader("🧮 Resumo por Cliente")
+    st.caption(
+        f"{len(resumo_clientes())} clientes em {ABA_RESUMO}. O resumo é atualizado a cada "
+        "check-in, atendimento e ticket; recalcule após editar as abas direto na planilha."
+    )
+    
+    if st.button("🧮 Recalcular resumo", key="recalcular_resumo"):
+        with st.spinner("Recalculando resumo dos clientes..."):
+            try:
+                df_resumo = calcular_resumo(aquecer_cache(ABAS_CLIENTE_360))
+                get_armazenamento().update(ABA_RESUMO, df_resumo)
+                invalidar(ABA_RESUMO)
+                st.success(f"✅ Resumo recalculado para {len(df_resumo)} clientes!")
+            except Exception as e:
+                st.error(f"Erro ao recalcular resumo: {e}")
+
+
 def render_dashboard():
     """Renderiza a página de Dashboard com análises e gráficos"""
     
@@ -1992,6 +2505,14 @@ def render_dashboard():
     st.markdown("Visão geral e análises do CRM")
     st.markdown("---")
     
+    render_classificacao_rfm()
+    
+    st.markdown("---")
+    
+    render_recalculo_resumo()
+    
+    st.markdown("---")
+    
     # Aqui vamos adicionar os gráficos aos poucos
     st.info("🚧 Dashboard em construção - Gráficos serão adicionados passo a passo")
     
@@ -2027,5 +2548,5 @@ elif pagina == "🆘 Suporte":
     render_suporte()
 elif pagina == "📜 Histórico":
     render_historico()
-elif menu == "Dashboard 📈":
+elif pagina == "Dashboard 📈":
     render_dashboard()    
@@ -0,0 +1,138 @@
+import pandas as pd
+import pytest
+
+from armazenamento import ArmazenamentoSQLite
+
+
+@pytest.fixture
+def armazenamento(tmp_path):
+    return ArmazenamentoSQLite(str(tmp_path / "crm.db"))
+
+
+def test_append_rows_preserva_ordem_e_colunas(armazenamento):
+    assert armazenamento.append_rows("HISTORICO", [{'Nome': "Ana", 'Telefone': "11999990000"}]) == 1
+    armazenamento.append_rows("HISTORICO", [{'Nome': "Bia", 'Telefone': "11888880000", 'Obs': "novo"}])
+
+    df = armazenamento.read("HISTORICO")
+    assert list(df.columns) == ['Nome', 'Telefone', 'Obs']
+    assert df['Nome'].tolist() == ["Ana", "Bia"]
+    assert df['Obs'].isna().tolist() == [True, False]
+
+
+def test_append_rows_vazio_nao_cria_aba(armazenamento):
+    assert armazenamento.append_rows("HISTORICO", []) == 0
+    assert armazenamento.read("HISTORICO").empty
+    assert armazenamento.revision("HISTORICO") == 0
+
+
+def test_move_row_remove_grava_destino_e_substituta(armazenamento):
+    armazenamento.append_rows("AGENDAMENTOS_ATIVOS", [
+        {'Nome': "Ana", 'Telefone': "1"},
+        {'Nome': "Bia", 'Telefone': "2"},
+    ])
+
+    armazenamento.move_row(
+        "AGENDAMENTOS_ATIVOS", {'Nome': "Ana", 'Telefone': "1"},
+        "HISTORICO", {'Nome': "Ana", 'Telefone': "1", 'Data de conclusão': "01/01/2025"},
+        replacement_row={'Nome': "Ana", 'Telefone': "1"}
+    )
+
+    ativos = armazenamento.read("AGENDAMENTOS_ATIVOS")
+    assert ativos['Nome'].tolist() == ["Bia", "Ana"]
+    historico = armazenamento.read("HISTORICO")
+    assert historico.to_dict('records') == [{'Nome': "Ana", 'Telefone': "1", 'Data de conclusão': "01/01/2025"}]
+
+
+def test_move_row_chave_inexistente_nao_altera_nada(armazenamento):
+    armazenamento.append_rows("AGENDAMENTOS_ATIVOS", [{'Nome': "Ana", 'Telefone': "1"}])
+    revisao = armazenamento.revision("AGENDAMENTOS_ATIVOS")
+
+    with pytest.raises(ValueError):
+        armazenamento.move_row("AGENDAMENTOS_ATIVOS", {'Nome': "Zé"}, "HISTORICO", {'Nome': "Zé"})
+
+    assert armazenamento.read("AGENDAMENTOS_ATIVOS")['Nome'].tolist() == ["Ana"]
+    assert armazenamento.read("HISTORICO").empty
+    assert armazenamento.revision("AGENDAMENTOS_ATIVOS") == revisao
+
+
+def test_upsert_rows_atualiza_existentes_e_acrescenta_novas(armazenamento):
+    armazenamento.append_rows("HISTORICO_METRICAS", [{'Data': "01/01/2025", 'Total': 10, 'Meta_Dia': 5}])
+
+    armazenamento.upsert_rows("HISTORICO_METRICAS", 'Data', [
+        {'Data': "01/01/2025", 'Total': 12},
+        {'Data': "02/01/2025", 'Total': 7},
+    ])
+
+    df = armazenamento.read("HISTORICO_METRICAS")
+    assert df['Data'].tolist() == ["01/01/2025", "02/01/2025"]
+    assert df['Total'].tolist() == [12, 7]
+    # Colunas fora das linhas enviadas são preservadas
+    assert df['Meta_Dia'].tolist()[0] == 5
+
+
+def test_upsert_rows_em_aba_nova_sem_a_coluna_chave_nas_linhas(armazenamento):
+    armazenamento.upsert_rows("RESUMO_CLIENTES", 'Telefone', [{'Telefone': "1", 'Tickets_Abertos': 1}])
+    armazenamento.upsert_rows("RESUMO_CLIENTES", 'Telefone', [{'Telefone': "1", 'Tickets_Abertos': 2}])
+
+    df = armazenamento.read("RESUMO_CLIENTES")
+    assert df.to_dict('records') == [{'Telefone': "1", 'Tickets_Abertos': 2}]
+
+
+def test_revision_conta_cada_escrita_por_aba(armazenamento):
+    assert armazenamento.revision("Total") == 0
+
+    armazenamento.update("Total", pd.DataFrame({'Nome': ["Ana"], 'Telefone': ["1"]}))
+    armazenamento.append_rows("Total", [{'Nome': "Bia", 'Telefone': "2"}])
+    armazenamento.update_row("Total", {'Telefone': "2"}, {'Nome': "Beatriz"})
+    assert armazenamento.revision("Total") == 3
+
+    armazenamento.move_row("Total", {'Telefone': "1"}, "HISTORICO", {'Nome': "Ana"})
+    assert armazenamento.revision("Total") == 4
+    assert armazenamento.revision("HISTORICO") == 1
+
+    armazenamento.read("Total")
+    assert armazenamento.revision("Total") == 4
+
+
+def test_revision_vista_por_outra_conexao(armazenamento):
+    outra = ArmazenamentoSQLite(armazenamento.caminho)
+    armazenamento.append_rows("SUPORTE", [{'ID': "TKT-2025-00001"}])
+    assert outra.revision("SUPORTE") == 1
+
+
+def test_read_column_le_so_a_coluna(armazenamento):
+    armazenamento.append_rows("Total", [
+        {'Nome': "Ana", 'Classificação ': "Novo"},
+        {'Nome': "Bia", 'Classificação ': "Leal"},
+    ])
+
+    coluna = armazenamento.read_column("Total", 'Classificação ')
+    assert coluna.tolist() == ["Novo", "Leal"]
+    assert armazenamento.read_column("Total", 'Inexistente').empty
+    assert armazenamento.read_column("SEM_ABA", 'Nome').empty
+
+
+def test_upsert_rows_cria_a_coluna_chave_que_falta(armazenamento):
+    armazenamento.update("HISTORICO_METRICAS", pd.DataFrame({'Total': [1]}))
+
+    armazenamento.upsert_rows("HISTORICO_METRICAS", 'Data', [{'Total': 2}])
+
+    df = armazenamento.read("HISTORICO_METRICAS")
+    assert list(df.columns) == ['Total', 'Data']
+    assert df['Total'].tolist() == [1, 2]
+
+
+def test_update_rows_nao_acrescenta_chaves_inexistentes(armazenamento):
+    armazenamento.append_rows("Total", [{'Telefone': "1", 'Classificação ': "Novo"}])
+    revisao = armazenamento.revision("Total")
+
+    nao_encontradas = armazenamento.update_rows("Total", 'Telefone', [
+        {'Telefone': "1", 'Classificação ': "Leal"},
+        {'Telefone': "2", 'Classificação ': "Novo"},
+    ])
+
+    assert nao_encontradas == ["2"]
+    assert armazenamento.read("Total").to_dict('records') == [{'Telefone': "1", 'Classificação ': "Leal"}]
+    assert armazenamento.revision("Total") == revisao + 1
+    assert armazenamento.update_rows("Total", 'Telefone', [{'Telefone': "3", 'Classificação ': "Novo"}]) == ["3"]
+    assert armazenamento.revision("Total") == revisao + 1
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from cache_disco import CacheDisco
+
+
+def test_carregar_devolve_o_que_foi_salvo(tmp_path):
+    disco = CacheDisco("app", formato="v1", diretorio=str(tmp_path))
+    disco.salvar("Total", pd.DataFrame({'Nome': ["Ana", "Bia"]}), "rev-1", "versao-1", 123.0)
+
+    df, revisao, versao, carregado_em = disco.carregar("Total")
+    assert df['Nome'].tolist() == ["Ana", "Bia"]
+    assert (revisao, versao, carregado_em) == ("rev-1", "versao-1", 123.0)
+
+
+def test_arquivo_de_outro_formato_e_descartado(tmp_path):
+    CacheDisco("app", formato="v1", diretorio=str(tmp_path)).salvar(
+        "Total", pd.DataFrame({'Nome': ["Ana"]}), "rev-1", "versao-1", 123.0
+    )
+
+    disco = CacheDisco("app", formato="v2", diretorio=str(tmp_path))
+    assert disco.carregar("Total") is None
+    assert not list((tmp_path / "app").iterdir())
+
+
+def test_namespaces_nao_compartilham_arquivos(tmp_path):
+    CacheDisco("app", diretorio=str(tmp_path)).salvar("Total", pd.DataFrame({'Nome': ["Ana"]}), 1, 1, 1.0)
+
+    assert CacheDisco("snapshot", diretorio=str(tmp_path)).carregar("Total") is None
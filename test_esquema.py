@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from esquema import converter_numeros, normalizar_datas, preparar_aba
+
+
+def test_normalizar_datas_aceita_varios_formatos():
+    datas = normalizar_datas(pd.Series(["17/10/2026", "2026/10/18", "2026-10-19", " 20/10/2026 ", "", None, "ontem"]))
+
+    assert datas.iloc[:4].tolist() == [pd.Timestamp(f"2026-10-{dia}") for dia in (17, 18, 19, 20)]
+    assert datas.iloc[4:].isna().all()
+
+
+def test_normalizar_datas_de_coluna_datetime_zera_a_hora():
+    datas = normalizar_datas(pd.Series(pd.to_datetime(["2026-10-17 14:30"])))
+
+    assert datas.tolist() == [pd.Timestamp("2026-10-17")]
+
+
+def test_converter_numeros_formato_brasileiro():
+    numeros = converter_numeros(pd.Series(["R$ 1.234,56", "1234.5", "12", "", "abc", None]))
+
+    assert numeros.iloc[:3].tolist() == [1234.56, 1234.5, 12.0]
+    assert numeros.iloc[3:].isna().all()
+    assert numeros.dtype == np.float64
+
+
+def test_preparar_aba_cria_colunas_derivadas():
+    df = pd.DataFrame({'Nome': ["Ana"], 'Data de chamada': ["17/10/2026"], 'Valor': ["R$ 10,00"]})
+
+    preparado = preparar_aba("AGENDAMENTOS_ATIVOS", df)
+
+    assert preparado['_Data_Chamada'].tolist() == [pd.Timestamp("2026-10-17")]
+    assert preparado['Valor'].tolist() == [10.0]
+    assert 'Valor' in df and df['Valor'].tolist() == ["R$ 10,00"]
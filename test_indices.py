@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from indices import (
+    IndiceChave,
+    IndiceNomes,
+    IndiceTelefone,
+    dobrar_acentos,
+    normalizar_nomes,
+    normalizar_telefones,
+    versao_dados,
+)
+
+
+def test_versao_dados_muda_com_a_ordem_das_linhas():
+    df = pd.DataFrame({'Nome': ["Ana", "Bia", "Caio"], 'Telefone': ["1", "2", "3"]})
+
+    assert versao_dados(df) == versao_dados(df.copy())
+    assert versao_dados(df) != versao_dados(df.iloc[::-1])
+    assert versao_dados(df) != versao_dados(df.assign(Nome=["Ana", "Bia", "Cauã"]))
+
+
+def test_normalizar_nomes_igual_a_dobrar_acentos():
+    nomes = ["João  Simões", "Søren Lima", "ÇARLOS", "Ｆｕｌｌ", None]
+
+    assert normalizar_nomes(nomes).tolist() == [dobrar_acentos(n) if n else '' for n in nomes]
+
+
+def test_indice_nomes_encontra_letras_que_nao_se_decompoem():
+    indice = IndiceNomes(["Søren Lima", "João Silva"])
+
+    assert indice.buscar("Søren").tolist() == [0]
+    assert indice.buscar("joao").tolist() == [1]
+
+
+def test_normalizar_telefones_mantem_so_digitos():
+    telefones = pd.Series(["(11) 99999-0000", "11999990000.0", None, "sem número"])
+
+    assert normalizar_telefones(telefones).tolist() == ["11999990000", "11999990000", '', '']
+    assert normalizar_telefones(pd.Series([11999990000.0, np.nan])).tolist() == ["11999990000", '']
+
+
+def test_indice_telefone_exato_e_repetidos():
+    indice = IndiceTelefone(["(11) 99999-0000", "21 3333-4444", "11999990000", None])
+
+    assert indice.exato("11999990000").tolist() == [0, 2]
+    assert indice.exato("2133334444").tolist() == [1]
+    assert len(indice.exato("000")) == 0
+    assert len(indice) == 2
+
+
+def test_indice_telefone_por_sufixo_prefixo_e_ddi():
+    indice = IndiceTelefone(["11999990000", "21999990000", "11988887777", "5511977776666"])
+
+    # Sem DDD: termina com o termo
+    assert indice.buscar("99999-0000").tolist() == [0, 1]
+    # Número digitado pela metade: começa com o termo
+    assert indice.buscar("1198").tolist() == [2]
+    # Termo com DDI + DDD e cadastro sem eles: cadastro igual a um sufixo do termo
+    assert indice.buscar("+55 (11) 98888-7777").tolist() == [2]
+    # Cadastro com DDI e termo sem ele
+    assert indice.buscar("11 97777-6666").tolist() == [3]
+    assert len(indice.buscar("abc")) == 0
+    assert len(indice.buscar("4242")) == 0
+
+
+def test_indice_telefone_sufixo_do_termo_respeita_minimo_de_digitos():
+    indice = IndiceTelefone(["0000"])
+
+    # '0000' é sufixo de '11999990000', mas tem menos que MIN_DIGITOS_SUFIXO
+    assert len(indice.buscar("11999990000")) == 0
+
+
+def test_indice_chave_ignora_caixa_e_espacos():
+    indice = IndiceChave([" tkt-2025-00001", "TKT-2025-00002", "TKT-2025-00001 ", None])
+
+    assert indice.exato("TKT-2025-00001").tolist() == [0, 2]
+    assert indice.exato("  tkt-2025-00002 ").tolist() == [1]
+    assert len(indice.exato("TKT-2025-00003")) == 0
+    assert len(indice.exato(None)) == 0
+    assert len(indice) == 2
+
+
+def test_indice_nomes_ordena_por_relevancia():
+    indice = IndiceNomes(["Maria Silva", "Silvana Souza", "João Silva", "Pedro Santos"])
+
+    resultado = indice.buscar("silva").tolist()
+    assert set(resultado[:2]) == {0, 2}
+    assert 3 not in resultado
+    # Termo sendo digitado casa com o início da palavra (nomes mais curtos primeiro)
+    assert indice.buscar("silv").tolist()[:3] == [2, 0, 1]
+    # Erro de digitação ainda encontra o nome
+    assert indice.buscar("Pedro Santso").tolist()[0] == 3
+    assert indice.buscar("silva", limite=1).tolist() == [2]
+
+
+def test_indice_nomes_termo_curto_e_vazio():
+    indice = IndiceNomes(["Ana Lima", "Bia Ana", "Caio", None])
+
+    # Menos de três letras: quem começa com o termo primeiro, depois os mais curtos
+    assert indice.buscar("an").tolist() == [0, 1]
+    assert indice.buscar("A").tolist() == [0, 2, 1]
+    assert len(indice.buscar("  ")) == 0
+    assert len(IndiceNomes([]).buscar("ana")) == 0
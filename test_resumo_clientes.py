@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pandas as pd
+
+from resumo_clientes import ResumoClientes, atualizar_linha, calcular_resumo, linha_calculada
+
+
+def test_atualizar_linha_aplica_variacoes_sem_ficar_negativa():
+    atual = {'Telefone': "11999990000", 'Atendimentos_Finalizados': 2, 'Agendamentos_Ativos': 1,
+             'Tickets_Abertos': "3", 'Ultimo_Contato': "01/10/2026"}
+
+    linha = atualizar_linha(atual, "+55 (11) 99999-0000", finalizados=1, ativos=-2)
+
+    assert linha == {'Telefone': "11999990000", 'Atendimentos_Finalizados': 3, 'Agendamentos_Ativos': 0,
+                     'Tickets_Abertos': 3, 'Ultimo_Contato': "01/10/2026"}
+
+
+def test_atualizar_linha_sem_linha_atual_e_com_contato():
+    linha = atualizar_linha(None, "11999990000", tickets=1, contato=datetime(2026, 10, 17, 9, 30))
+
+    assert linha == {'Telefone': "11999990000", 'Atendimentos_Finalizados': 0, 'Agendamentos_Ativos': 0,
+                     'Tickets_Abertos': 1, 'Ultimo_Contato': "17/10/2026"}
+
+
+def test_calcular_resumo_agrupa_pelo_telefone_normalizado():
+    abas = {
+        "HISTORICO": pd.DataFrame({'Telefone': ["11999990000", "+55 11 99999-0000", "2133334444"],
+                                   'Data de conclusão': ["01/10/2026", "05/10/2026", ""]}),
+        "AGENDAMENTOS_ATIVOS": pd.DataFrame({'Telefone': ["11999990000"], 'Data de contato': ["03/10/2026"]}),
+        "SUPORTE": pd.DataFrame({'Telefone': ["2133334444", ""]}),
+    }
+
+    resumo = calcular_resumo(abas).set_index('Telefone')
+
+    assert resumo.loc["11999990000"].tolist() == [2, 1, 0, "05/10/2026"]
+    assert resumo.loc["2133334444"].tolist() == [1, 0, 1, ""]
+    assert len(resumo) == 2
+
+
+def test_linha_calculada_sem_registros_parte_do_zero():
+    vazio = {aba: pd.DataFrame() for aba in ("HISTORICO", "AGENDAMENTOS_ATIVOS", "SUPORTE")}
+
+    assert linha_calculada("11999990000", vazio) == atualizar_linha(None, "11999990000")
+
+
+def test_resumo_com_linhas_substitui_e_acrescenta():
+    resumo = ResumoClientes(pd.DataFrame({
+        'Telefone': [11999990000], 'Atendimentos_Finalizados': [1], 'Agendamentos_Ativos': [0],
+        'Tickets_Abertos': [0], 'Ultimo_Contato': [""],
+    }))
+
+    df = resumo.com_linhas([
+        atualizar_linha(resumo.linha("11999990000"), "11999990000", ativos=1),
+        atualizar_linha(None, "2133334444", tickets=1),
+    ])
+
+    novo = ResumoClientes(df)
+    assert novo.linha("11999990000")['Agendamentos_Ativos'] == 1
+    assert novo.linha("2133334444")['Tickets_Abertos'] == 1
+    assert len(novo) == 2
+
+
+def test_dias_sem_contato():
+    resumo = ResumoClientes(pd.DataFrame({'Telefone': ["11999990000", "2133334444"],
+                                          'Ultimo_Contato': ["07/10/2026", ""]}))
+
+    dias = resumo.dias_sem_contato(pd.Series(["(11) 99999-0000", "2133334444", "999"]), hoje="2026-10-17")
+
+    assert dias.iloc[0] == 10
+    assert dias.iloc[1:].isna().all()
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from rfm import LIMITES_PADRAO, classificacoes_alteradas, classificar, telefones_repetidos, validar_limites
+
+
+def _clientes(**colunas):
+    return pd.DataFrame(colunas)
+
+
+def test_classificar_aplica_as_regras_na_ordem():
+    df = _clientes(**{
+        'Dias desde a compra': [200, 100, 10, 10, 10, 60, None],
+        'Compras': [9, 9, 5, 3, 1, 1, 1],
+        'Valor': [5000, 5000, 2000, 100, 50, 50, 50],
+    })
+
+    classificacao = classificar(df)
+
+    assert classificacao.iloc[:-1].tolist() == ["Dormente", "Em risco", "Campeão", "Leal", "Novo", "Promissor"]
+    assert pd.isna(classificacao.iloc[-1])
+
+
+def test_classificar_rejeita_limites_inconsistentes():
+    with pytest.raises(ValueError):
+        classificar(_clientes(**{'Dias desde a compra': [1]}), {'dias_em_risco': 200, 'dias_dormente': 180})
+
+
+def test_validar_limites():
+    assert validar_limites() == []
+    assert validar_limites(LIMITES_PADRAO) == []
+    assert len(validar_limites({'dias_novo': 120})) == 1
+    assert len(validar_limites({'compras_leal': 6})) == 1
+    assert len(validar_limites({'dias_novo': 0, 'valor_campeao': -1})) == 2
+
+
+def test_classificacoes_alteradas_compara_so_a_primeira_linha_do_telefone():
+    df = _clientes(**{
+        'Telefone': ["1", "1", "2", ""],
+        'Classificação ': ["Dormente", "Novo", "novo ", "Novo"],
+        'Dias desde a compra': [200, 200, 10, 200],
+        'Compras': [1, 1, 1, 1],
+        'Valor': [0, 0, 0, 0],
+    })
+
+    alteradas = classificacoes_alteradas(df)
+
+    # Telefone 1: a primeira linha já está certa (a repetida não volta como pendente);
+    # telefone 2 só difere em caixa/espaço; a linha sem telefone não entra
+    assert alteradas.empty
+    assert telefones_repetidos(df) == ["1"]
+
+
+def test_classificacoes_alteradas_lista_a_nova_classificacao():
+    df = _clientes(**{
+        'Telefone': ["1", "2"],
+        'Classificação ': ["Novo", "Leal"],
+        'Dias desde a compra': [200, 10],
+        'Compras': [1, 3],
+        'Valor': [0, 0],
+    })
+
+    alteradas = classificacoes_alteradas(df)
+
+    assert alteradas.to_dict('records') == [{'Telefone': "1", 'Atual': "Novo", 'Nova': "Dormente"}]
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from segmentos import CLASSIFICACOES, Segmentos
+
+
+def test_segmentos_mantem_ordem_e_rotulos_de_total():
+    df = pd.DataFrame(
+        {'Nome': ["Ana", "Bia", "Caio", "Davi"], 'Classificação ': ["Leal", " novo", "LEAL", "Outra"]},
+        index=[10, 11, 12, 13],
+    )
+    segmentos = Segmentos(df)
+
+    assert segmentos.segmento("Leal")['Nome'].tolist() == ["Ana", "Caio"]
+    assert segmentos.segmento("Leal").index.tolist() == [10, 12]
+    assert segmentos.segmento("Novo")['Nome'].tolist() == ["Bia"]
+    assert segmentos.segmento("Inexistente").empty
+    assert segmentos.contagens() == {**dict.fromkeys(CLASSIFICACOES, 0), "Leal": 2, "Novo": 1}
+    assert segmentos.total == 4
+
+
+def test_segmentos_sem_coluna_de_classificacao():
+    segmentos = Segmentos(pd.DataFrame({'Nome': ["Ana"]}))
+
+    assert all(segmentos.segmento(nome).empty for nome in CLASSIFICACOES)
+    assert segmentos.total == 1
@@ -0,0 +1,66 @@
+import threading
+
+from sequencias import AlocadorSequencias, maior_sufixo
+
+
+class ReservasEmMemoria:
+    """reserve_sequence em memória, contando as chamadas"""
+
+    def __init__(self):
+        self.valores = {}
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sequencia, quantidade, inicial):
+        with self._lock:
+            self.chamadas += 1
+            atual = self.valores.setdefault(sequencia, inicial)
+            self.valores[sequencia] = atual + quantidade
+            return atual + 1
+
+
+def test_maior_sufixo():
+    valores = ["TKT-2025-00007", " TKT-2025-00012 ", "TKT-2024-00099", "TKT-2025-abc", None]
+
+    assert maior_sufixo(valores, "TKT-2025") == 12
+    assert maior_sufixo([], "TKT-2025") == 0
+
+
+def test_alocador_reserva_um_bloco_por_vez():
+    reservas = ReservasEmMemoria()
+    alocador = AlocadorSequencias(reservas, bloco=5)
+
+    numeros = [alocador.proximo("TKT-2025", inicial=12) for _ in range(7)]
+
+    assert numeros == list(range(13, 20))
+    assert reservas.chamadas == 2
+
+
+def test_alocador_chama_inicial_uma_vez_por_sequencia():
+    chamadas = []
+
+    def inicial():
+        chamadas.append(1)
+        return 40
+
+    alocador = AlocadorSequencias(ReservasEmMemoria(), bloco=2)
+    assert [alocador.proximo("AG", inicial) for _ in range(5)] == [41, 42, 43, 44, 45]
+    assert len(chamadas) == 1
+
+
+def test_alocadores_diferentes_nunca_repetem_numeros():
+    reservas = ReservasEmMemoria()
+    alocadores = [AlocadorSequencias(reservas, bloco=3) for _ in range(4)]
+    numeros = []
+
+    def usar(alocador):
+        for _ in range(25):
+            numeros.append(alocador.proximo("TKT"))
+
+    threads = [threading.Thread(target=usar, args=(a,)) for a in alocadores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(numeros) == len(set(numeros)) == 100
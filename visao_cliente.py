@@ -0,0 +1,82 @@
+# ============================================================================
+# CRM PÓS-VENDAS - VISÃO 360 DO CLIENTE
+# Descrição: Histórico, agendamentos ativos e tickets de cada cliente
+#            agrupados pelo telefone, para abrir a linha do tempo com uma
+#            consulta de dicionário
+# ============================================================================
+
+import threading
+
+import pandas as pd
+
+from indices import normalizar_telefones
+
+
+def chaves_telefone(telefones):
+    """Telefone normalizado para agrupar registros do mesmo cliente
+
+    Só dígitos, sem zeros à esquerda e sem o DDI 55 (quando o número tem
+    DDD + telefone depois dele), então '+55 (11) 99999-0000' e '11999990000'
+    caem na mesma chave.
+    """
+    digitos = pd.Series(normalizar_telefones(telefones)).str.lstrip('0')
+    com_ddi = (digitos.str.len() >= 12) & digitos.str.startswith('55')
+    return digitos.where(~com_ddi, digitos.str[2:]).astype(object)
+
+
+def chave_telefone(telefone):
+    """Versão de chaves_telefone para um único valor"""
+    return chaves_telefone(pd.Series([telefone], dtype=object)).iloc[0]
+
+
+class Visao360:
+    """telefone -> {aba: posições (iloc) das linhas do cliente na aba}
+
+    Cada aba é agrupada uma vez por versão dos dados. Quando uma aba muda
+    (ex.: uma escrita invalidou o cache e ela foi relida), `atualizar`
+    reagrupa só ela: as posições das outras abas são mantidas e apenas os
+    telefones que tinham linhas na aba alterada são tocados.
+    """
+
+    def __init__(self, abas):
+        self.abas = list(abas)
+        self._grupos = {}   # telefone -> {aba: posições}
+        self._versoes = {}  # aba -> versão agrupada
+        self._dados = {}    # aba -> DataFrame agrupado
+        self._chaves = {}   # aba -> telefones com linhas na aba
+        self._lock = threading.Lock()
+
+    def atualizar(self, aba, versao, df):
+        """Reagrupa a aba se a versão dos dados mudou"""
+        with self._lock:
+            if self._versoes.get(aba) == versao and aba in self._dados:
+                return
+
+            posicoes = {}
+            if not df.empty and 'Telefone' in df.columns:
+                chaves = chaves_telefone(df['Telefone']).to_numpy()
+                posicoes = pd.Series(range(len(chaves))).groupby(chaves, sort=False).indices
+                posicoes.pop('', None)
+
+            for telefone in self._chaves.get(aba, ()):
+                grupo = self._grupos.get(telefone)
+                if grupo is not None:
+                    grupo.pop(aba, None)
+                    if not grupo:
+                        del self._grupos[telefone]
+            for telefone, linhas in posicoes.items():
+                self._grupos.setdefault(telefone, {})[aba] = linhas
+
+            self._chaves[aba] = list(posicoes)
+            self._versoes[aba] = versao
+            self._dados[aba] = df
+
+    def cliente(self, telefone):
+        """{aba: DataFrame com as linhas do cliente} para todas as abas da visão"""
+        with self._lock:
+            grupo = dict(self._grupos.get(chave_telefone(telefone), {}))
+            dados = dict(self._dados)
+        return {
+            aba: dados[aba].iloc[grupo[aba]] if aba in grupo else dados.get(aba, pd.DataFrame()).iloc[0:0]
+            for aba in self.abas
+        }